@@ -0,0 +1,208 @@
+"""
+Benchmarks for the Krisinformation client, run offline against a local
+stand-in server
+
+Measures end-to-end latency and throughput of the sync and async clients,
+time to the first streamed news, parse time in _get_all_news_from_api and
+memory per parsed news for feeds of different sizes. Results are written as
+JSON so runs from different releases can be compared:
+
+    python benchmarks/bench.py --sizes 100 1000 10000 --output new.json
+    python benchmarks/bench.py --compare old.json new.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# pylint: disable=C0413
+from krisinformation import __version__  # noqa: E402
+from krisinformation.krisinformation_lib import (  # noqa: E402
+    Krisinformation,
+    KrisinformationAPI,
+    _get_all_news_from_api,
+    json_decoder,
+)
+from server import StandInServer, synthetic_feed  # noqa: E402
+
+SIZES = (100, 1000, 10000)
+REPEAT = 5
+THRESHOLD = 0.2
+
+# Metrics where a higher value is better, all others are times or sizes
+HIGHER_IS_BETTER = ("sync_items_per_second", "async_items_per_second")
+
+
+def _timings(function, repeat: int) -> list:
+    """Returns the duration of repeat calls of function"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def _async_timings(function, repeat: int) -> list:
+    """Returns the duration of repeat awaits of function"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await function()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _p95(timings: list) -> float:
+    """95th percentile"""
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+
+
+def _memory_per_item(feed: list) -> float:
+    """Bytes allocated per news when parsing feed"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    news = _get_all_news_from_api(feed)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / max(len(news), 1)
+
+
+def _first_item(krisinformation: Krisinformation) -> None:
+    """Reads only the first streamed news"""
+    stream = krisinformation.iter_news()
+    next(stream)
+    stream.close()
+
+
+def bench_size(items: int, repeat: int, compress: bool) -> dict:
+    """Runs every benchmark for a feed of items news"""
+    feed = synthetic_feed(items)
+    result = {"items": items}
+
+    body = json.dumps(feed).encode("utf-8")
+    for name in ("json", "orjson", "msgspec"):
+        try:
+            decoder = json_decoder(name)
+        except ImportError:
+            continue
+        timings = _timings(lambda: decoder(body), repeat)
+        result["decode_{}_seconds".format(name)] = statistics.median(timings)
+
+    parse = _timings(lambda: _get_all_news_from_api(feed), repeat)
+    result["parse_seconds"] = statistics.median(parse)
+    typed = _timings(lambda: _get_all_news_from_api(feed, typed=True), repeat)
+    result["parse_typed_seconds"] = statistics.median(typed)
+    result["memory_bytes_per_item"] = _memory_per_item(feed)
+
+    with StandInServer(feed, compress=compress) as server:
+        result["response_bytes"] = len(server.body)
+        api = KrisinformationAPI(base_url=server.base_url)
+        krisinformation = Krisinformation("17.041", "62.34198", api=api)
+
+        sync = _timings(krisinformation.get_all_news, repeat)
+        result["sync_latency_seconds"] = statistics.median(sync)
+        result["sync_latency_p95_seconds"] = _p95(sync)
+        result["sync_items_per_second"] = items / statistics.median(sync)
+
+        first = _timings(lambda: _first_item(krisinformation), repeat)
+        result["stream_first_item_seconds"] = statistics.median(first)
+        api.transport.close()
+
+        async def run_async():
+            api = KrisinformationAPI(base_url=server.base_url)
+            async with Krisinformation("17.041", "62.34198", api=api) as client:
+                return await _async_timings(client.async_get_all_news, repeat)
+
+        timings = asyncio.run(run_async())
+        result["async_latency_seconds"] = statistics.median(timings)
+        result["async_latency_p95_seconds"] = _p95(timings)
+        result["async_items_per_second"] = items / statistics.median(timings)
+    return result
+
+
+def run(sizes, repeat: int, compress: bool) -> dict:
+    """Runs the benchmarks and returns the machine readable report"""
+    return {
+        "meta": {
+            "version": __version__,
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "repeat": repeat,
+            "gzip": compress,
+        },
+        "results": [bench_size(items, repeat, compress) for items in sizes],
+    }
+
+
+def compare(old: dict, new: dict, threshold: float) -> list:
+    """Returns a description of every metric that got worse than threshold"""
+    regressions = []
+    old_results = {result["items"]: result for result in old["results"]}
+    for result in new["results"]:
+        baseline = old_results.get(result["items"])
+        if baseline is None:
+            continue
+        for metric, value in result.items():
+            previous = baseline.get(metric)
+            if metric == "items" or not previous:
+                continue
+            change = value / previous - 1
+            if metric in HIGHER_IS_BETTER:
+                change = -change
+            if change > threshold:
+                regressions.append(
+                    "{} items {}: {:.4g} -> {:.4g} ({:+.0%})".format(
+                        result["items"], metric, previous, value, change
+                    )
+                )
+    return regressions
+
+
+def main() -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--gzip", action="store_true", help="compress responses")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("OLD", "NEW"),
+        help="compare two reports instead of running",
+    )
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = parser.parse_args()
+
+    if args.compare:
+        reports = []
+        for path in args.compare:
+            with open(path, encoding="utf-8") as file:
+                reports.append(json.load(file))
+        regressions = compare(reports[0], reports[1], args.threshold)
+        for regression in regressions:
+            print(regression)
+        return 1 if regressions else 0
+
+    report = run(args.sizes, args.repeat, args.gzip)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Import time benchmark guarding the startup latency of the sync client
+
+Runs python -X importtime in fresh interpreters, reports the median
+cumulative import time of krisinformation and fails if aiohttp or asyncio
+got imported, or if the time is over --max-ms:
+
+    python benchmarks/bench_import.py --repeat 10 --max-ms 150
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPEAT = 10
+MODULE = "krisinformation"
+# Modules only the async client may load
+ASYNC_MODULES = ("aiohttp", "asyncio")
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def import_time(module: str) -> tuple:
+    """
+    Imports module in a fresh interpreter and returns its cumulative import
+    time in ms and the names of all modules it imported
+    """
+    code = "import sys, {}; print(' '.join(sys.modules))".format(module)
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        check=True,
+        cwd=ROOT,
+        text=True,
+    )
+    cumulative = None
+    for line in process.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            cumulative = int(parts[1]) / 1000
+    return cumulative, set(process.stdout.split())
+
+
+def main() -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--max-ms", type=float, help="fail above this median")
+    parser.add_argument("--module", default=MODULE)
+    args = parser.parse_args()
+
+    timings = []
+    for _ in range(args.repeat):
+        milliseconds, modules = import_time(args.module)
+        timings.append(milliseconds)
+    loaded = sorted(set(ASYNC_MODULES) & modules)
+    report = {
+        "module": args.module,
+        "python": sys.version.split()[0],
+        "median_ms": statistics.median(timings),
+        "min_ms": min(timings),
+        "async_modules_loaded": loaded,
+    }
+    print(json.dumps(report, indent=2))
+
+    if loaded:
+        print("{} imported {}".format(args.module, ", ".join(loaded)))
+        return 1
+    if args.max_ms is not None and report["median_ms"] > args.max_ms:
+        print("Import took {:.1f} ms > {} ms".format(report["median_ms"], args.max_ms))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""
+Measures the memory used per KrisinformationNews instance
+
+Compares the slotted KrisinformationNews with a dict backed class laid out
+like the previous implementation. Run from the repository root:
+
+    python benchmarks/bench_memory.py
+"""
+import sys
+import tracemalloc
+
+sys.path.insert(0, ".")
+
+# pylint: disable=C0413
+from krisinformation.krisinformation_lib import KrisinformationNews  # noqa: E402
+
+COUNT = 50000
+
+
+class DictKrisinformationNews:  # pylint: disable=R0903
+    """KrisinformationNews as it was before __slots__"""
+
+    def __init__(self, *values) -> None:
+        for field, value in zip(KrisinformationNews.FIELDS, values):
+            setattr(self, "_" + field, value)
+
+
+def _values(index: int) -> tuple:
+    """Shared field values so only the instances themselves are measured"""
+    return (str(index),) + ("",) * 16
+
+
+def measure(cls) -> float:
+    """Returns the average number of bytes allocated per instance"""
+    values = [_values(index) for index in range(COUNT)]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    instances = [cls(*value) for value in values]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del instances
+    # The list holding the instances is not part of the instance size
+    return (after - before) / COUNT - 8
+
+
+def main() -> None:
+    """Prints bytes per instance before and after"""
+    before = measure(DictKrisinformationNews)
+    after = measure(KrisinformationNews)
+    print("dict backed: {:.0f} bytes per instance".format(before))
+    print("slotted:     {:.0f} bytes per instance".format(after))
+    print("saved:       {:.0%}".format(1 - after / before))
+
+
+if __name__ == "__main__":
+    main()
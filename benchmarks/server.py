@@ -0,0 +1,141 @@
+"""
+Local stand-in for the Krisinformation API used by the benchmarks
+
+Serves a recorded feed, or a synthetic feed scaled from it, under the same
+paths as the real API. Run it on its own with:
+
+    python benchmarks/server.py --items 10000 --port 8080
+
+and point KrisinformationAPI(base_url="http://127.0.0.1:8080/v3/") at it.
+"""
+import argparse
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import threading
+
+from aiohttp import web
+
+FEED_PATH = os.path.join(os.path.dirname(__file__), "feed.json")
+
+
+def recorded_feed(path: str = FEED_PATH) -> list:
+    """Returns the recorded feed"""
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def synthetic_feed(items: int, recorded: list = None) -> list:
+    """
+    Returns a feed of items news made by repeating the recorded ones with
+    unique identifiers and slightly moved coordinates
+    """
+    recorded = recorded if recorded is not None else recorded_feed()
+    feed = []
+    for index in range(items):
+        news = copy.deepcopy(recorded[index % len(recorded)])
+        news["Identifier"] = str(100000 + index)
+        for area in news["Area"]:
+            if area["Type"] == "Country":
+                continue
+            center = area["CoordinateObject"]
+            longitude = float(center["Longitude"]) + (index % 100) * 0.01
+            latitude = float(center["Latitude"]) + (index // 100 % 100) * 0.01
+            center["Longitude"] = str(longitude)
+            center["Latitude"] = str(latitude)
+            area["Coordinate"] = "{},{} 0".format(longitude, latitude)
+        feed.append(news)
+    return feed
+
+
+class StandInServer:
+    """
+    Serves a feed from a background thread so both the sync and the async
+    client can be benchmarked against it
+    """
+
+    def __init__(self, feed: list, compress: bool = False) -> None:
+        """Constructor"""
+        self.body = json.dumps(feed, ensure_ascii=False).encode("utf-8")
+        self.etag = '"{}"'.format(hashlib.sha1(self.body).hexdigest())
+        self.compress = compress
+        self.requests = 0
+        self.base_url = None
+        self._loop = None
+        self._runner = None
+        self._thread = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        """Serves the feed, or 304 if the client already has it"""
+        self.requests += 1
+        if request.headers.get("If-None-Match") == self.etag:
+            return web.Response(status=304, headers={"ETag": self.etag})
+        response = web.Response(
+            body=self.body,
+            content_type="application/json",
+            headers={"ETag": self.etag},
+        )
+        if self.compress:
+            response.enable_compression()
+        return response
+
+    def start(self, port: int = 0) -> "StandInServer":
+        """Starts serving on 127.0.0.1"""
+        started = threading.Event()
+
+        async def serve():
+            app = web.Application()
+            app.router.add_get("/v3/{endpoint}", self._handle)
+            self._runner = web.AppRunner(app, access_log=None)
+            await self._runner.setup()
+            site = web.TCPSite(self._runner, "127.0.0.1", port)
+            await site.start()
+            bound = self._runner.addresses[0][1]
+            self.base_url = "http://127.0.0.1:{}/v3/".format(bound)
+            started.set()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(serve())
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    def stop(self) -> None:
+        """Stops serving"""
+        future = asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop)
+        future.result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+
+def main() -> None:
+    """Runs the stand-in server until interrupted"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=0, help="synthetic feed size")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--gzip", action="store_true", help="compress responses")
+    args = parser.parse_args()
+
+    feed = synthetic_feed(args.items) if args.items else recorded_feed()
+    server = StandInServer(feed, compress=args.gzip).start(args.port)
+    print("Serving {} news on {}".format(len(feed), server.base_url))
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Module async_transport contains the aiohttp parts of KrisinformationAPI.
+It is imported on the first async request so the synchronous client never
+loads aiohttp, which is only needed with the async extra.
+"""
+import asyncio
+import time
+
+import aiohttp
+
+from krisinformation.krisinformation_lib import _FAILURES, _report_timing
+
+# Errors that count as a failed async request
+FAILURES = _FAILURES + (aiohttp.ClientError, asyncio.TimeoutError)
+
+
+def new_session(instrumentation=None, **options) -> aiohttp.ClientSession:
+    """
+    Creates a session, reporting DNS and connect times if instrumented.
+    Sessions provided by the caller are not traced.
+    """
+    if instrumentation is not None:
+        options["trace_configs"] = [_trace_config(instrumentation)]
+    return aiohttp.ClientSession(**options)
+
+
+def new_connector(
+    limit_per_host: int, dns_cache_ttl: int, keepalive_timeout: float
+) -> aiohttp.TCPConnector:
+    """Creates a pooled keep-alive connector"""
+    return aiohttp.TCPConnector(
+        limit_per_host=limit_per_host,
+        ttl_dns_cache=dns_cache_ttl,
+        keepalive_timeout=keepalive_timeout,
+    )
+
+
+def _trace_config(instrumentation) -> aiohttp.TraceConfig:
+    """Returns an aiohttp trace config reporting DNS and connect times"""
+    config = aiohttp.TraceConfig()
+
+    def reporter(phase: str):
+        async def on_start(session, context, params):
+            setattr(context, phase, time.perf_counter())
+
+        async def on_end(session, context, params):
+            _report_timing(
+                instrumentation,
+                phase,
+                context.trace_request_ctx or "",
+                getattr(context, phase),
+            )
+
+        return on_start, on_end
+
+    on_start, on_end = reporter("dns")
+    config.on_dns_resolvehost_start.append(on_start)
+    config.on_dns_resolvehost_end.append(on_end)
+    on_start, on_end = reporter("connect")
+    config.on_connection_create_start.append(on_start)
+    config.on_connection_create_end.append(on_end)
+    return config
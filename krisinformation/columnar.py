@@ -0,0 +1,212 @@
+"""
+Module columnar builds the news feed as columns, for Arrow and pandas
+"""
+from krisinformation.krisinformation_lib import _to_float
+
+# Name, API key and kind of every news column. captured_at is the time the
+# feed was fetched, given to add.
+NEWS_COLUMNS = (
+    ("identifier", "Identifier", "string"),
+    ("push_message", "PushMessage", "string"),
+    ("updated", "Updated", "timestamp"),
+    ("published", "Published", "timestamp"),
+    ("headline", "Headline", "string"),
+    ("preamble", "Preamble", "string"),
+    ("body_text", "BodyText", "string"),
+    ("image_link", "ImageLink", "string"),
+    ("web", "Web", "string"),
+    ("language", "Language", "facet"),
+    ("event", "Event", "facet"),
+    ("sender_name", "SenderName", "facet"),
+    ("push", "Push", "bool"),
+    ("source_id", "SourceID", "int"),
+    ("captured_at", None, "epoch"),
+)
+
+# Name, API key and kind of every area column, one row per area of a news.
+# identifier and updated are those of the news.
+AREA_COLUMNS = (
+    ("identifier", "Identifier", "string"),
+    ("updated", "Updated", "timestamp"),
+    ("area_type", "Type", "facet"),
+    ("description", "Description", "string"),
+    ("coordinate", "Coordinate", "string"),
+    ("longitude", "Longitude", "float"),
+    ("latitude", "Latitude", "float"),
+    ("altitude", "Altitude", "float"),
+    ("captured_at", None, "epoch"),
+)
+# Keys of area columns read from the news
+_PARENT_KEYS = ("Identifier", "Updated")
+# Arrow parses at most 6 digits of a second into microseconds
+_LONG_FRACTION = r"(\.\d{6})\d+"
+
+
+def _bool(value) -> bool:
+    """Converts a boolean, None if missing"""
+    return None if value is None else bool(value)
+
+
+def _int(value) -> int:
+    """Converts an integer, None if missing"""
+    return None if value is None or value == "" else int(value)
+
+
+_CONVERTERS = {
+    "bool": _bool,
+    "int": _int,
+    "float": _to_float,
+}
+
+
+class KrisinformationColumns:
+    """
+    Builds one or many news feeds as columns straight from the API result,
+    without creating news objects
+
+    news holds one list per NEWS_COLUMNS and areas one per AREA_COLUMNS,
+    filled a column at a time. Text and timestamps are kept as received and
+    event, sender_name, language and area_type as codes into dictionaries.
+    to_arrow and to_pandas parse each timestamp column in one call to Arrow
+    or pandas. Adding many feeds appends to the same lists, so
+    concatenating costs nothing extra.
+    """
+
+    def __init__(self) -> None:
+        """Constructor"""
+        self.news = {name: [] for name, _, _ in NEWS_COLUMNS}
+        self.areas = {name: [] for name, _, _ in AREA_COLUMNS}
+        # Value to code of every dictionary encoded column
+        self.dictionaries = {
+            name: {} for name, _, kind in NEWS_COLUMNS + AREA_COLUMNS if kind == "facet"
+        }
+
+    def __len__(self) -> int:
+        return len(self.news["identifier"])
+
+    def _convert(self, name: str, kind: str, values: list) -> list:
+        """Returns the values of a column as stored"""
+        if kind in ("string", "timestamp", "epoch"):
+            return values
+        if kind != "facet":
+            convert = _CONVERTERS[kind]
+            return [convert(value) for value in values]
+        codes = self.dictionaries[name]
+        for value in values:
+            if value is not None and value not in codes:
+                codes[value] = len(codes)
+        return [None if value is None else codes[value] for value in values]
+
+    def add(self, api_result: list, captured_at: float = None) -> None:
+        """
+        Appends the news of a feed, captured_at is the time it was fetched
+        in seconds since the epoch
+        """
+        captured = None if captured_at is None else round(captured_at * 1e6)
+        for name, key, kind in NEWS_COLUMNS:
+            if key is None:
+                values = [captured] * len(api_result)
+            else:
+                values = [news.get(key) for news in api_result]
+            self.news[name].extend(self._convert(name, kind, values))
+
+        # Area columns are read from the news, the area or its center point
+        rows = [(news, area) for news in api_result for area in news.get("Area") or ()]
+        centers = [area.get("CoordinateObject") or {} for _, area in rows]
+        for name, key, kind in AREA_COLUMNS:
+            if key is None:
+                values = [captured] * len(rows)
+            elif key in _PARENT_KEYS:
+                values = [news.get(key) for news, _ in rows]
+            elif kind == "float":
+                values = [center.get(key) for center in centers]
+            else:
+                values = [area.get(key) for _, area in rows]
+            self.areas[name].extend(self._convert(name, kind, values))
+
+    def to_arrow(self):
+        """Returns (news, areas) as pyarrow Tables, needs pyarrow"""
+        try:
+            import pyarrow  # pylint: disable=C0415
+            import pyarrow.compute  # pylint: disable=C0415
+        except ImportError:
+            raise ImportError("pyarrow is needed for to_arrow") from None
+
+        types = {
+            "string": pyarrow.string(),
+            "epoch": pyarrow.timestamp("us", tz="UTC"),
+            "bool": pyarrow.bool_(),
+            "int": pyarrow.int64(),
+            "float": pyarrow.float64(),
+        }
+
+        def table(columns, values):
+            arrays = {}
+            for name, _, kind in columns:
+                if kind == "facet":
+                    arrays[name] = pyarrow.DictionaryArray.from_arrays(
+                        pyarrow.array(values[name], pyarrow.int32()),
+                        pyarrow.array(list(self.dictionaries[name]), pyarrow.string()),
+                    )
+                elif kind == "timestamp":
+                    text = pyarrow.compute.replace_substring_regex(
+                        pyarrow.array(values[name], pyarrow.string()),
+                        pattern=_LONG_FRACTION,
+                        replacement=r"\1",
+                    )
+                    arrays[name] = text.cast(types["epoch"])
+                else:
+                    arrays[name] = pyarrow.array(values[name], types[kind])
+            return pyarrow.table(arrays)
+
+        return table(NEWS_COLUMNS, self.news), table(AREA_COLUMNS, self.areas)
+
+    def to_pandas(self):
+        """Returns (news, areas) as pandas DataFrames, needs pandas"""
+        try:
+            import pandas  # pylint: disable=C0415
+        except ImportError:
+            raise ImportError("pandas is needed for to_pandas") from None
+
+        # Before pandas 2 every format is inferred per value
+        major = int(pandas.__version__.split(".", 1)[0])
+        iso8601 = {"format": "ISO8601"} if major >= 2 else {}
+        dtypes = {
+            "string": object,
+            "bool": "boolean",
+            "int": "Int64",
+            "float": "float64",
+        }
+
+        def frame(columns, values):
+            series = {}
+            for name, _, kind in columns:
+                if kind == "facet":
+                    series[name] = pandas.Categorical.from_codes(
+                        [-1 if code is None else code for code in values[name]],
+                        categories=list(self.dictionaries[name]),
+                    )
+                elif kind == "timestamp":
+                    series[name] = pandas.to_datetime(
+                        pandas.Series(values[name], dtype=object), utc=True, **iso8601
+                    )
+                elif kind == "epoch":
+                    series[name] = pandas.to_datetime(
+                        pandas.array(values[name], dtype="Int64"), unit="us", utc=True
+                    )
+                else:
+                    series[name] = pandas.array(values[name], dtype=dtypes[kind])
+            return pandas.DataFrame(series)
+
+        return frame(NEWS_COLUMNS, self.news), frame(AREA_COLUMNS, self.areas)
+
+
+def columns_from_feeds(feeds) -> KrisinformationColumns:
+    """
+    Builds the columns of many archived feeds given as (captured_at,
+    api_result) pairs, like KrisinformationStore.iter_feeds yields
+    """
+    columns = KrisinformationColumns()
+    for captured_at, api_result in feeds:
+        columns.add(api_result, captured_at)
+    return columns
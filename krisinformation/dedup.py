@@ -0,0 +1,191 @@
+"""
+Module dedup groups news that report the same event: copies, translations
+and republications
+"""
+from datetime import timedelta
+import hashlib
+from typing import List
+
+from krisinformation.krisinformation_lib import (
+    KrisinformationNews,
+    _parse_datetime,
+    news_areas,
+)
+from krisinformation.query import tokenize
+
+# Fields whose normalized text make up the fingerprint
+FINGERPRINT_FIELDS = ("headline", "preamble", "body_text", "push_message")
+# Translations are published within this long of each other
+WINDOW = timedelta(hours=1)
+# Share of words, mostly names and numbers, that news from the same sender
+# must have in common to be translations of each other
+SIMILARITY = 0.1
+CANONICAL_LANGUAGE = "sv"
+
+
+def fingerprint(news: KrisinformationNews) -> str:
+    """
+    Returns a fingerprint of the text of news. Markup, case, punctuation and
+    whitespace are ignored, so copies of a news published by another sender
+    or updated without changing the text get the same fingerprint.
+    """
+    text = "\x1f".join(
+        " ".join(tokenize(getattr(news, field))) for field in FINGERPRINT_FIELDS
+    )
+    if not text.strip("\x1f"):
+        # Nothing to compare, only the news itself is a copy
+        text = "\x1f" + news.identifier
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _link(news: KrisinformationNews) -> tuple:
+    """Returns web, sender and words of news, to tell if news are related"""
+    sender = (news.sender_name or "").lower() or news.source_id or None
+    words = frozenset(
+        word for field in FINGERPRINT_FIELDS for word in tokenize(getattr(news, field))
+    )
+    return news.web or None, sender, words
+
+
+def _linked(link: tuple, other: tuple) -> bool:
+    """True if news with link and other have the same web page, or the same
+    sender and enough words in common"""
+    web, sender, words = link
+    if web is not None and web == other[0]:
+        return True
+    if sender is None or sender != other[1] or not words or not other[2]:
+        return False
+    return len(words & other[2]) >= SIMILARITY * len(words | other[2])
+
+
+class KrisinformationEvent:
+    """
+    News reporting the same event, in feed order. fingerprint is that of
+    the first news, stable as long as its text does not change.
+    """
+
+    def __init__(
+        self, news: KrisinformationNews, news_fingerprint: str, published, link
+    ) -> None:
+        """Constructor"""
+        self.fingerprint = news_fingerprint
+        self.news = [news]
+        self.languages = {news.language}
+        self._published = [published]
+        self._links = [link]
+
+    @property
+    def canonical(self) -> KrisinformationNews:
+        """The news to act on, the first in CANONICAL_LANGUAGE if any"""
+        for news in self.news:
+            if news.language == CANONICAL_LANGUAGE:
+                return news
+        return self.news[0]
+
+    @property
+    def identifiers(self) -> List[str]:
+        """Identifiers of all news of the event"""
+        return [news.identifier for news in self.news]
+
+    def _add(self, news: KrisinformationNews, published, link) -> None:
+        """Adds a news to the event"""
+        self.news.append(news)
+        self.languages.add(news.language)
+        self._published.append(published)
+        self._links.append(link)
+
+    def _translates(self, published, link, window: timedelta) -> bool:
+        """True if a news of the event is linked to and published within
+        window of a news with published and link"""
+        if published is None:
+            return False
+        return any(
+            other is not None
+            and abs(other - published) <= window
+            and _linked(link, other_link)
+            for other, other_link in zip(self._published, self._links)
+        )
+
+    def __repr__(self) -> str:
+        return "KrisinformationEvent({})".format(self.identifiers)
+
+
+class KrisinformationDeduplicator:
+    """
+    Groups the news of a feed into events
+
+    News with the same fingerprint are copies of each other. News in another
+    language than those already in an event, with the same event type and
+    areas, published within window of a news of it and linked to that news
+    by the same web page or by the same sender and similar text, are
+    translations. Event type and areas alone are the same for most of the
+    feed, so they never make a translation. Fingerprints are cached by
+    identifier and updated, so only news that changed since the previous
+    call are hashed again.
+    """
+
+    def __init__(self, window: timedelta = WINDOW) -> None:
+        """Constructor"""
+        self.window = window
+        self._cache = {}
+
+    def fingerprint(self, news: KrisinformationNews) -> str:
+        """Returns the fingerprint of news, cached"""
+        return self._keys(news)[0]
+
+    def _keys(self, news: KrisinformationNews) -> tuple:
+        """Returns fingerprint, translation key, published and link of news"""
+        # Typed news parse updated lazily, the raw value is enough to compare
+        cache_key = (news.identifier, news._updated)  # pylint: disable=W0212
+        keys = self._cache.get(cache_key)
+        if keys is None:
+            try:
+                published = _parse_datetime(news.published)
+            except ValueError:
+                published = None
+            translation_key = (
+                (news.event or "").lower(),
+                frozenset(
+                    (area.description or "").lower() for area in news_areas(news)
+                ),
+            )
+            keys = (fingerprint(news), translation_key, published, _link(news))
+            self._cache[cache_key] = keys
+        return keys
+
+    def group(self, news_list: List[KrisinformationNews]) -> List[KrisinformationEvent]:
+        """Returns the events of news_list in feed order"""
+        events = []
+        by_fingerprint = {}
+        by_translation_key = {}
+        seen = set()
+        for news in news_list:
+            news_fingerprint, translation_key, published, link = self._keys(news)
+            seen.add((news.identifier, news._updated))  # pylint: disable=W0212
+
+            event = by_fingerprint.get(news_fingerprint)
+            if event is None:
+                for candidate in by_translation_key.get(translation_key, ()):
+                    # pylint: disable=W0212
+                    if (
+                        news.language not in candidate.languages
+                        and candidate._translates(published, link, self.window)
+                    ):
+                        event = candidate
+                        break
+            if event is None:
+                event = KrisinformationEvent(news, news_fingerprint, published, link)
+                events.append(event)
+                by_translation_key.setdefault(translation_key, []).append(event)
+            else:
+                event._add(news, published, link)  # pylint: disable=W0212
+            by_fingerprint.setdefault(news_fingerprint, event)
+
+        # Forget news no longer in the feed
+        for cache_key in [key for key in self._cache if key not in seen]:
+            del self._cache[cache_key]
+        return events
+
+    def unique(self, news_list: List[KrisinformationNews]) -> List[KrisinformationNews]:
+        """Returns the canonical news of every event of news_list"""
+        return [event.canonical for event in self.group(news_list)]
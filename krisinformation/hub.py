@@ -0,0 +1,199 @@
+"""
+Module hub contains a feed hub that shares one upstream fetch between
+many locations
+"""
+import asyncio
+import inspect
+import threading
+import time
+from typing import Callable, List
+
+from krisinformation.krisinformation_lib import (
+    KrisinformationAPI,
+    KrisinformationAPIBase,
+    KrisinformationNews,
+    _get_all_news,
+)
+from krisinformation.spatial import RADIUS_KM, KrisinformationSpatialIndex
+
+INTERVAL = 60
+
+
+class KrisinformationSubscription:
+    """
+    Location registered with a KrisinformationFeedHub
+    """
+
+    def __init__(
+        self,
+        hub: "KrisinformationFeedHub",
+        longitude: float,
+        latitude: float,
+        callback: Callable,
+        radius_km: float,
+    ) -> None:
+        """Constructor"""
+        self._hub = hub
+        self.longitude = longitude
+        self.latitude = latitude
+        self.callback = callback
+        self.radius_km = radius_km
+
+    def unregister(self) -> None:
+        """Stops delivering news to this subscription"""
+        self._hub.unregister(self)
+
+
+class KrisinformationFeedHub(KrisinformationAPIBase):
+    """
+    Shares one upstream fetch between many locations
+
+    The feed is fetched at most once per interval. Concurrent callers, both
+    threads and coroutines, wait for the request already in flight instead
+    of starting their own. The hub is itself an API, so any number of
+    Krisinformation instances can use it:
+
+        hub = KrisinformationFeedHub()
+        stockholm = Krisinformation("18.07", "59.33", api=hub)
+
+    Locations can also be registered with a callback that gets the news for
+    that location every time publish or async_publish runs.
+    """
+
+    def __init__(
+        self,
+        api: KrisinformationAPIBase = None,
+        interval: float = INTERVAL,
+        typed: bool = False,
+        clock=time.monotonic,
+    ) -> None:
+        """Constructor"""
+        self._api = api if api is not None else KrisinformationAPI()
+        self.interval = interval
+        self._typed = typed
+        self._clock = clock
+        self._data = None
+        self._fetched_at = None
+        self._lock = threading.Lock()
+        self._in_flight = None
+        self._open_count = 0
+        self._subscriptions = []
+        self._spatial_index = KrisinformationSpatialIndex()
+        self._indexed = None
+
+    def _fresh(self):
+        """Returns the last fetched data if younger than interval"""
+        if self._fetched_at is None:
+            return None
+        if self._clock() - self._fetched_at >= self.interval:
+            return None
+        return self._data
+
+    def _stored(self, data):
+        """Remembers data as the latest feed"""
+        self._data = data
+        self._fetched_at = self._clock()
+        return data
+
+    def get_all_news_api(self, longitude: str, latitude: str):
+        """Returns the shared feed, fetching it if older than interval"""
+        data = self._fresh()
+        if data is not None:
+            return data
+        with self._lock:
+            # Another thread may have fetched while we waited for the lock
+            data = self._fresh()
+            if data is not None:
+                return data
+            return self._stored(self._api.get_all_news_api(longitude, latitude))
+
+    async def async_get_all_news_api(self, longitude: str, latitude: str):
+        """Returns the shared feed, fetching it if older than interval"""
+        data = self._fresh()
+        if data is not None:
+            return data
+        if self._in_flight is None:
+            self._in_flight = asyncio.ensure_future(
+                self._async_fetch(longitude, latitude)
+            )
+        return await asyncio.shield(self._in_flight)
+
+    async def _async_fetch(self, longitude: str, latitude: str):
+        """Fetches the feed for every waiting coroutine"""
+        try:
+            return self._stored(
+                await self._api.async_get_all_news_api(longitude, latitude)
+            )
+        finally:
+            self._in_flight = None
+
+    async def async_open(self) -> None:
+        """Opens the upstream api when the first user enters"""
+        self._open_count += 1
+        if self._open_count == 1:
+            await self._api.async_open()
+
+    async def async_close(self) -> None:
+        """Closes the upstream api when the last user leaves"""
+        if self._open_count == 0:
+            return
+        self._open_count -= 1
+        if self._open_count == 0:
+            await self._api.async_close()
+
+    def register(
+        self,
+        longitude: float,
+        latitude: float,
+        callback: Callable[[List[KrisinformationNews]], None],
+        radius_km: float = RADIUS_KM,
+    ) -> KrisinformationSubscription:
+        """
+        Registers a location. callback gets the news for the location on
+        every publish, it may be a coroutine function with async_publish.
+        """
+        subscription = KrisinformationSubscription(
+            self, float(longitude), float(latitude), callback, radius_km
+        )
+        self._subscriptions.append(subscription)
+        return subscription
+
+    def unregister(self, subscription: KrisinformationSubscription) -> None:
+        """Removes a registered location"""
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+
+    def publish(self) -> None:
+        """Fetches the feed once and delivers the news for every location"""
+        self._update_index(self.get_all_news_api("", ""))
+        subscriptions = list(self._subscriptions)
+        for subscription, news_list in zip(subscriptions, self._query(subscriptions)):
+            subscription.callback(news_list)
+
+    async def async_publish(self) -> None:
+        """Fetches the feed once and delivers the news for every location"""
+        self._update_index(await self.async_get_all_news_api("", ""))
+        subscriptions = list(self._subscriptions)
+        for subscription, news_list in zip(subscriptions, self._query(subscriptions)):
+            result = subscription.callback(news_list)
+            if inspect.isawaitable(result):
+                await result
+
+    def _update_index(self, data) -> None:
+        """Brings the spatial index up to date with data"""
+        if data is self._indexed:
+            return
+        self._spatial_index.update(_get_all_news(data, self._typed))
+        self._indexed = data
+
+    def _query(
+        self, subscriptions: List[KrisinformationSubscription]
+    ) -> List[List[KrisinformationNews]]:
+        """Returns the news for every registered location in one batch"""
+        return self._spatial_index.query_many(
+            [
+                (subscription.longitude, subscription.latitude)
+                for subscription in subscriptions
+            ],
+            [subscription.radius_km for subscription in subscriptions],
+        )
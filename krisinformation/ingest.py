@@ -0,0 +1,112 @@
+"""
+Module ingest parses archived feed files on several processes
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import mmap
+import os
+from typing import List
+
+from krisinformation.krisinformation_lib import (
+    KrisinformationNews,
+    _get_all_news,
+    json_decoder,
+    orjson,
+)
+
+CHUNK_SIZE = 1000
+FILES_PER_TASK = 8
+
+
+def _read_feed(path: str, decoder):
+    """Decodes a feed file through a memory map, None if it is empty"""
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if orjson is not None and decoder is orjson.loads:
+                # orjson reads the mapped pages without a copy
+                with memoryview(mapped) as view:
+                    return decoder(view)
+            return decoder(mapped[:])
+
+
+def _parse_files(paths: List[str], typed: bool) -> List[KrisinformationNews]:
+    """
+    Parses feed files in a worker process, returning every news once per
+    identifier and updated
+    """
+    decoder = json_decoder()
+    seen = set()
+    result = []
+    for path in paths:
+        api_result = _read_feed(path, decoder)
+        if not api_result:
+            continue
+        for news in _get_all_news(api_result, typed):
+            key = (news.identifier, news._updated)  # pylint: disable=W0212
+            if key not in seen:
+                seen.add(key)
+                result.append(news)
+    return result
+
+
+# pylint: disable=R0913
+def ingest_feeds(
+    paths,
+    processes: int = None,
+    typed: bool = False,
+    chunk_size: int = CHUNK_SIZE,
+    files_per_task: int = FILES_PER_TASK,
+):
+    """
+    Parses archived feed files, each a JSON array as returned by the API,
+    on a pool of processes and yields the news in lists of at most
+    chunk_size.
+
+    Every version of a news, identified by identifier and updated, is
+    yielded once, in the order of the files. Workers get files_per_task
+    files at a time and at most two tasks per process are in flight, so
+    memory does not grow with the number of files. paths may be a lazy
+    iterable.
+    """
+    processes = processes or os.cpu_count() or 1
+    seen = set()
+    chunk = []
+
+    def tasks():
+        batch = []
+        for path in paths:
+            batch.append(os.fspath(path))
+            if len(batch) == files_per_task:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        pending = deque()
+        batches = tasks()
+        for batch in batches:
+            pending.append(executor.submit(_parse_files, batch, typed))
+            if len(pending) >= 2 * processes:
+                break
+
+        while pending:
+            news_list = pending.popleft().result()
+            batch = next(batches, None)
+            if batch is not None:
+                pending.append(executor.submit(_parse_files, batch, typed))
+
+            # Merge with the news from earlier tasks
+            for news in news_list:
+                key = (news.identifier, news._updated)  # pylint: disable=W0212
+                if key in seen:
+                    continue
+                seen.add(key)
+                chunk.append(news)
+                if len(chunk) == chunk_size:
+                    yield chunk
+                    chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,182 @@
+"""
+Module instrumentation contains the hooks KrisinformationAPI and
+Krisinformation report timings, sizes and events to, with adapters for
+Prometheus and OpenTelemetry
+"""
+import time
+
+# Phases reported to timing, in the order they happen
+PHASES = ("dns", "connect", "request", "transfer", "decode", "convert")
+
+# Events reported to event
+EVENTS = (
+    "cache_hit",
+    "cache_revalidated",
+    "cache_miss",
+    "retry",
+    "stale",
+    "circuit_open",
+    "rate_limited",
+)
+
+
+class KrisinformationInstrumentation:
+    """
+    Instrumentation that does nothing, subclass it and override the hooks
+    of interest
+
+    Pass an instance as instrumentation to KrisinformationAPI. Without one
+    no time is measured at all. feed is the name of the fetched endpoint,
+    like news.
+
+    Phases:
+      dns, connect: name lookup and connection setup, only for new
+        connections. The synchronous transport reports both as connect.
+      request: sending the request until the response headers arrived
+      transfer: reading and decompressing the body
+      decode: JSON decoding
+      convert: building the news objects
+    """
+
+    def timing(self, phase: str, feed: str, seconds: float) -> None:
+        """Called with the duration of a phase"""
+
+    def size(self, feed: str, size: int) -> None:
+        """Called with the decoded size of a response body in bytes"""
+
+    def items(self, feed: str, count: int) -> None:
+        """Called with the number of news in a feed"""
+
+    def event(self, name: str, feed: str) -> None:
+        """Called for cache, retry, stale, circuit breaker and rate limit events"""
+
+    def error(self, feed: str, error: Exception) -> None:
+        """Called for every failed request attempt"""
+
+
+class PrometheusInstrumentation(KrisinformationInstrumentation):
+    """
+    Instrumentation that updates Prometheus metrics, needs prometheus_client
+
+    Metrics, all prefixed with namespace:
+      phase_seconds: histogram of phase durations by phase and feed
+      response_bytes: histogram of response sizes by feed
+      news_items: gauge of the news count by feed
+      events_total: counter of events by event and feed
+      errors_total: counter of failed attempts by error type and feed
+    """
+
+    def __init__(self, registry=None, namespace: str = "krisinformation") -> None:
+        """Constructor"""
+        try:
+            # pylint: disable=C0415
+            from prometheus_client import Counter, Gauge, Histogram
+        except ImportError:
+            raise ImportError(
+                "prometheus_client is needed for PrometheusInstrumentation"
+            ) from None
+
+        options = {"namespace": namespace}
+        if registry is not None:
+            options["registry"] = registry
+        self.phase_seconds = Histogram(
+            "phase_seconds",
+            "Duration of a phase of fetching a feed",
+            ["phase", "feed"],
+            **options
+        )
+        self.response_bytes = Histogram(
+            "response_bytes",
+            "Decoded size of a feed response",
+            ["feed"],
+            buckets=(1e3, 1e4, 1e5, 1e6, 1e7, 1e8, float("inf")),
+            **options
+        )
+        self.news_items = Gauge(
+            "news_items", "Number of news in the last feed", ["feed"], **options
+        )
+        self.events = Counter(
+            "events",
+            "Cache, retry and circuit breaker events",
+            ["event", "feed"],
+            **options
+        )
+        self.errors = Counter(
+            "errors", "Failed request attempts", ["error", "feed"], **options
+        )
+
+    def timing(self, phase: str, feed: str, seconds: float) -> None:
+        """Observes the phase duration"""
+        self.phase_seconds.labels(phase, feed).observe(seconds)
+
+    def size(self, feed: str, size: int) -> None:
+        """Observes the response size"""
+        self.response_bytes.labels(feed).observe(size)
+
+    def items(self, feed: str, count: int) -> None:
+        """Sets the news count"""
+        self.news_items.labels(feed).set(count)
+
+    def event(self, name: str, feed: str) -> None:
+        """Counts the event"""
+        self.events.labels(name, feed).inc()
+
+    def error(self, feed: str, error: Exception) -> None:
+        """Counts the error by type"""
+        self.errors.labels(type(error).__name__, feed).inc()
+
+
+class OpenTelemetryInstrumentation(KrisinformationInstrumentation):
+    """
+    Instrumentation that records OpenTelemetry spans, needs opentelemetry-api
+
+    Every phase becomes a span named krisinformation.<phase> under the
+    current span. Sizes and counts are set as attributes and events and
+    errors are added to the current span.
+    """
+
+    def __init__(self, tracer=None) -> None:
+        """Constructor"""
+        try:
+            from opentelemetry import trace  # pylint: disable=C0415
+        except ImportError:
+            raise ImportError(
+                "opentelemetry-api is needed for OpenTelemetryInstrumentation"
+            ) from None
+
+        self._trace = trace
+        self._tracer = tracer if tracer is not None else trace.get_tracer(__name__)
+
+    def timing(self, phase: str, feed: str, seconds: float) -> None:
+        """Records a span for the phase that just ended"""
+        end = time.time_ns()
+        span = self._tracer.start_span(
+            "krisinformation." + phase,
+            start_time=end - int(seconds * 1e9),
+            attributes={"krisinformation.feed": feed},
+        )
+        span.end(end_time=end)
+
+    def size(self, feed: str, size: int) -> None:
+        """Sets the response size on the current span"""
+        self._trace.get_current_span().set_attribute(
+            "krisinformation.response_bytes", size
+        )
+
+    def items(self, feed: str, count: int) -> None:
+        """Sets the news count on the current span"""
+        self._trace.get_current_span().set_attribute(
+            "krisinformation.news_items", count
+        )
+
+    def event(self, name: str, feed: str) -> None:
+        """Adds the event to the current span"""
+        self._trace.get_current_span().add_event(
+            "krisinformation." + name, {"krisinformation.feed": feed}
+        )
+
+    def error(self, feed: str, error: Exception) -> None:
+        """Records the error on the current span"""
+        self._trace.get_current_span().record_exception(
+            error, {"krisinformation.feed": feed}
+        )
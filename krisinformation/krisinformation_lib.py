@@ -4,14 +4,52 @@ Krisinformation through the open API:s
 """
 import abc
 from datetime import datetime
+import http.client
+import itertools
 import json
-from urllib.request import urlopen
-from typing import List
-import aiohttp
+from operator import attrgetter
+import random
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+from typing import List, TYPE_CHECKING
+import zlib
+
+if TYPE_CHECKING:
+    import asyncio
+    import aiohttp
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 BASEURL = "http://api.krisinformation.se/v3/"
 NEWS_ENDPOINT = "news?format=json"
+VMAS_ENDPOINT = "vmas?format=json"
+
+# Feeds under BASEURL by name
+ENDPOINTS = {
+    "news": NEWS_ENDPOINT,
+    "vmas": VMAS_ENDPOINT,
+}
+CONCURRENCY = 4
+RETRY_ATTEMPTS = 3
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 10
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 30
+RATE_LIMIT = 1
+RATE_BURST = 5
+
+LIMIT_PER_HOST = 10
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 30
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 30
+CHUNK_SIZE = 64 * 1024
 
 
 class KrisinformationException(Exception):
@@ -20,11 +58,55 @@ class KrisinformationException(Exception):
     pass
 
 
+class KrisinformationStatusException(KrisinformationException):
+    """Exception thrown if the API answers with an unexpected status code"""
+
+    def __init__(self, message: str, status: int) -> None:
+        """Constructor"""
+        super().__init__(message)
+        self.status = status
+
+
+class KrisinformationCircuitOpenException(KrisinformationException):
+    """Exception thrown if the circuit breaker stops a request"""
+
+    pass
+
+
+class KrisinformationRateLimitException(KrisinformationException):
+    """Exception thrown if over the rate limit with no data to serve"""
+
+    pass
+
+
 class KrisinformationNews:
     """
     Class to hold news data
     """
 
+    FIELDS = (
+        "identifier",
+        "push_message",
+        "updated",
+        "published",
+        "headline",
+        "preamble",
+        "body_text",
+        "image_link",
+        "links",
+        "area",
+        "web",
+        "language",
+        "event",
+        "sender_name",
+        "push",
+        "body_links",
+        "source_id",
+    )
+
+    # _areas keeps the raw areas of untyped news for news_areas
+    __slots__ = tuple("_" + field for field in FIELDS) + ("_areas",)
+
     def __init__(
         self,
         identifier: str,
@@ -44,6 +126,7 @@ class KrisinformationNews:
         push: bool,
         body_links,
         source_id: int,
+        areas: list = None,
     ) -> None:
         """Constructor"""
         self._identifier = identifier
@@ -63,6 +146,7 @@ class KrisinformationNews:
         self._push = push
         self._body_links = body_links
         self._source_id = source_id
+        self._areas = areas
 
     @property
     def identifier(self) -> str:
@@ -149,10 +233,725 @@ class KrisinformationNews:
         """Mean Precipitation (mm/h)"""
         return self._source_id
 
+    def to_tuple(self) -> tuple:
+        """Returns the values in constructor order"""
+        return _news_values(self)
+
+    def _asdict(self) -> dict:
+        """Returns the values by field name"""
+        return dict(zip(self.FIELDS, self.to_tuple()))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, KrisinformationNews):
+            return NotImplemented
+        return (self._identifier, self._updated) == (
+            other._identifier,
+            other._updated,
+        )
+
+    def __hash__(self) -> int:
+        return hash((self._identifier, self._updated))
+
+    def __repr__(self) -> str:
+        return "KrisinformationNews(identifier={!r}, updated={!r})".format(
+            self._identifier, self._updated
+        )
+
+
+_news_values = attrgetter(*("_" + field for field in KrisinformationNews.FIELDS))
+
+
+class KrisinformationLink:
+    """
+    Class to hold a link of a news
+    """
+
+    __slots__ = ("_text", "_url")
+
+    def __init__(self, text: str, url: str) -> None:
+        """Constructor"""
+        self._text = text
+        self._url = url
+
+    @property
+    def text(self) -> str:
+        """Link text"""
+        return self._text
+
+    @property
+    def url(self) -> str:
+        """Link url"""
+        return self._url
+
+    def __repr__(self) -> str:
+        return "KrisinformationLink(text={!r}, url={!r})".format(self._text, self._url)
+
+
+class KrisinformationArea:
+    """
+    Class to hold an area a news concerns
+    """
+
+    __slots__ = (
+        "_area_type",
+        "_description",
+        "_coordinate",
+        "_longitude",
+        "_latitude",
+        "_altitude",
+        "_geometry_information",
+        "_geometry",
+    )
+
+    def __init__(
+        self,
+        area_type: str,
+        description: str,
+        coordinate: str,
+        longitude: float,
+        latitude: float,
+        altitude: float,
+        geometry_information,
+    ) -> None:
+        """Constructor"""
+        self._area_type = area_type
+        self._description = description
+        self._coordinate = coordinate
+        self._longitude = longitude
+        self._latitude = latitude
+        self._altitude = altitude
+        self._geometry_information = geometry_information
+
+    @property
+    def area_type(self) -> str:
+        """Country, County, Municipality, PoI..."""
+        return self._area_type
+
+    @property
+    def description(self) -> str:
+        """Name of the area"""
+        return self._description
+
+    @property
+    def coordinate(self) -> str:
+        """Coordinate as received from the API"""
+        return self._coordinate
+
+    @property
+    def longitude(self) -> float:
+        """Longitude of the area center"""
+        return self._longitude
+
+    @property
+    def latitude(self) -> float:
+        """Latitude of the area center"""
+        return self._latitude
+
+    @property
+    def altitude(self) -> float:
+        """Altitude of the area center"""
+        return self._altitude
+
+    @property
+    def geometry_information(self):
+        """Geometry as received from the API"""
+        return self._geometry_information
+
+    @property
+    def geometry(self) -> List[tuple]:
+        """
+        Area outline as (longitude, latitude) points, parsed on first use.
+        Falls back to the center coordinate if there is no geometry.
+        """
+        try:
+            return self._geometry
+        except AttributeError:
+            points = []
+            for text in _coordinate_texts(self._geometry_information):
+                points.extend(_parse_coordinates(text))
+            if not points and self._coordinate:
+                points = _parse_coordinates(self._coordinate)
+            self._geometry = points
+            return points
+
+    def __repr__(self) -> str:
+        return "KrisinformationArea(area_type={!r}, description={!r})".format(
+            self._area_type, self._description
+        )
+
+
+class TypedKrisinformationNews(KrisinformationNews):
+    """
+    News with typed values
+
+    The raw values from the API are kept and only converted on first
+    access, so news that are never inspected cost nothing extra.
+    """
+
+    __slots__ = (
+        "_updated_value",
+        "_published_value",
+        "_links_value",
+        "_area_value",
+        "_body_links_value",
+    )
+
+    @property
+    def updated(self) -> datetime:
+        """Time of last update"""
+        try:
+            return self._updated_value
+        except AttributeError:
+            self._updated_value = _parse_datetime(self._updated)
+            return self._updated_value
+
+    @property
+    def published(self) -> datetime:
+        """Time of publishing"""
+        try:
+            return self._published_value
+        except AttributeError:
+            self._published_value = _parse_datetime(self._published)
+            return self._published_value
+
+    @property
+    def links(self) -> List[KrisinformationLink]:
+        """Links to more information"""
+        try:
+            return self._links_value
+        except AttributeError:
+            self._links_value = _parse_links(self._links)
+            return self._links_value
+
+    @property
+    def area(self) -> List[KrisinformationArea]:
+        """Areas the news concerns"""
+        try:
+            return self._area_value
+        except AttributeError:
+            self._area_value = _parse_areas(self._area)
+            return self._area_value
+
+    @property
+    def push(self) -> bool:
+        """If the news is sent as a push message"""
+        return self._push
+
+    @property
+    def body_links(self) -> List[KrisinformationLink]:
+        """Links in the body text"""
+        try:
+            return self._body_links_value
+        except AttributeError:
+            self._body_links_value = _parse_links(self._body_links)
+            return self._body_links_value
+
+    def __repr__(self) -> str:
+        return "TypedKrisinformationNews(identifier={!r}, updated={!r})".format(
+            self._identifier, self._updated
+        )
+
+
+class KrisinformationChanges:
+    """
+    Class to hold the difference between two polls of the news feed
+    """
+
+    def __init__(
+        self,
+        added: List[KrisinformationNews],
+        updated: List[KrisinformationNews],
+        removed: List[KrisinformationNews],
+    ) -> None:
+        """Constructor"""
+        self._added = added
+        self._updated = updated
+        self._removed = removed
+
+    @property
+    def added(self) -> List[KrisinformationNews]:
+        """News not present in the previous poll"""
+        return self._added
+
+    @property
+    def updated(self) -> List[KrisinformationNews]:
+        """News whose updated timestamp changed since the previous poll"""
+        return self._updated
+
+    @property
+    def removed(self) -> List[KrisinformationNews]:
+        """News from the previous poll that are no longer in the feed"""
+        return self._removed
+
+    def __bool__(self) -> bool:
+        return bool(self._added or self._updated or self._removed)
+
 
 # pylint: disable=R0903
 
 
+class _CacheEntry:
+    """
+    Cached API response together with its validators
+    """
+
+    __slots__ = ("data", "etag", "last_modified", "fetched_at")
+
+    def __init__(self, data, etag: str, last_modified: str, fetched_at: float) -> None:
+        """Constructor"""
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+
+
+class KrisinformationCache:
+    """
+    Response cache for the Krisinformation API
+
+    Stores the last parsed response per url together with its ETag and
+    Last-Modified validators. Responses younger than ttl seconds are served
+    without touching the network, older ones are revalidated with a
+    conditional GET and reused if the API answers 304 Not Modified.
+    """
+
+    def __init__(self, ttl: float = 0, clock=time.monotonic) -> None:
+        """Constructor"""
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = {}
+
+    def get_fresh(self, url: str):
+        """Returns cached data for url if still within ttl, else None"""
+        entry = self._entries.get(url)
+        if entry is None or self._clock() - entry.fetched_at >= self.ttl:
+            return None
+        return entry.data
+
+    def get_stored(self, url: str):
+        """Returns cached data for url regardless of age, else None"""
+        entry = self._entries.get(url)
+        if entry is None:
+            return None
+        return entry.data
+
+    def conditional_headers(self, url: str) -> dict:
+        """Returns the headers needed to revalidate the cached url"""
+        entry = self._entries.get(url)
+        headers = {}
+        if entry is None:
+            return headers
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def store(self, url: str, data, etag: str = None, last_modified: str = None):
+        """Stores a new response for url"""
+        self._entries[url] = _CacheEntry(data, etag, last_modified, self._clock())
+
+    def revalidated(self, url: str):
+        """Marks the cached url as still valid and returns its data"""
+        entry = self._entries[url]
+        entry.fetched_at = self._clock()
+        return entry.data
+
+    def clear(self) -> None:
+        """Removes all cached responses"""
+        self._entries.clear()
+
+
+class _Decompressor:
+    """
+    Incremental decoder for gzip or deflate encoded response bodies
+    """
+
+    def __init__(self, encoding: str) -> None:
+        """Constructor"""
+        encoding = (encoding or "").lower()
+        self._raw_fallback = encoding == "deflate"
+        if encoding in ("gzip", "x-gzip"):
+            self._zlib = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == "deflate":
+            self._zlib = zlib.decompressobj()
+        else:
+            self._zlib = None
+
+    def decompress(self, data: bytes) -> bytes:
+        """Decodes the next chunk of the body"""
+        if self._zlib is None:
+            return data
+        if not self._raw_fallback:
+            return self._zlib.decompress(data)
+        self._raw_fallback = False
+        try:
+            return self._zlib.decompress(data)
+        except zlib.error:
+            # Some servers send raw deflate without the zlib header
+            self._zlib = zlib.decompressobj(-zlib.MAX_WBITS)
+            return self._zlib.decompress(data)
+
+    def flush(self) -> bytes:
+        """Returns what is left of the body"""
+        if self._zlib is None:
+            return b""
+        return self._zlib.flush()
+
+
+class _TransportResponse:
+    """
+    Response from KrisinformationHTTPTransport. The decoded body is read
+    either as a whole through body or in chunks through iter_chunks. The
+    connection goes back to the pool once the body is fully read.
+    """
+
+    def __init__(self, transport, key, connection, response) -> None:
+        """Constructor"""
+        self.status = response.status
+        self.headers = response.headers
+        self._transport = transport
+        self._key = key
+        self._connection = connection
+        self._response = response
+        self._body = None
+        self._finished = False
+
+    @property
+    def body(self) -> bytes:
+        """The whole decoded body"""
+        if self._body is None:
+            self._body = b"".join(self.iter_chunks())
+        return self._body
+
+    def iter_chunks(self, chunk_size: int = CHUNK_SIZE):
+        """Yields the decoded body in chunks as it arrives"""
+        decompressor = _Decompressor(self.headers.get("Content-Encoding"))
+        try:
+            while True:
+                data = self._response.read(chunk_size)
+                if not data:
+                    break
+                data = decompressor.decompress(data)
+                if data:
+                    yield data
+            data = decompressor.flush()
+            if data:
+                yield data
+        except BaseException:
+            self.close()
+            raise
+
+        self._finished = True
+        if self._response.will_close:
+            self._connection.close()
+        else:
+            self._transport._release(self._key, self._connection)
+
+    def close(self) -> None:
+        """Drops the connection if the body was not fully read"""
+        if not self._finished:
+            self._finished = True
+            self._connection.close()
+
+    def __enter__(self) -> "_TransportResponse":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+class KrisinformationHTTPTransport:
+    """
+    Keep-alive HTTP transport for the synchronous API calls
+
+    Keeps a pool of persistent connections per host that is safe to share
+    between threads, asks for gzip/deflate compressed responses and applies
+    separate connect and read timeouts.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = LIMIT_PER_HOST,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+        instrumentation=None,
+    ) -> None:
+        """Constructor"""
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.instrumentation = instrumentation
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def request(self, url: str, headers: dict = None) -> _TransportResponse:
+        """Makes a GET request to url and reads the whole response"""
+        response = self.open(url, headers)
+        response.body  # pylint: disable=W0104
+        return response
+
+    def open(self, url: str, headers: dict = None) -> _TransportResponse:
+        """
+        Makes a GET request to url and returns the response with the body
+        left unread. Use it as a context manager to always free the
+        connection.
+        """
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        request_headers = {"Accept-Encoding": "gzip, deflate"}
+        if headers:
+            request_headers.update(headers)
+
+        connection, reused = self._acquire(key)
+        try:
+            response = self._send(connection, path, request_headers)
+        except (http.client.HTTPException, ConnectionError):
+            if not reused:
+                raise
+            # The server closed the idle keep-alive connection, retry once
+            connection = self._new_connection(key)
+            response = self._send(connection, path, request_headers)
+
+        return _TransportResponse(self, key, connection, response)
+
+    def close(self) -> None:
+        """Closes all pooled connections"""
+        with self._lock:
+            pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            for connection in pool:
+                connection.close()
+
+    def _send(self, connection, path: str, headers: dict):
+        """Sends the request on connection and returns the response"""
+        try:
+            if connection.sock is None:
+                instrumentation = self.instrumentation
+                started = time.perf_counter() if instrumentation is not None else None
+                connection.connect()
+                if started is not None:
+                    instrumentation.timing(
+                        "connect", _feed_name(path), time.perf_counter() - started
+                    )
+                connection.sock.settimeout(self.read_timeout)
+            connection.request("GET", path, headers=headers)
+            return connection.getresponse()
+        except BaseException:
+            connection.close()
+            raise
+
+    def _acquire(self, key):
+        """Returns a pooled connection for key if any, else a new one"""
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool:
+                return pool.pop(), True
+        return self._new_connection(key), False
+
+    def _release(self, key, connection) -> None:
+        """Returns connection to the pool or closes it if the pool is full"""
+        with self._lock:
+            pool = self._pools.setdefault(key, [])
+            if len(pool) < self.pool_size:
+                pool.append(connection)
+                return
+        connection.close()
+
+    def _new_connection(self, key):
+        """Creates a new connection for key"""
+        scheme, host, port = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=self.connect_timeout)
+        return http.client.HTTPConnection(host, port, timeout=self.connect_timeout)
+
+
+class KrisinformationRetryPolicy:
+    """
+    Retry policy for failed API requests
+
+    A request is tried at most attempts times. Before retry n the API sleeps
+    a random time between 0 and base_delay * 2 ** n, capped at max_delay, so
+    clients failing together do not retry together.
+    """
+
+    def __init__(
+        self,
+        attempts: int = RETRY_ATTEMPTS,
+        base_delay: float = RETRY_BASE_DELAY,
+        max_delay: float = RETRY_MAX_DELAY,
+        random_source=random.random,
+    ) -> None:
+        """Constructor"""
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._random = random_source
+
+    def delay(self, attempt: int) -> float:
+        """Returns the time to sleep before retrying after attempt"""
+        return self._random() * min(self.max_delay, self.base_delay * 2**attempt)
+
+    def should_retry(self, attempt: int, error: Exception) -> bool:
+        """If a request that failed on attempt (from 0) should be retried"""
+        if attempt + 1 >= self.attempts:
+            return False
+        if isinstance(error, KrisinformationStatusException):
+            return error.status >= 500 or error.status == 429
+        return True
+
+
+class KrisinformationCircuitBreaker:
+    """
+    Circuit breaker for the API
+
+    After failure_threshold failures in a row requests are refused without
+    touching the network for reset_timeout seconds. Then a single trial
+    request is let through, closing the circuit again if it succeeds.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        reset_timeout: float = RESET_TIMEOUT,
+        clock=time.monotonic,
+    ) -> None:
+        """Constructor"""
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """closed, open or half_open"""
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._trial or self._clock() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        """If a request may be made now"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial or self._clock() - self._opened_at < self.reset_timeout:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self) -> None:
+        """Closes the circuit"""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self) -> None:
+        """Counts a failure, opening the circuit at the threshold"""
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+                self._trial = False
+
+    def release(self) -> None:
+        """
+        Gives back the trial request let through by allow when it ended
+        without a result, like when cancelled, so another can be tried
+        """
+        with self._lock:
+            self._trial = False
+
+
+class KrisinformationRateLimiter:
+    """
+    Token bucket limiting the requests made to the API
+
+    The bucket holds at most burst tokens and gains rate tokens per second.
+    Every request takes a token. When none is left the request is not made
+    and the API serves the most recent data it has instead of waiting, so
+    bursts of callers do not add latency. Share one limiter between API
+    objects to limit them together.
+    """
+
+    def __init__(
+        self,
+        rate: float = RATE_LIMIT,
+        burst: float = RATE_BURST,
+        clock=time.monotonic,
+    ) -> None:
+        """Constructor"""
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._tokens = burst
+        self._updated = None
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        """Takes a token, False if there is none left"""
+        with self._lock:
+            allowed, self._tokens, self._updated = self._take(
+                self._tokens, self._updated
+            )
+            return allowed
+
+    def _take(self, tokens: float, updated: float) -> tuple:
+        """
+        Refills a bucket last updated at updated and takes a token. Returns
+        if one was taken and the new tokens and updated.
+        """
+        now = self._clock()
+        if updated is not None:
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            return False, tokens, now
+        return True, tokens - 1, now
+
+
+def json_decoder(name: str = None):
+    """
+    Returns a function decoding JSON from bytes or str with the json,
+    orjson or msgspec parser. By default orjson if installed, else json.
+    """
+    if name is None:
+        name = "orjson" if orjson is not None else "json"
+    if name == "json":
+        return json.loads
+    if name == "orjson":
+        if orjson is None:
+            raise ImportError("orjson is not installed")
+        return orjson.loads
+    if name == "msgspec":
+        try:
+            import msgspec  # pylint: disable=C0415
+        except ImportError:
+            raise ImportError("msgspec is not installed") from None
+        decoder = msgspec.json.Decoder()
+
+        def decode(data):
+            try:
+                return decoder.decode(data)
+            except msgspec.DecodeError as error:
+                # Count as a failed request like the other parsers' errors
+                raise ValueError(str(error)) from error
+
+        return decode
+    raise KrisinformationException("Unknown JSON decoder {}".format(name))
+
+
 class KrisinformationAPIBase:
     """
     Baseclass to use as dependecy incjection pattern for easier
@@ -173,6 +972,29 @@ class KrisinformationAPIBase:
             "users must define async_get_all_news_api to use this base class"
         )
 
+    def iter_news_api(self, longitude: str, latitude: str):
+        """Override this to yield the news while they are received"""
+        yield from self.get_all_news_api(longitude, latitude)
+
+    async def async_iter_news_api(self, longitude: str, latitude: str):
+        """Override this to yield the news while they are received"""
+        for news in await self.async_get_all_news_api(longitude, latitude):
+            yield news
+
+    async def async_get_endpoints_api(
+        self, names: List[str], concurrency: int = CONCURRENCY
+    ) -> dict:
+        """Override this to support fetching other endpoints than news"""
+        raise NotImplementedError(
+            "users must define async_get_endpoints_api to use this base class"
+        )
+
+    async def async_open(self) -> None:
+        """Override this to acquire resources used by the async calls"""
+
+    async def async_close(self) -> None:
+        """Override this to release resources acquired by async_open"""
+
 
 # pylint: disable=R0903
 
@@ -180,43 +1002,561 @@ class KrisinformationAPIBase:
 class KrisinformationAPI(KrisinformationAPIBase):
     """Default implementation for Krisinformation api"""
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        cache: KrisinformationCache = None,
+        base_url: str = None,
+        transport: KrisinformationHTTPTransport = None,
+        retry: KrisinformationRetryPolicy = None,
+        circuit_breaker: KrisinformationCircuitBreaker = None,
+        stale_while_error: bool = False,
+        limit_per_host: int = LIMIT_PER_HOST,
+        dns_cache_ttl: int = DNS_CACHE_TTL,
+        keepalive_timeout: float = KEEPALIVE_TIMEOUT,
+        instrumentation=None,
+        decoder=None,
+        rate_limiter: KrisinformationRateLimiter = None,
+    ) -> None:
         """Init the API with or without session"""
         self.session = None
+        self.cache = cache
+        self.base_url = base_url
+        self.instrumentation = instrumentation
+        # Decodes the response body bytes, see json_decoder
+        self.decoder = decoder if decoder is not None else json_decoder()
+        self.transport = (
+            transport
+            if transport is not None
+            else KrisinformationHTTPTransport(instrumentation=instrumentation)
+        )
+        self.retry = retry
+        self.circuit_breaker = circuit_breaker
+        self.stale_while_error = stale_while_error
+        self.rate_limiter = rate_limiter
+        self.stale = False
+        self._last_good = {}
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self._owns_session = False
+
+    def _url(self, endpoint: str) -> str:
+        """Returns the full url for an endpoint"""
+        return (self.base_url or BASEURL) + endpoint
+
+    def _conditional_headers(self, api_url: str) -> dict:
+        """Returns the revalidation headers for api_url if caching"""
+        if self.cache is None:
+            return {}
+        return self.cache.conditional_headers(api_url)
+
+    def _store(self, api_url: str, json_data, headers):
+        """Stores a successful response in the cache if caching"""
+        if self.cache is not None:
+            self.cache.store(
+                api_url, json_data, headers.get("ETag"), headers.get("Last-Modified")
+            )
+        return json_data
+
+    def _event(self, name: str, api_url: str) -> None:
+        """Reports an event if instrumented"""
+        if self.instrumentation is not None:
+            self.instrumentation.event(name, _feed_name(api_url))
+
+    def _circuit_allows(self, api_url: str) -> bool:
+        """If the circuit breaker lets a request through"""
+        if self.circuit_breaker is None or self.circuit_breaker.allow():
+            return True
+        self._event("circuit_open", api_url)
+        return False
+
+    def _release_trial(self) -> None:
+        """Releases the circuit breaker trial of an attempt without a result"""
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.release()
+
+    def _failed(self, api_url: str, error: Exception) -> None:
+        """Records a failed attempt"""
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record_failure()
+        if self.instrumentation is not None:
+            self.instrumentation.error(_feed_name(api_url), error)
+
+    def _should_retry(self, api_url: str, attempt: int, error: Exception) -> bool:
+        """Records a failed attempt and returns if it should be retried"""
+        self._failed(api_url, error)
+        if self.retry is None or not self.retry.should_retry(attempt, error):
+            return False
+        self._event("retry", api_url)
+        return True
+
+    def _succeeded(self, api_url: str, data):
+        """Records a successful request"""
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record_success()
+        if self.stale_while_error or self.rate_limiter is not None:
+            self._last_good[api_url] = data
+        self.stale = False
+        return data
+
+    def _fresh(self, api_url: str):
+        """
+        Returns the cached data for api_url if still fresh, else None. Checked
+        before the circuit breaker and the rate limiter, a cache hit is no
+        request, so it is not counted by either.
+        """
+        if self.cache is None:
+            return None
+        cached = self.cache.get_fresh(api_url)
+        if cached is not None:
+            self._event("cache_hit", api_url)
+            self.stale = False
+        return cached
+
+    def _rate_allows(self, api_url: str) -> bool:
+        """If the rate limiter lets a request through"""
+        return self.rate_limiter is None or self.rate_limiter.acquire()
+
+    def _throttled(self, api_url: str):
+        """Returns the most recent data for api_url when over the rate limit"""
+        self._event("rate_limited", api_url)
+        data = self.cache.get_stored(api_url) if self.cache is not None else None
+        if data is None:
+            data = self._last_good.get(api_url)
+        if data is None:
+            raise KrisinformationRateLimitException(
+                "Krisinformation API rate limit exceeded"
+            )
+        self.stale = True
+        return data
+
+    def _fallback(self, api_url: str, error: Exception):
+        """Returns the last good data for api_url if allowed, else raises"""
+        if self.stale_while_error and api_url in self._last_good:
+            self.stale = True
+            self._event("stale", api_url)
+            return self._last_good[api_url]
+        raise error
 
     def get_all_news_api(self, longitude: str, latitude: str):
         """gets data from API"""
-        api_url = BASEURL + NEWS_ENDPOINT
+        return self._get(self._url(NEWS_ENDPOINT))
 
-        response = urlopen(api_url)
-        data = response.read().decode("utf-8")
-        json_data = json.loads(data)
+    def get_endpoint_api(self, name: str):
+        """gets data from an endpoint registered in ENDPOINTS"""
+        return self._get(self._url(_endpoint(name)))
 
-        return json_data
+    def _get(self, api_url: str):
+        """Fetches api_url with retries, circuit breaker and stale fallback"""
+        cached = self._fresh(api_url)
+        if cached is not None:
+            return cached
+        for attempt in itertools.count():
+            if not self._circuit_allows(api_url):
+                return self._fallback(api_url, _circuit_open_exception())
+            if not self._rate_allows(api_url):
+                # A half-open circuit must not wait for a trial never made
+                self._release_trial()
+                return self._throttled(api_url)
+            try:
+                data = self._get_once(api_url)
+            except _FAILURES as error:
+                if not self._should_retry(api_url, attempt, error):
+                    return self._fallback(api_url, error)
+                time.sleep(self.retry.delay(attempt))
+            except BaseException:
+                self._release_trial()
+                raise
+            else:
+                return self._succeeded(api_url, data)
+
+    def _get_once(self, api_url: str):
+        """Fetches api_url using the transport"""
+        instrumentation = self.instrumentation
+        started = time.perf_counter() if instrumentation is not None else None
+        response = self.transport.open(api_url, self._conditional_headers(api_url))
+        if started is not None:
+            started = _report_timing(instrumentation, "request", api_url, started)
+        body = response.body
+        if started is not None:
+            started = _report_timing(instrumentation, "transfer", api_url, started)
+
+        if response.status == 304 and self.cache is not None:
+            self._event("cache_revalidated", api_url)
+            return self.cache.revalidated(api_url)
+        if response.status != 200:
+            raise _status_exception(response.status)
+
+        json_data = self.decoder(body)
+        if started is not None:
+            _report_timing(instrumentation, "decode", api_url, started)
+            instrumentation.size(_feed_name(api_url), len(body))
+            if self.cache is not None:
+                instrumentation.event("cache_miss", _feed_name(api_url))
+
+        return self._store(api_url, json_data, response.headers)
 
     async def async_get_all_news_api(self, longitude: str, latitude: str):
         """gets data from API asyncronious"""
-        api_url = BASEURL + NEWS_ENDPOINT
+        return await self._async_get(self._url(NEWS_ENDPOINT))
+
+    async def async_get_endpoint_api(self, name: str):
+        """gets data from an endpoint registered in ENDPOINTS asyncronious"""
+        return await self._async_get(self._url(_endpoint(name)))
+
+    async def async_get_endpoints_api(
+        self, names: List[str], concurrency: int = CONCURRENCY
+    ) -> dict:
+        """
+        gets data from several endpoints concurrently, at most concurrency
+        requests at a time. Returns a dict of endpoint name to data.
+        """
+        import asyncio  # pylint: disable=C0415
 
-        is_new_session = False
-        if self.session is None:
-            self.session = aiohttp.ClientSession()
-            is_new_session = True
+        api_urls = [self._url(_endpoint(name)) for name in names]
+        semaphore = asyncio.Semaphore(concurrency)
 
-        async with self.session.get(api_url) as response:
+        async def fetch(session, api_url):
+            async with semaphore:
+                return await self._async_fetch(session, api_url)
+
+        if self.session is not None:
+            results = await asyncio.gather(
+                *(fetch(self.session, api_url) for api_url in api_urls)
+            )
+        else:
+            # No session opened, use a short lived one for this batch only
+            async with self._new_session() as session:
+                results = await asyncio.gather(
+                    *(fetch(session, api_url) for api_url in api_urls)
+                )
+        return dict(zip(names, results))
+
+    async def _async_get(self, api_url: str):
+        """Fetches api_url using the opened or a short lived session"""
+        if self.session is not None:
+            return await self._async_fetch(self.session, api_url)
+
+        # No session opened, use a short lived one for this request only
+        async with self._new_session() as session:
+            return await self._async_fetch(session, api_url)
+
+    async def _async_fetch(self, session: "aiohttp.ClientSession", api_url: str):
+        """Fetches api_url with retries, circuit breaker and stale fallback"""
+        import asyncio  # pylint: disable=C0415
+
+        cached = self._fresh(api_url)
+        if cached is not None:
+            return cached
+        failures = _async_transport().FAILURES
+        for attempt in itertools.count():
+            if not self._circuit_allows(api_url):
+                return self._fallback(api_url, _circuit_open_exception())
+            if not self._rate_allows(api_url):
+                # A half-open circuit must not wait for a trial never made
+                self._release_trial()
+                return self._throttled(api_url)
+            try:
+                data = await self._async_fetch_once(session, api_url)
+            except failures as error:
+                if not self._should_retry(api_url, attempt, error):
+                    return self._fallback(api_url, error)
+                await asyncio.sleep(self.retry.delay(attempt))
+            except BaseException:
+                # Cancelled, the circuit breaker must not wait for a result
+                self._release_trial()
+                raise
+            else:
+                return self._succeeded(api_url, data)
+
+    async def _async_fetch_once(self, session: "aiohttp.ClientSession", api_url: str):
+        """Fetches api_url using session"""
+        instrumentation = self.instrumentation
+        started = time.perf_counter() if instrumentation is not None else None
+        async with session.get(
+            api_url,
+            headers=self._conditional_headers(api_url),
+            trace_request_ctx=api_url,
+        ) as response:
+            if started is not None:
+                started = _report_timing(instrumentation, "request", api_url, started)
+            if response.status == 304 and self.cache is not None:
+                self._event("cache_revalidated", api_url)
+                return self.cache.revalidated(api_url)
             if response.status != 200:
-                if is_new_session:
-                    await self.session.close()
-                raise KrisinformationException(
-                    "Failed to access Krisinformation API with status code {}".format(
-                        response.status
-                    )
+                raise _status_exception(response.status)
+            body = await response.read()
+            if started is not None:
+                started = _report_timing(instrumentation, "transfer", api_url, started)
+
+            json_data = self.decoder(body)
+            if started is not None:
+                _report_timing(instrumentation, "decode", api_url, started)
+                instrumentation.size(_feed_name(api_url), len(body))
+                if self.cache is not None:
+                    instrumentation.event("cache_miss", _feed_name(api_url))
+
+            return self._store(api_url, json_data, response.headers)
+
+    def iter_news_api(self, longitude: str, latitude: str):
+        """Yields the news from the API while the response is received"""
+        api_url = self._url(NEWS_ENDPOINT)
+
+        cached = self._fresh(api_url)
+        if cached is not None:
+            yield from cached
+            return
+        if not self._rate_allows(api_url):
+            yield from self._throttled(api_url)
+            return
+
+        for attempt in itertools.count():
+            if not self._circuit_allows(api_url):
+                yield from self._fallback(api_url, _circuit_open_exception())
+                return
+            received = self._received()
+            yielded = False
+            try:
+                for news in self._stream_once(api_url, received):
+                    yielded = True
+                    yield news
+            except _STREAM_FAILURES as error:
+                if yielded:
+                    # Part of the feed is delivered, it cannot be redone
+                    self._failed(api_url, error)
+                    raise
+                if not self._should_retry(api_url, attempt, error):
+                    yield from self._fallback(api_url, error)
+                    return
+                time.sleep(self.retry.delay(attempt))
+            except BaseException:
+                # Stopped by the caller before the end of the feed
+                self._release_trial()
+                raise
+            else:
+                self._succeeded(api_url, received)
+                return
+
+    def _received(self) -> list:
+        """Returns a list to collect streamed news in if they are kept"""
+        if self.cache is not None or self.stale_while_error:
+            return []
+        # Served when over the rate limit
+        return [] if self.rate_limiter is not None else None
+
+    def _stream_once(self, api_url: str, received: list):
+        """Streams the news from api_url using the transport"""
+        instrumentation = self.instrumentation
+        started = time.perf_counter() if instrumentation is not None else None
+        with self.transport.open(
+            api_url, self._conditional_headers(api_url)
+        ) as response:
+            if started is not None:
+                _report_timing(instrumentation, "request", api_url, started)
+            if response.status == 304 and self.cache is not None:
+                self._event("cache_revalidated", api_url)
+                cached = self.cache.revalidated(api_url)
+                if received is not None:
+                    received.extend(cached)
+                yield from cached
+                return
+            if response.status != 200:
+                raise _status_exception(response.status)
+
+            parser = _JSONArrayParser(self.decoder)
+            timer = _StreamTimer() if instrumentation is not None else None
+            for chunk in response.iter_chunks():
+                elements = (
+                    parser.feed(chunk) if timer is None else timer.feed(parser, chunk)
+                )
+                for news in elements:
+                    if received is not None:
+                        received.append(news)
+                    yield news
+                if timer is not None:
+                    timer.resume()
+            parser.close()
+            if timer is not None:
+                timer.report(instrumentation, api_url, self.cache is not None)
+            if self.cache is not None:
+                self._store(api_url, received, response.headers)
+
+    async def async_iter_news_api(self, longitude: str, latitude: str):
+        """Yields the news from the API while the response is received"""
+        api_url = self._url(NEWS_ENDPOINT)
+
+        cached = self._fresh(api_url)
+        if cached is not None:
+            for news in cached:
+                yield news
+            return
+        if not self._rate_allows(api_url):
+            for news in self._throttled(api_url):
+                yield news
+            return
+
+        if self.session is not None:
+            async for news in self._async_stream(self.session, api_url):
+                yield news
+            return
+
+        # No session opened, use a short lived one for this request only
+        async with self._new_session() as session:
+            async for news in self._async_stream(session, api_url):
+                yield news
+
+    async def _async_stream(self, session: "aiohttp.ClientSession", api_url: str):
+        """Streams api_url with retries, circuit breaker and stale fallback"""
+        import asyncio  # pylint: disable=C0415
+
+        failures = _async_transport().FAILURES + (KrisinformationException,)
+        for attempt in itertools.count():
+            if not self._circuit_allows(api_url):
+                for news in self._fallback(api_url, _circuit_open_exception()):
+                    yield news
+                return
+            received = self._received()
+            yielded = False
+            try:
+                async for news in self._async_stream_once(session, api_url, received):
+                    yielded = True
+                    yield news
+            except failures as error:
+                if yielded:
+                    # Part of the feed is delivered, it cannot be redone
+                    self._failed(api_url, error)
+                    raise
+                if not self._should_retry(api_url, attempt, error):
+                    for news in self._fallback(api_url, error):
+                        yield news
+                    return
+                await asyncio.sleep(self.retry.delay(attempt))
+            except BaseException:
+                # Cancelled or stopped by the caller before the end of the feed
+                self._release_trial()
+                raise
+            else:
+                self._succeeded(api_url, received)
+                return
+
+    async def _async_stream_once(
+        self, session: "aiohttp.ClientSession", api_url: str, received: list
+    ):
+        """Streams the news from api_url using session"""
+        instrumentation = self.instrumentation
+        started = time.perf_counter() if instrumentation is not None else None
+        async with session.get(
+            api_url,
+            headers=self._conditional_headers(api_url),
+            trace_request_ctx=api_url,
+        ) as response:
+            if started is not None:
+                _report_timing(instrumentation, "request", api_url, started)
+            if response.status == 304 and self.cache is not None:
+                self._event("cache_revalidated", api_url)
+                cached = self.cache.revalidated(api_url)
+                if received is not None:
+                    received.extend(cached)
+                for news in cached:
+                    yield news
+                return
+            if response.status != 200:
+                raise _status_exception(response.status)
+
+            parser = _JSONArrayParser(self.decoder)
+            timer = _StreamTimer() if instrumentation is not None else None
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                elements = (
+                    parser.feed(chunk) if timer is None else timer.feed(parser, chunk)
                 )
-            data = await response.text()
-            if is_new_session:
-                await self.session.close()
+                for news in elements:
+                    if received is not None:
+                        received.append(news)
+                    yield news
+                if timer is not None:
+                    timer.resume()
+            parser.close()
+            if timer is not None:
+                timer.report(instrumentation, api_url, self.cache is not None)
+            if self.cache is not None:
+                self._store(api_url, received, response.headers)
+
+    async def async_open(self) -> None:
+        """Opens a pooled keep-alive session used by all async requests"""
+        if self.session is not None:
+            return
+        transport = _async_transport()
+        connector = transport.new_connector(
+            self.limit_per_host, self.dns_cache_ttl, self.keepalive_timeout
+        )
+        self.session = transport.new_session(self.instrumentation, connector=connector)
+        self._owns_session = True
+
+    def _new_session(self) -> "aiohttp.ClientSession":
+        """Creates a short lived session"""
+        return _async_transport().new_session(self.instrumentation)
+
+    async def async_close(self) -> None:
+        """Closes the session if it was opened by async_open"""
+        if self._owns_session:
+            await self.session.close()
+            self.session = None
+            self._owns_session = False
+
+
+# Errors that count as a failed request, async_transport adds the async ones
+_FAILURES = (
+    KrisinformationStatusException,
+    OSError,
+    ValueError,
+    http.client.HTTPException,
+)
+# A streamed feed can also be cut off or malformed
+_STREAM_FAILURES = _FAILURES + (KrisinformationException,)
+
+
+def _async_transport():
+    """Imports the aiohttp parts on first async use"""
+    from krisinformation import async_transport  # pylint: disable=C0415
+
+    return async_transport
+
+
+def _feed_name(api_url: str) -> str:
+    """Returns the feed name instrumentation is reported for, like news"""
+    return urlsplit(api_url).path.rstrip("/").rsplit("/", 1)[-1]
+
+
+def _report_timing(instrumentation, phase: str, api_url: str, started: float) -> float:
+    """Reports the time since started and returns the current time"""
+    now = time.perf_counter()
+    instrumentation.timing(phase, _feed_name(api_url), now - started)
+    return now
 
-            return json.loads(data)
+
+def _circuit_open_exception() -> KrisinformationCircuitOpenException:
+    """Returns the exception for a request stopped by the circuit breaker"""
+    return KrisinformationCircuitOpenException(
+        "Krisinformation API circuit breaker is open"
+    )
+
+
+def _endpoint(name: str) -> str:
+    """Returns the path of a registered endpoint"""
+    try:
+        return ENDPOINTS[name]
+    except KeyError:
+        raise KrisinformationException(
+            "Unknown Krisinformation API endpoint {}".format(name)
+        ) from None
+
+
+def _status_exception(status: int) -> KrisinformationException:
+    """Returns the exception for an unexpected status code"""
+    return KrisinformationStatusException(
+        "Failed to access Krisinformation API with status code {}".format(status),
+        status,
+    )
 
 
 class Krisinformation:
@@ -228,22 +1568,55 @@ class Krisinformation:
         self,
         longitude: str,
         latitude: str,
-        session: aiohttp.ClientSession = None,
-        api: KrisinformationAPIBase = KrisinformationAPI(),
+        session: "aiohttp.ClientSession" = None,
+        api: KrisinformationAPIBase = None,
+        typed: bool = False,
+        store=None,
+        instrumentation=None,
     ) -> None:
         self._longitude = str(round(float(longitude), 6))
         self._latitude = str(round(float(latitude), 6))
-        self._api = api
+        self._api = api if api is not None else KrisinformationAPI()
+        self._typed = typed
+        # Reports the convert phase and news counts, by default to the api's
+        self._instrumentation = (
+            instrumentation
+            if instrumentation is not None
+            else getattr(self._api, "instrumentation", None)
+        )
+        self._news_index = {}
+        self._spatial_index = None
+        self._store = store
+        self._snapshot = None
 
         if session:
             self._api.session = session
 
+    async def __aenter__(self) -> "Krisinformation":
+        await self._api.async_open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.async_close()
+
+    async def async_close(self) -> None:
+        """Releases the pooled session opened by async with"""
+        await self._api.async_close()
+
+    @property
+    def is_stale(self) -> bool:
+        """
+        If the last result was the last good feed served because the API
+        failed, see KrisinformationAPI stale_while_error
+        """
+        return getattr(self._api, "stale", False)
+
     def get_all_news(self) -> List[KrisinformationNews]:
         """
         Returns a list of news.
         """
         json_data = self._api.get_all_news_api(self._longitude, self._latitude)
-        return _get_all_news(json_data)
+        return self._stored(json_data, self._convert(json_data))
 
     async def async_get_all_news(self) -> List[KrisinformationNews]:
         """
@@ -252,60 +1625,576 @@ class Krisinformation:
         json_data = await self._api.async_get_all_news_api(
             self._longitude, self._latitude
         )
-        return _get_all_news(json_data)
+        return self._stored(json_data, self._convert(json_data))
+
+    def _convert(self, json_data, feed: str = "news") -> List[KrisinformationNews]:
+        """Builds the news of a feed, timing it if instrumented"""
+        instrumentation = self._instrumentation
+        if instrumentation is None:
+            return _get_all_news(json_data, self._typed)
+        started = time.perf_counter()
+        news_list = _get_all_news(json_data, self._typed)
+        instrumentation.timing("convert", feed, time.perf_counter() - started)
+        instrumentation.items(feed, len(news_list))
+        return news_list
+
+    async def async_get_feeds(
+        self, names: List[str] = None, concurrency: int = CONCURRENCY
+    ) -> dict:
+        """
+        Returns a dict of endpoint name to news list for the given names,
+        all registered endpoints by default. The endpoints are fetched
+        concurrently, at most concurrency at a time.
+        """
+        if names is None:
+            names = list(ENDPOINTS)
+        results = await self._api.async_get_endpoints_api(names, concurrency)
+        return {name: self._convert(data, name) for name, data in results.items()}
+
+    def iter_news(self):
+        """
+        Yields the news one by one while the response is still received.
+        """
+        convert = _get_typed_news_from_api if self._typed else _get_news_from_api
+        if self._instrumentation is not None:
+            convert = _ConvertTimer(convert)
+        for news in self._api.iter_news_api(self._longitude, self._latitude):
+            yield convert(news)
+        if self._instrumentation is not None:
+            convert.report(self._instrumentation, "news")
+
+    async def aiter_news(self):
+        """
+        Yields the news one by one while the response is still received.
+        """
+        convert = _get_typed_news_from_api if self._typed else _get_news_from_api
+        if self._instrumentation is not None:
+            convert = _ConvertTimer(convert)
+        async for news in self._api.async_iter_news_api(
+            self._longitude, self._latitude
+        ):
+            yield convert(news)
+        if self._instrumentation is not None:
+            convert.report(self._instrumentation, "news")
+
+    def get_news_for_point(
+        self, longitude: float, latitude: float, radius_km: float = None
+    ) -> List[KrisinformationNews]:
+        """
+        Returns the news with an area containing the point or within
+        radius_km of it. News for the whole country are always included.
+        """
+        return self._query_spatial(self.get_all_news(), longitude, latitude, radius_km)
+
+    async def async_get_news_for_point(
+        self, longitude: float, latitude: float, radius_km: float = None
+    ) -> List[KrisinformationNews]:
+        """
+        Returns the news with an area containing the point or within
+        radius_km of it. News for the whole country are always included.
+        """
+        return self._query_spatial(
+            await self.async_get_all_news(), longitude, latitude, radius_km
+        )
+
+    def get_news_near(self, radius_km: float = None) -> List[KrisinformationNews]:
+        """
+        Returns the news concerning the location given to the constructor
+        """
+        return self.get_news_for_point(self._longitude, self._latitude, radius_km)
+
+    async def async_get_news_near(
+        self, radius_km: float = None
+    ) -> List[KrisinformationNews]:
+        """
+        Returns the news concerning the location given to the constructor
+        """
+        return await self.async_get_news_for_point(
+            self._longitude, self._latitude, radius_km
+        )
+
+    def _query_spatial(
+        self, news_list, longitude, latitude, radius_km
+    ) -> List[KrisinformationNews]:
+        """Updates the spatial index with news_list and queries it"""
+        # pylint: disable=C0415
+        from krisinformation.spatial import RADIUS_KM, KrisinformationSpatialIndex
+
+        if self._spatial_index is None:
+            self._spatial_index = KrisinformationSpatialIndex()
+        self._spatial_index.update(news_list)
+        return self._spatial_index.query(
+            float(longitude),
+            float(latitude),
+            RADIUS_KM if radius_km is None else radius_km,
+        )
+
+    def poll_changes(self) -> KrisinformationChanges:
+        """
+        Returns the news added, updated and removed since the last poll.
+        The first poll reports every news as added, unless a store holds
+        the news from an earlier run.
+        """
+        json_data = self._api.get_all_news_api(self._longitude, self._latitude)
+        return self._apply_changes(json_data)
+
+    async def async_poll_changes(self) -> KrisinformationChanges:
+        """
+        Returns the news added, updated and removed since the last poll.
+        The first poll reports every news as added, unless a store holds
+        the news from an earlier run.
+        """
+        json_data = await self._api.async_get_all_news_api(
+            self._longitude, self._latitude
+        )
+        return self._apply_changes(json_data)
+
+    def subscribe(self, callback, **options):
+        """
+        Starts a background poller calling callback with the changes of
+        the feed. options are passed to KrisinformationPoller. Returns the
+        poller, stop it with await poller.stop().
+        """
+        return self.changes(**options).start(callback)
+
+    def changes(self, **options):
+        """
+        Returns a poller to iterate the changes of the feed with
+        async for. options are passed to KrisinformationPoller.
+        """
+        # pylint: disable=C0415
+        from krisinformation.poller import KrisinformationPoller
+
+        return KrisinformationPoller(self, **options)
+
+    def get_snapshot(self) -> List[KrisinformationNews]:
+        """
+        Returns the news saved in the store by the last fetch without
+        touching the network, so a restarted process can serve at once
+        while reconcile fetches the current feed.
+        """
+        self._load_store()
+        return self._snapshot if self._snapshot is not None else []
+
+    def reconcile(self) -> threading.Thread:
+        """
+        Starts a background thread fetching the feed into the store and the
+        snapshot. Returns the thread. If the API fails the snapshot is kept.
+        """
+        self._load_store()
+        thread = threading.Thread(target=self._reconcile, daemon=True)
+        thread.start()
+        return thread
+
+    def _reconcile(self) -> None:
+        """Fetches the feed into the store, keeping the snapshot on errors"""
+        try:
+            self.get_all_news()
+        except _STREAM_FAILURES:
+            pass
+
+    def async_reconcile(self) -> "asyncio.Task":
+        """
+        Starts a task fetching the feed into the store and the snapshot.
+        Returns the task. If the API fails the snapshot is kept.
+        """
+        import asyncio  # pylint: disable=C0415
+
+        self._load_store()
+        return asyncio.ensure_future(self._async_reconcile())
+
+    async def _async_reconcile(self) -> None:
+        """Fetches the feed into the store, keeping the snapshot on errors"""
+        try:
+            await self.async_get_all_news()
+        except _async_transport().FAILURES + (KrisinformationException,):
+            pass
+
+    def _load_store(self) -> None:
+        """Loads the news of the previous run from the store, once"""
+        if self._snapshot is not None or self._store is None:
+            return
+        self._snapshot = _get_all_news(self._store.load(), self._typed)
+        if not self._news_index:
+            # Continue from the previous run instead of reporting all as new
+            self._news_index = {news.identifier: news for news in self._snapshot}
+
+    def _stored(self, json_data, news_list: List[KrisinformationNews]):
+        """Saves a fetched feed in the store, only writing what changed"""
+        if self._store is not None:
+            self._load_store()
+            self._store.save(json_data)
+            self._snapshot = news_list
+        return news_list
+
+    def _apply_changes(self, json_data) -> KrisinformationChanges:
+        """Diffs the feed against the last poll and remembers it"""
+        news_list = _get_all_news(json_data, self._typed)
+        self._load_store()
+        changes, self._news_index = _diff_news(self._news_index, news_list)
+        if self._store is not None:
+            if changes:
+                self._store.save(json_data)
+            self._snapshot = news_list
+        return changes
+
+
+def _diff_news(index: dict, news_list: List[KrisinformationNews]):
+    """
+    Diffs news_list against an index of identifier to news from an earlier
+    poll. Returns the changes and the index for news_list.
+    """
+    new_index = {}
+    added = []
+    updated = []
+    for news in news_list:
+        new_index[news.identifier] = news
+        previous = index.get(news.identifier)
+        if previous is None:
+            added.append(news)
+        elif previous.updated != news.updated:
+            updated.append(news)
+    removed = [
+        news for identifier, news in index.items() if identifier not in new_index
+    ]
+    return KrisinformationChanges(added, updated, removed), new_index
 
 
 # pylint: disable=R0914, R0912, W0212, R0915
-def _get_all_news(api_result: dict) -> List[KrisinformationNews]:
+def _get_all_news(api_result: dict, typed: bool = False) -> List[KrisinformationNews]:
     """Converts results from API to KrisinformationNews list"""
-    news = _get_all_news_from_api(api_result)
+    news = _get_all_news_from_api(api_result, typed)
     return news
 
 
 # pylint: disable=R0914, R0912, W0212, R0915
 
 
-def _get_all_news_from_api(api_result: dict) -> List[KrisinformationNews]:
+def _get_all_news_from_api(
+    api_result: dict, typed: bool = False
+) -> List[KrisinformationNews]:
     """Converts results from API to KrisinformationNews list"""
-    news_list = []
+    convert = _get_typed_news_from_api if typed else _get_news_from_api
+    return [convert(news) for news in api_result]
+
+
+def _get_news_from_api(news: dict) -> KrisinformationNews:
+    """Converts one news from the API to KrisinformationNews"""
     # Get the parameters
-    for news in api_result:
-        identifier = str(news["Identifier"])
-        push_message = str(news["PushMessage"])
-        updated = news["Updated"]
-        published = news["Published"]
-        headline = str(news["Headline"])
-        preamble = str(news["Preamble"])
-        body_text = str(news["BodyText"])
-        image_link = str(news["ImageLink"])
-        links = str(news["Links"])
-        area = str(news["Area"])
-        web = str(news["Web"])
-        language = str(news["Language"])
-        event = str(news["Event"])
-        sender_name = str(news["SenderName"])
-        push = str(news["Push"])
-        body_links = str(news["BodyLinks"])
-        source_id = str(news["SourceID"])
-
-        news = KrisinformationNews(
-            identifier,
-            push_message,
-            updated,
-            published,
-            headline,
-            preamble,
-            body_text,
-            image_link,
-            links,
-            area,
-            web,
-            language,
-            event,
-            sender_name,
-            push,
-            body_links,
-            source_id,
+    identifier = str(news["Identifier"])
+    push_message = str(news["PushMessage"])
+    updated = news["Updated"]
+    published = news["Published"]
+    headline = str(news["Headline"])
+    preamble = str(news["Preamble"])
+    body_text = str(news["BodyText"])
+    image_link = str(news["ImageLink"])
+    links = str(news["Links"])
+    area = str(news["Area"])
+    web = str(news["Web"])
+    language = str(news["Language"])
+    event = str(news["Event"])
+    sender_name = str(news["SenderName"])
+    push = str(news["Push"])
+    body_links = str(news["BodyLinks"])
+    source_id = str(news["SourceID"])
+
+    return KrisinformationNews(
+        identifier,
+        push_message,
+        updated,
+        published,
+        headline,
+        preamble,
+        body_text,
+        image_link,
+        links,
+        area,
+        web,
+        language,
+        event,
+        sender_name,
+        push,
+        body_links,
+        source_id,
+        areas=news["Area"],
+    )
+
+
+def _get_typed_news_from_api(news: dict) -> TypedKrisinformationNews:
+    """Converts one news from the API to TypedKrisinformationNews"""
+    source_id = news["SourceID"]
+    return TypedKrisinformationNews(
+        str(news["Identifier"]),
+        news["PushMessage"],
+        news["Updated"],
+        news["Published"],
+        news["Headline"],
+        news["Preamble"],
+        news["BodyText"],
+        news["ImageLink"],
+        news["Links"],
+        news["Area"],
+        news["Web"],
+        news["Language"],
+        news["Event"],
+        news["SenderName"],
+        bool(news["Push"]),
+        news["BodyLinks"],
+        int(source_id) if source_id is not None else None,
+    )
+
+
+# fromisoformat before Python 3.11 only takes 3 or 6 digit fractions
+_FRACTION = re.compile(r"\.(\d+)")
+
+
+def _microsecond_fraction(match) -> str:
+    """Returns a fraction of a second as exactly 6 digits"""
+    return "." + match.group(1)[:6].ljust(6, "0")
+
+
+def _parse_datetime(value) -> datetime:
+    """Parses an ISO 8601 timestamp from the API"""
+    if isinstance(value, datetime):
+        return value
+    if not value:
+        return None
+    value = _FRACTION.sub(_microsecond_fraction, value, 1)
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    return datetime.fromisoformat(value)
+
+
+def _parse_links(links) -> List[KrisinformationLink]:
+    """Converts links from the API to KrisinformationLink list"""
+    return [
+        KrisinformationLink(link.get("Text"), link.get("Url")) for link in links or ()
+    ]
+
+
+def _parse_areas(areas) -> List[KrisinformationArea]:
+    """Converts areas from the API to KrisinformationArea list"""
+    result = []
+    for area in areas or ():
+        center = area.get("CoordinateObject") or {}
+        result.append(
+            KrisinformationArea(
+                area.get("Type"),
+                area.get("Description"),
+                area.get("Coordinate"),
+                _to_float(center.get("Longitude")),
+                _to_float(center.get("Latitude")),
+                _to_float(center.get("Altitude")),
+                area.get("GeometryInformation"),
+            )
         )
-        news_list.append(news)
-    return news_list
+    return result
+
+
+def news_areas(news: KrisinformationNews) -> List[KrisinformationArea]:
+    """Returns the areas of typed or untyped news as KrisinformationArea"""
+    if isinstance(news, TypedKrisinformationNews):
+        return news.area
+    # pylint: disable=W0212
+    areas = news._areas if news._areas is not None else news._area
+    if isinstance(areas, list):
+        return _parse_areas(areas)
+    return []
+
+
+def _to_float(value) -> float:
+    """Converts a number from the API to float, None if missing"""
+    if value is None or value == "":
+        return None
+    return float(value)
+
+
+def _coordinate_texts(value):
+    """Yields all coordinate strings found in geometry information"""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _coordinate_texts(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _coordinate_texts(item)
+
+
+def _parse_coordinates(text: str) -> List[tuple]:
+    """
+    Parses a coordinate string like "14.30,55.92 14.31,55.93 0" to
+    (longitude, latitude) points. Tokens without a comma are altitudes.
+    """
+    points = []
+    for token in text.split():
+        if "," not in token:
+            continue
+        values = token.split(",")
+        try:
+            points.append((float(values[0]), float(values[1])))
+        except ValueError:
+            continue
+    return points
+
+
+# JSON structure is ASCII and UTF-8 never uses ASCII bytes inside other
+# characters, so the parser scans the bytes as received
+_ELEMENT_START = re.compile(rb"[^\s,]")
+_STRUCTURE = re.compile(rb'["{}\[\]]')
+_STRING_END = re.compile(rb'["\\]')
+
+
+class _StreamTimer:
+    """
+    Splits the time of a streamed response into waiting for the body and
+    decoding it, leaving out the time the caller spends on the news
+    """
+
+    def __init__(self) -> None:
+        """Constructor"""
+        self.transfer = 0.0
+        self.decode = 0.0
+        self.size = 0
+        self._mark = time.perf_counter()
+
+    def feed(self, parser: "_JSONArrayParser", chunk: bytes) -> list:
+        """Feeds a received chunk to parser and returns the elements"""
+        now = time.perf_counter()
+        self.transfer += now - self._mark
+        self.size += len(chunk)
+        elements = parser.feed(chunk)
+        self.decode += time.perf_counter() - now
+        return elements
+
+    def resume(self) -> None:
+        """Starts waiting for the next chunk, after the caller got the news"""
+        self._mark = time.perf_counter()
+
+    def report(self, instrumentation, api_url: str, cached: bool) -> None:
+        """Reports the times and size of the whole response"""
+        feed = _feed_name(api_url)
+        instrumentation.timing("transfer", feed, self.transfer)
+        instrumentation.timing("decode", feed, self.decode)
+        instrumentation.size(feed, self.size)
+        if cached:
+            instrumentation.event("cache_miss", feed)
+
+
+class _ConvertTimer:
+    """
+    Builds streamed news with convert, timing it
+    """
+
+    def __init__(self, convert) -> None:
+        """Constructor"""
+        self._convert = convert
+        self.seconds = 0.0
+        self.count = 0
+
+    def __call__(self, news: dict) -> KrisinformationNews:
+        started = time.perf_counter()
+        result = self._convert(news)
+        self.seconds += time.perf_counter() - started
+        self.count += 1
+        return result
+
+    def report(self, instrumentation, feed: str) -> None:
+        """Reports the time and number of news of the whole feed"""
+        instrumentation.timing("convert", feed, self.seconds)
+        instrumentation.items(feed, self.count)
+
+
+class _JSONArrayParser:
+    """
+    Incremental parser for a JSON array of objects
+
+    Bytes are fed as they arrive and every element is decoded as soon as
+    its closing bracket is seen, straight from the received bytes, so only
+    the element being received is held.
+    """
+
+    def __init__(self, decoder=json.loads) -> None:
+        """Constructor"""
+        self._decode_json = decoder
+        self._buffer = b""
+        self._pos = 0
+        self._start = 0
+        self._depth = 0
+        self._in_string = False
+        self._started = False
+        self.done = False
+
+    def feed(self, data: bytes) -> list:
+        """Feeds the next chunk and returns the elements it completed"""
+        self._buffer += data
+        return self._parse()
+
+    def close(self) -> None:
+        """Checks that the whole array was received"""
+        self._parse()
+        if not self.done:
+            raise KrisinformationException("Incomplete JSON array from API")
+
+    # pylint: disable=R0912
+    def _parse(self) -> list:
+        """Scans the buffer for complete elements"""
+        elements = []
+        buffer = self._buffer
+        pos = self._pos
+        while not self.done:
+            if self._in_string:
+                match = _STRING_END.search(buffer, pos)
+                if match is None:
+                    pos = len(buffer)
+                    break
+                if match.group() == b"\\":
+                    if match.end() >= len(buffer):
+                        # Wait for the escaped character
+                        pos = match.start()
+                        break
+                    pos = match.end() + 1
+                    continue
+                self._in_string = False
+                pos = match.end()
+            elif self._depth == 0:
+                match = _ELEMENT_START.search(buffer, pos)
+                if match is None:
+                    pos = len(buffer)
+                    break
+                char = match.group()
+                pos = match.end()
+                if not self._started:
+                    if char != b"[":
+                        raise KrisinformationException("Expected JSON array from API")
+                    self._started = True
+                elif char == b"]":
+                    self.done = True
+                elif char in b"{[":
+                    self._start = match.start()
+                    self._depth = 1
+                else:
+                    raise KrisinformationException("Expected JSON object from API")
+            else:
+                match = _STRUCTURE.search(buffer, pos)
+                if match is None:
+                    pos = len(buffer)
+                    break
+                char = match.group()
+                pos = match.end()
+                if char == b'"':
+                    self._in_string = True
+                elif char in b"{[":
+                    self._depth += 1
+                else:
+                    self._depth -= 1
+                    if self._depth == 0:
+                        elements.append(self._decode_json(buffer[self._start : pos]))
+
+        # Only keep the bytes of the element being received
+        keep = self._start if self._depth else pos
+        self._buffer = buffer[keep:]
+        self._pos = pos - keep
+        self._start = 0
+        return elements
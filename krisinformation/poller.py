@@ -0,0 +1,108 @@
+"""
+Module poller contains a background poller that delivers the changes of the
+news feed with an adaptive polling interval
+"""
+import asyncio
+import inspect
+import logging
+import random
+
+from krisinformation.krisinformation_lib import KrisinformationChanges
+
+_LOGGER = logging.getLogger(__name__)
+
+MIN_INTERVAL = 10
+MAX_INTERVAL = 300
+BACKOFF = 2.0
+JITTER = 0.1
+
+
+class KrisinformationPoller:
+    """
+    Polls a Krisinformation instance and delivers only the changes
+
+    The interval drops to min_interval as soon as the feed changes and is
+    multiplied by backoff for every quiet poll up to max_interval. Every
+    sleep is spread by +-jitter so many clients do not poll in step. sleep
+    and random can be replaced to drive the poller with a fake clock.
+    """
+
+    def __init__(
+        self,
+        krisinformation,
+        min_interval: float = MIN_INTERVAL,
+        max_interval: float = MAX_INTERVAL,
+        backoff: float = BACKOFF,
+        jitter: float = JITTER,
+        sleep=asyncio.sleep,
+        random_source=random.random,
+    ) -> None:
+        """Constructor"""
+        self._krisinformation = krisinformation
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        self.interval = min_interval
+        self._sleep = sleep
+        self._random = random_source
+        self._task = None
+
+    def next_delay(self, changed: bool) -> float:
+        """Adapts the interval to the last poll and returns the next sleep"""
+        if changed:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+        return self.interval * (1 + self.jitter * (2 * self._random() - 1))
+
+    async def poll_once(self) -> KrisinformationChanges:
+        """Polls once, errors are logged and treated as a quiet poll"""
+        try:
+            return await self._krisinformation.async_poll_changes()
+        except Exception:  # pylint: disable=W0703
+            _LOGGER.exception("Failed to poll Krisinformation")
+            return KrisinformationChanges([], [], [])
+
+    async def __aiter__(self):
+        while True:
+            changes = await self.poll_once()
+            if changes:
+                yield changes
+            await self._sleep(self.next_delay(bool(changes)))
+
+    def start(self, callback) -> "KrisinformationPoller":
+        """
+        Runs the poller as a background task calling callback with every
+        change. callback may be a coroutine function.
+        """
+        if self._task is not None:
+            raise RuntimeError("Poller already started")
+        self._task = asyncio.ensure_future(self._run(callback))
+        return self
+
+    async def stop(self) -> None:
+        """Stops the background task"""
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    @property
+    def running(self) -> bool:
+        """If the background task is running"""
+        return self._task is not None and not self._task.done()
+
+    async def _run(self, callback) -> None:
+        """Delivers every change to callback"""
+        async for changes in self:
+            try:
+                result = callback(changes)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:  # pylint: disable=W0703
+                _LOGGER.exception("Krisinformation subscriber failed")
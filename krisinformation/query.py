@@ -0,0 +1,156 @@
+"""
+Module query contains an in-memory full-text and facet index over the news
+"""
+import bisect
+from datetime import datetime
+import html
+import re
+from typing import List
+
+from krisinformation.krisinformation_lib import KrisinformationNews, _parse_datetime
+
+FACETS = ("event", "sender_name", "language")
+TEXT_FIELDS = ("headline", "preamble", "body_text")
+
+_TAG = re.compile(r"<[^>]*>")
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Returns the lower case words of a text, ignoring HTML markup"""
+    if not text:
+        return []
+    return _WORD.findall(html.unescape(_TAG.sub(" ", text)).lower())
+
+
+class KrisinformationQueryIndex:
+    """
+    Full-text and facet index over a news feed
+
+    Words of headline, preamble and body_text are kept in an inverted index,
+    event, sender_name and language in one index per facet and published in
+    a sorted list, so a query only intersects the sets it needs instead of
+    scanning every news. update only re-indexes news that were added or
+    changed since the previous update.
+    """
+
+    def __init__(self) -> None:
+        """Constructor"""
+        self._news = {}
+        self._order = {}
+        self._words = {}
+        self._words_of = {}
+        self._facets = {facet: {} for facet in FACETS}
+        self._published = []
+        self._published_of = {}
+
+    def __len__(self) -> int:
+        return len(self._news)
+
+    def update(self, news_list: List[KrisinformationNews]) -> None:
+        """Makes the index reflect news_list"""
+        seen = set()
+        for position, news in enumerate(news_list):
+            identifier = news.identifier
+            seen.add(identifier)
+            self._order[identifier] = position
+            previous = self._news.get(identifier)
+            if previous is not None and previous.updated == news.updated:
+                continue
+            if previous is not None:
+                self._remove(identifier)
+            self._add(news)
+
+        for identifier in [key for key in self._news if key not in seen]:
+            self._remove(identifier)
+            del self._order[identifier]
+
+    # pylint: disable=R0913
+    def query(
+        self,
+        text: str = None,
+        event: str = None,
+        sender_name: str = None,
+        language: str = None,
+        since: datetime = None,
+        until: datetime = None,
+    ) -> List[KrisinformationNews]:
+        """
+        Returns the news matching every given condition, in feed order.
+        text matches news containing all its words, since and until limit
+        the published time (inclusive).
+        """
+        candidates = []
+        for word in set(tokenize(text)):
+            candidates.append(self._words.get(word, set()))
+        for facet, value in zip(FACETS, (event, sender_name, language)):
+            if value is not None:
+                candidates.append(self._facets[facet].get(value, set()))
+        if since is not None or until is not None:
+            candidates.append(self._published_between(since, until))
+
+        if not candidates:
+            matched = self._news.keys()
+        else:
+            candidates.sort(key=len)
+            matched = set(candidates[0]).intersection(*candidates[1:])
+
+        order = self._order
+        return [self._news[identifier] for identifier in sorted(matched, key=order.get)]
+
+    def facet_counts(self, facet: str) -> dict:
+        """Returns the number of news per value of a facet"""
+        return {value: len(ids) for value, ids in self._facets[facet].items()}
+
+    def _published_between(self, since: datetime, until: datetime) -> set:
+        """Returns the news published within the window"""
+        start = 0
+        end = len(self._published)
+        if since is not None:
+            start = bisect.bisect_left(self._published, (since.timestamp(), ""))
+        if until is not None:
+            end = bisect.bisect_right(self._published, (until.timestamp(), "\uffff"))
+        return {identifier for _, identifier in self._published[start:end]}
+
+    def _add(self, news: KrisinformationNews) -> None:
+        """Indexes news"""
+        identifier = news.identifier
+        self._news[identifier] = news
+
+        words = set()
+        for field in TEXT_FIELDS:
+            words.update(tokenize(getattr(news, field)))
+        for word in words:
+            self._words.setdefault(word, set()).add(identifier)
+        self._words_of[identifier] = words
+
+        for facet in FACETS:
+            value = getattr(news, facet)
+            self._facets[facet].setdefault(value, set()).add(identifier)
+
+        published = _parse_datetime(news.published)
+        if published is not None:
+            entry = (published.timestamp(), identifier)
+            bisect.insort(self._published, entry)
+            self._published_of[identifier] = entry
+
+    def _remove(self, identifier: str) -> None:
+        """Removes news from the index"""
+        news = self._news.pop(identifier)
+
+        for word in self._words_of.pop(identifier):
+            ids = self._words[word]
+            ids.discard(identifier)
+            if not ids:
+                del self._words[word]
+
+        for facet in FACETS:
+            values = self._facets[facet]
+            value = getattr(news, facet)
+            values[value].discard(identifier)
+            if not values[value]:
+                del values[value]
+
+        entry = self._published_of.pop(identifier, None)
+        if entry is not None:
+            del self._published[bisect.bisect_left(self._published, entry)]
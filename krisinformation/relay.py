@@ -0,0 +1,296 @@
+"""
+Module relay contains a relay server that polls the Krisinformation API once
+and serves the feed and its changes to many local clients, and the API
+client that reads from it. Needs aiohttp.
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+
+from aiohttp import web
+
+from krisinformation.krisinformation_lib import (
+    KrisinformationAPI,
+    KrisinformationAPIBase,
+    KrisinformationCache,
+    KrisinformationChanges,
+    _diff_news,
+    _get_all_news,
+    _status_exception,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+INTERVAL = 60
+QUEUE_SIZE = 16
+HEARTBEAT = 30
+
+
+class KrisinformationRelay:
+    """
+    Relay server for the news feed
+
+    Polls upstream every interval seconds and keeps the latest feed in
+    memory, serialized and gzipped once per change. Serves:
+
+      /v3/news: the feed in API format with an ETag, so KrisinformationAPI
+        with the relay as base_url works unchanged
+      /v3/events: Server-Sent Events
+      /v3/ws: WebSocket
+
+    Both event streams first get a snapshot event with the current version
+    and then a changes event with the added, updated and removed news for
+    every change. Every client has a queue of queue_size events; a client
+    too slow to keep up gets its queue replaced by a single resync event
+    telling it to fetch the feed again, so slow clients never hold up the
+    others or grow memory.
+    """
+
+    def __init__(
+        self,
+        api: KrisinformationAPIBase = None,
+        interval: float = INTERVAL,
+        queue_size: int = QUEUE_SIZE,
+    ) -> None:
+        """Constructor"""
+        self._api = api if api is not None else KrisinformationAPI()
+        self.interval = interval
+        self.queue_size = queue_size
+        self.version = 0
+        self.resyncs = 0
+        self.port = None
+        self._index = {}
+        self._body = None
+        self._gzip_body = None
+        self._etag = None
+        # Queue of every connected client to the task streaming it
+        self._clients = {}
+        self._task = None
+        self._runner = None
+        self.app = web.Application()
+        self.app.router.add_get("/v3/news", self._handle_news)
+        self.app.router.add_get("/v3/events", self._handle_events)
+        self.app.router.add_get("/v3/ws", self._handle_websocket)
+
+    @property
+    def clients(self) -> int:
+        """Number of connected event stream clients"""
+        return len(self._clients)
+
+    async def poll_once(self) -> KrisinformationChanges:
+        """Fetches the feed from upstream and publishes the changes"""
+        return self.update(await self._api.async_get_all_news_api("", ""))
+
+    def update(self, api_result: list) -> KrisinformationChanges:
+        """Makes api_result the served feed and publishes the changes"""
+        changes, self._index = _diff_news(self._index, _get_all_news(api_result))
+        if self._body is not None and not changes:
+            return changes
+
+        self.version += 1
+        self._body = json.dumps(api_result).encode("utf-8")
+        self._gzip_body = gzip.compress(self._body)
+        self._etag = '"{}"'.format(hashlib.sha1(self._body).hexdigest())
+        if changes:
+            raw = {str(news["Identifier"]): news for news in api_result}
+            self._broadcast(
+                "changes",
+                json.dumps(
+                    {
+                        "version": self.version,
+                        "added": [raw[news.identifier] for news in changes.added],
+                        "updated": [raw[news.identifier] for news in changes.updated],
+                        "removed": [news.identifier for news in changes.removed],
+                    }
+                ),
+            )
+        return changes
+
+    def _broadcast(self, event: str, data: str) -> None:
+        """Queues an event for every client"""
+        for queue in self._clients:
+            if queue.full():
+                # Too slow, drop what it has not read and make it refetch
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(("resync", json.dumps({"version": self.version})))
+                self.resyncs += 1
+            else:
+                queue.put_nowait((event, data))
+
+    def _subscribe(self) -> asyncio.Queue:
+        """Adds a client queue starting with the snapshot event"""
+        queue = asyncio.Queue(self.queue_size)
+        queue.put_nowait(("snapshot", json.dumps({"version": self.version})))
+        self._clients[queue] = asyncio.current_task()
+        return queue
+
+    async def _handle_news(self, request: web.Request) -> web.Response:
+        """Serves the feed, or 304 if the client already has it"""
+        if self._body is None:
+            return web.Response(status=503)
+        headers = {"ETag": self._etag}
+        if request.headers.get("If-None-Match") == self._etag:
+            return web.Response(status=304, headers=headers)
+        if "gzip" in request.headers.get("Accept-Encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+            body = self._gzip_body
+        else:
+            body = self._body
+        return web.Response(body=body, content_type="application/json", headers=headers)
+
+    async def _handle_events(self, request: web.Request) -> web.StreamResponse:
+        """Streams the events as Server-Sent Events"""
+        response = web.StreamResponse(
+            headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"}
+        )
+        await response.prepare(request)
+        queue = self._subscribe()
+        try:
+            while True:
+                event, data = await queue.get()
+                await response.write(
+                    "event: {}\ndata: {}\n\n".format(event, data).encode("utf-8")
+                )
+        except ConnectionError:
+            pass
+        finally:
+            self._clients.pop(queue, None)
+        return response
+
+    async def _handle_websocket(self, request: web.Request) -> web.WebSocketResponse:
+        """Streams the events as WebSocket text messages"""
+        websocket = web.WebSocketResponse(heartbeat=HEARTBEAT)
+        await websocket.prepare(request)
+        queue = self._subscribe()
+
+        async def send():
+            while True:
+                event, data = await queue.get()
+                await websocket.send_str(
+                    '{{"event": "{}", "data": {}}}'.format(event, data)
+                )
+
+        sender = asyncio.ensure_future(send())
+        try:
+            # Messages from the client are ignored, this ends when it closes
+            async for _ in websocket:
+                pass
+        finally:
+            sender.cancel()
+            self._clients.pop(queue, None)
+        return websocket
+
+    async def _run(self) -> None:
+        """Polls upstream until stopped"""
+        while True:
+            try:
+                await self.poll_once()
+            except Exception:  # pylint: disable=W0703
+                _LOGGER.exception("Failed to poll Krisinformation")
+            await asyncio.sleep(self.interval)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080) -> None:
+        """Starts polling and serving"""
+        await self._api.async_open()
+        self._task = asyncio.ensure_future(self._run())
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self) -> None:
+        """Stops polling and serving"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Event streams never end by themselves
+        for task in list(self._clients.values()):
+            task.cancel()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        await self._api.async_close()
+
+
+class KrisinformationRelayAPI(KrisinformationAPI):
+    """
+    API reading the feed from a KrisinformationRelay instead of upstream,
+    revalidating with the relay's ETag. Takes the options of
+    KrisinformationAPI.
+    """
+
+    def __init__(self, relay_url: str, **options) -> None:
+        """Constructor"""
+        options.setdefault("cache", KrisinformationCache())
+        super().__init__(base_url=relay_url.rstrip("/") + "/v3/", **options)
+
+    async def async_events(self):
+        """
+        Yields (event, data) for every Server-Sent Event of the relay:
+        snapshot and resync with the version, changes with the added and
+        updated news in API format and the removed identifiers
+        """
+        if self.session is not None:
+            async for event in self._async_events(self.session):
+                yield event
+            return
+
+        # No session opened, use a short lived one for the stream only
+        async with self._new_session() as session:
+            async for event in self._async_events(session):
+                yield event
+
+    async def _async_events(self, session):
+        """Parses the event stream read with session"""
+        async with session.get(self.base_url + "events", timeout=None) as response:
+            if response.status != 200:
+                raise _status_exception(response.status)
+            buffer = b""
+            async for chunk in response.content.iter_any():
+                buffer += chunk
+                while b"\n\n" in buffer:
+                    message, buffer = buffer.split(b"\n\n", 1)
+                    event = "message"
+                    data = []
+                    for line in message.decode("utf-8").split("\n"):
+                        if line.startswith("event:"):
+                            event = line[6:].strip()
+                        elif line.startswith("data:"):
+                            data.append(line[5:].lstrip())
+                    if data:
+                        yield event, json.loads("\n".join(data))
+
+
+def main() -> None:
+    """Runs a relay until interrupted"""
+    parser = argparse.ArgumentParser(description="Krisinformation relay server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--interval", type=float, default=INTERVAL)
+    args = parser.parse_args()
+
+    async def serve():
+        relay = KrisinformationRelay(interval=args.interval)
+        await relay.start(args.host, args.port)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await relay.stop()
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+Module shared contains a feed and a rate limit shared between the
+processes of a host through files in shared memory. Needs fcntl, so it is
+POSIX only.
+"""
+import asyncio
+import fcntl
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections.abc import Sequence
+
+from krisinformation.krisinformation_lib import (
+    RATE_BURST,
+    RATE_LIMIT,
+    KrisinformationAPI,
+    KrisinformationAPIBase,
+    KrisinformationException,
+    KrisinformationRateLimiter,
+    json_decoder,
+    orjson,
+)
+
+INTERVAL = 60
+# Memory backed on Linux, so the files never touch a disk
+DIRECTORY = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+PATH = os.path.join(DIRECTORY, "krisinformation.feed")
+RATE_LIMIT_PATH = os.path.join(DIRECTORY, "krisinformation.ratelimit")
+# How often a process without any snapshot checks if the leader is done
+WAIT = 0.05
+
+# Magic, format, version, fetched at and number of news, padded to keep
+# the offsets aligned. Followed by the number of news + 1 offsets of the
+# encoded news in the payload. All in native byte order as the file never
+# leaves the host, so the offsets are read by casting the mapping.
+_HEADER = struct.Struct("=4sIQdI4x")
+_MAGIC = b"KRIS"
+_FORMAT = 1
+# Tokens and when they were last updated
+_BUCKET = struct.Struct("=dd")
+
+
+class KrisinformationSharedSnapshot(Sequence):
+    """
+    Read only view of the news in a shared feed file
+
+    The file is mapped, not read, so all processes of a host share the
+    same pages. Each news is decoded from the mapping when it is accessed.
+    """
+
+    def __init__(self, mapped: mmap.mmap, decoder) -> None:
+        """Constructor"""
+        _, _, self.version, self.fetched_at, count = _HEADER.unpack_from(mapped)
+        self._mapped = mapped
+        self._decoder = decoder
+        view = memoryview(mapped)
+        self._offsets = view[_HEADER.size : _HEADER.size + 8 * (count + 1)].cast("Q")
+        self._payload = view[_HEADER.size + 8 * (count + 1) :]
+        self._decoded = None
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        """Decodes the news at index, a list of news for a slice"""
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("snapshot index out of range")
+        if self._decoded is not None:
+            return self._decoded[index]
+        record = self._payload[self._offsets[index] : self._offsets[index + 1]]
+        if orjson is not None and self._decoder is orjson.loads:
+            # orjson reads the mapped pages without a copy
+            return self._decoder(record)
+        return self._decoder(bytes(record))
+
+    def to_list(self) -> list:
+        """Returns all news, decoded the first time only"""
+        if self._decoded is None:
+            self._decoded = list(self)
+        return self._decoded
+
+
+class KrisinformationSharedFeed(KrisinformationAPIBase):
+    """
+    Shares one upstream fetch between all processes of a host
+
+    The feed is kept in a file at path, by default in shared memory. When it
+    is older than interval, the first process to take the lock file fetches
+    the feed and writes a new file, the others keep serving the current one
+    meanwhile. Only a process that finds no feed at all waits for the
+    leader. Any number of worker processes can use it as their api:
+
+        feed = KrisinformationSharedFeed()
+        krisinformation = Krisinformation("18.07", "59.33", api=feed)
+
+    A new file replaces the old one atomically, so readers never see a
+    partly written feed and keep their mapping of the old one until they
+    look again. snapshot gives the news decoded lazily, get_all_news_api
+    decodes each version once.
+    """
+
+    def __init__(
+        self,
+        path: str = PATH,
+        api: KrisinformationAPIBase = None,
+        interval: float = INTERVAL,
+        decoder=None,
+        clock=time.time,
+    ) -> None:
+        """Constructor"""
+        self.path = path
+        self._api = api if api is not None else KrisinformationAPI()
+        self.interval = interval
+        self._decoder = decoder if decoder is not None else json_decoder()
+        self._clock = clock
+        self._snapshot = None
+        self._stat = None
+        self._lock = threading.Lock()
+        self._lock_file = None
+        self._lock_pid = None
+
+    def _mapped(self):
+        """Returns the snapshot in the file, mapping it again if replaced"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        key = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        if key != self._stat:
+            with open(self.path, "rb") as file:
+                mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            if mapped[:8] != _MAGIC + struct.pack("=I", _FORMAT):
+                raise KrisinformationException(
+                    "{} is not a Krisinformation feed".format(self.path)
+                )
+            self._snapshot = KrisinformationSharedSnapshot(mapped, self._decoder)
+            self._stat = key
+        return self._snapshot
+
+    def _due(self, snapshot) -> bool:
+        """True if snapshot is missing or older than interval"""
+        return snapshot is None or self._clock() - snapshot.fetched_at >= self.interval
+
+    def _acquire(self, blocking: bool) -> bool:
+        """Takes the leader lock, between threads and between processes"""
+        if not self._lock.acquire(blocking):
+            return False
+        if self._lock_pid != os.getpid():
+            # A forked process must not share the parent's lock
+            self._lock_file = open(  # pylint: disable=R1732
+                self.path + ".lock", "a", encoding="utf-8"
+            )
+            self._lock_pid = os.getpid()
+        try:
+            fcntl.flock(
+                self._lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB)
+            )
+        except BlockingIOError:
+            self._lock.release()
+            return False
+        return True
+
+    def _release(self) -> None:
+        """Releases the leader lock"""
+        fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+        self._lock.release()
+
+    def _write(self, api_result: list, previous) -> None:
+        """Writes api_result as the next version of the feed"""
+        if orjson is not None:
+            records = [orjson.dumps(news) for news in api_result]
+        else:
+            records = [
+                json.dumps(news, ensure_ascii=False).encode("utf-8")
+                for news in api_result
+            ]
+        offsets = [0]
+        for record in records:
+            offsets.append(offsets[-1] + len(record))
+        version = previous.version + 1 if previous is not None else 1
+
+        temporary = "{}.{}.tmp".format(self.path, os.getpid())
+        with open(temporary, "wb") as file:
+            file.write(
+                _HEADER.pack(_MAGIC, _FORMAT, version, self._clock(), len(records))
+            )
+            file.write(struct.pack("={}Q".format(len(offsets)), *offsets))
+            file.write(b"".join(records))
+        os.replace(temporary, self.path)
+
+    def snapshot(self) -> KrisinformationSharedSnapshot:
+        """Returns the shared feed, fetching it if older than interval"""
+        snapshot = self._mapped()
+        if not self._due(snapshot):
+            return snapshot
+        # Serve the current feed while another process fetches a new one
+        if not self._acquire(blocking=snapshot is None):
+            return snapshot
+        try:
+            # The leader before us may just have written a new one
+            snapshot = self._mapped()
+            if self._due(snapshot):
+                self._write(self._api.get_all_news_api("", ""), snapshot)
+                snapshot = self._mapped()
+        finally:
+            self._release()
+        return snapshot
+
+    async def async_snapshot(self) -> KrisinformationSharedSnapshot:
+        """Returns the shared feed, fetching it if older than interval"""
+        snapshot = self._mapped()
+        while self._due(snapshot):
+            if self._acquire(blocking=False):
+                try:
+                    snapshot = self._mapped()
+                    if self._due(snapshot):
+                        api_result = await self._api.async_get_all_news_api("", "")
+                        self._write(api_result, snapshot)
+                        snapshot = self._mapped()
+                finally:
+                    self._release()
+                break
+            if snapshot is not None:
+                break
+            await asyncio.sleep(WAIT)
+            snapshot = self._mapped()
+        return snapshot
+
+    def get_all_news_api(self, longitude: str, latitude: str):
+        """Returns the shared feed, fetching it if older than interval"""
+        return self.snapshot().to_list()
+
+    async def async_get_all_news_api(self, longitude: str, latitude: str):
+        """Returns the shared feed, fetching it if older than interval"""
+        return (await self.async_snapshot()).to_list()
+
+    async def async_open(self) -> None:
+        """Opens the upstream api"""
+        await self._api.async_open()
+
+    async def async_close(self) -> None:
+        """Closes the upstream api"""
+        await self._api.async_close()
+
+    def close(self) -> None:
+        """Closes the lock file"""
+        if self._lock_file is not None and self._lock_pid == os.getpid():
+            self._lock_file.close()
+        self._lock_file = None
+        self._lock_pid = None
+
+
+class KrisinformationSharedRateLimiter(KrisinformationRateLimiter):
+    """
+    Token bucket shared by all processes of a host
+
+    The bucket is kept in a small file at path, by default in shared memory,
+    and updated under an flock, so every KrisinformationAPI of the host
+    given a limiter with the same path takes from the same budget. The clock
+    must be the same in all processes, time.monotonic is on POSIX.
+    """
+
+    def __init__(
+        self,
+        path: str = RATE_LIMIT_PATH,
+        rate: float = RATE_LIMIT,
+        burst: float = RATE_BURST,
+        clock=time.monotonic,
+    ) -> None:
+        """Constructor"""
+        super().__init__(rate, burst, clock)
+        self.path = path
+        self._fd = None
+        self._fd_pid = None
+
+    def acquire(self) -> bool:
+        """Takes a token from the shared bucket, False if there is none left"""
+        with self._lock:
+            if self._fd_pid != os.getpid():
+                # A forked process must not share the parent's lock
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+                self._fd_pid = os.getpid()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                state = os.pread(self._fd, _BUCKET.size, 0)
+                if len(state) == _BUCKET.size:
+                    tokens, updated = _BUCKET.unpack(state)
+                else:
+                    tokens, updated = self.burst, None
+                allowed, tokens, updated = self._take(tokens, updated)
+                os.pwrite(self._fd, _BUCKET.pack(tokens, updated), 0)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            return allowed
+
+    def close(self) -> None:
+        """Closes the bucket file"""
+        if self._fd is not None and self._fd_pid == os.getpid():
+            os.close(self._fd)
+        self._fd = None
+        self._fd_pid = None
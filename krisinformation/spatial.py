@@ -0,0 +1,476 @@
+"""
+Module spatial contains a grid index to find the news concerning a location
+"""
+from array import array
+import math
+from typing import List
+
+from krisinformation.krisinformation_lib import (
+    KrisinformationArea,
+    KrisinformationNews,
+    _coordinate_texts,
+    news_areas,
+)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+CELL_SIZE = 0.5
+RADIUS_KM = 50
+KM_PER_DEGREE = 111.32
+EARTH_RADIUS_KM = 6371.0
+
+# Fewest points queried against an area at once to use numpy
+VECTOR_MIN_POINTS = 8
+
+
+class _Geometry:
+    """
+    Parsed outline of an area, shared by all news with the same geometry
+
+    The points are kept in two arrays of doubles, simplified if the index
+    was given a tolerance. The bounding box is that of the full outline.
+    """
+
+    __slots__ = ("longitudes", "latitudes", "polygon", "bbox", "_vectors", "users")
+
+    def __init__(self, points: List[tuple], tolerance_km: float) -> None:
+        """Constructor"""
+        self.longitudes = array("d", [point[0] for point in points])
+        self.latitudes = array("d", [point[1] for point in points])
+        self.polygon = len(points) >= 3
+        if points:
+            self.bbox = (
+                min(self.longitudes),
+                min(self.latitudes),
+                max(self.longitudes),
+                max(self.latitudes),
+            )
+        else:
+            self.bbox = None
+        if tolerance_km and self.polygon:
+            self.longitudes, self.latitudes = _simplify(
+                self.longitudes, self.latitudes, tolerance_km
+            )
+        self._vectors = None
+        # Number of indexed areas using the geometry
+        self.users = 0
+
+    @property
+    def vectors(self) -> tuple:
+        """The points as numpy arrays sharing memory with the arrays"""
+        if self._vectors is None:
+            self._vectors = (
+                numpy.frombuffer(self.longitudes),
+                numpy.frombuffer(self.latitudes),
+            )
+        return self._vectors
+
+    def matches(self, longitude: float, latitude: float, radius_km: float) -> bool:
+        """True if the point is inside the area or within radius_km of it"""
+        if self.polygon:
+            if _contains(self.longitudes, self.latitudes, longitude, latitude):
+                return True
+            return (
+                _distance_to_outline(
+                    self.longitudes, self.latitudes, longitude, latitude
+                )
+                <= radius_km
+            )
+        return any(
+            _haversine(longitude, latitude, point_x, point_y) <= radius_km
+            for point_x, point_y in zip(self.longitudes, self.latitudes)
+        )
+
+    def matches_many(self, longitudes, latitudes, radii) -> list:
+        """matches for many points at once, with numpy if installed"""
+        if numpy is None or len(longitudes) < VECTOR_MIN_POINTS:
+            return [
+                self.matches(longitude, latitude, radius_km)
+                for longitude, latitude, radius_km in zip(longitudes, latitudes, radii)
+            ]
+        longitudes = numpy.asarray(longitudes, dtype=float)
+        latitudes = numpy.asarray(latitudes, dtype=float)
+        radii = numpy.asarray(radii, dtype=float)
+        area_x, area_y = self.vectors
+        if self.polygon:
+            matched = _contains_vector(area_x, area_y, longitudes, latitudes)
+            outside = ~matched
+            if outside.any():
+                distances = _distance_to_outline_vector(
+                    area_x, area_y, longitudes[outside], latitudes[outside]
+                )
+                matched[outside] = distances <= radii[outside]
+        else:
+            matched = numpy.zeros(len(longitudes), dtype=bool)
+            for point_x, point_y in zip(area_x, area_y):
+                matched |= (
+                    _haversine_vector(longitudes, latitudes, point_x, point_y) <= radii
+                )
+        return matched.tolist()
+
+
+class _IndexedArea:
+    """
+    Area of a news in the grid
+    """
+
+    __slots__ = ("identifier", "geometry")
+
+    def __init__(self, identifier: str, geometry: _Geometry) -> None:
+        """Constructor"""
+        self.identifier = identifier
+        self.geometry = geometry
+
+
+def _geometry_key(area: KrisinformationArea) -> tuple:
+    """Identity of the geometry of an area, equal for equal outlines"""
+    return (
+        tuple(_coordinate_texts(area.geometry_information)),
+        area.coordinate,
+        area.longitude,
+        area.latitude,
+    )
+
+
+class KrisinformationSpatialIndex:
+    """
+    Grid index over the areas of the news in a feed
+
+    Every area is stored in the grid cells its bounding box covers so a
+    query only tests the areas close to the point. News concerning the whole
+    country match every point. update only re-indexes news that were added
+    or changed since the previous update, and outlines are parsed once and
+    shared as long as any indexed news has them, so an updated news with
+    the same areas costs no parsing.
+
+    With tolerance_km the outlines are simplified with Douglas-Peucker for
+    the containment and distance tests, trading that much accuracy for
+    speed on detailed polygons.
+    """
+
+    def __init__(self, cell_size: float = CELL_SIZE, tolerance_km: float = 0) -> None:
+        """Constructor"""
+        self.cell_size = cell_size
+        self.tolerance_km = tolerance_km
+        self._news = {}
+        self._order = {}
+        self._cells = {}
+        self._cells_of = {}
+        self._geometries_of = {}
+        self._geometries = {}
+        self._everywhere = set()
+
+    def __len__(self) -> int:
+        return len(self._news)
+
+    def update(self, news_list: List[KrisinformationNews]) -> None:
+        """Makes the index reflect news_list"""
+        seen = set()
+        for position, news in enumerate(news_list):
+            identifier = news.identifier
+            seen.add(identifier)
+            self._order[identifier] = position
+            previous = self._news.get(identifier)
+            if previous is not None and previous.updated == news.updated:
+                continue
+            if previous is not None:
+                self._remove(identifier)
+            self._add(news)
+
+        for identifier in [key for key in self._news if key not in seen]:
+            self._remove(identifier)
+            del self._order[identifier]
+
+        # Only now, so news that were re-indexed kept their outlines
+        for key in [key for key, value in self._geometries.items() if not value.users]:
+            del self._geometries[key]
+
+    def query(
+        self, longitude: float, latitude: float, radius_km: float = RADIUS_KM
+    ) -> List[KrisinformationNews]:
+        """
+        Returns the news with an area containing the point or within
+        radius_km of it, in feed order
+        """
+        matched = set(self._everywhere)
+        for area in self._nearby(longitude, latitude, radius_km):
+            if area.identifier in matched:
+                continue
+            if area.geometry.matches(longitude, latitude, radius_km):
+                matched.add(area.identifier)
+        return self._in_feed_order(matched)
+
+    def query_many(
+        self, points: List[tuple], radius_km=RADIUS_KM
+    ) -> List[List[KrisinformationNews]]:
+        """
+        Returns query for every (longitude, latitude) point. radius_km is
+        one radius for all points or a sequence with one per point.
+
+        The points are grouped per area so every area is tested against all
+        its nearby points at once, vectorized with numpy if installed.
+        """
+        if isinstance(radius_km, (int, float)):
+            radii = [radius_km] * len(points)
+        else:
+            radii = list(radius_km)
+        candidates = {}
+        for index, (longitude, latitude) in enumerate(points):
+            for area in self._nearby(longitude, latitude, radii[index]):
+                candidates.setdefault(area.geometry, []).append(
+                    (index, area.identifier)
+                )
+
+        matched = [set(self._everywhere) for _ in points]
+        for geometry, pairs in candidates.items():
+            # A geometry is tested once per point, whatever news use it
+            indexes = sorted({index for index, _ in pairs})
+            results = geometry.matches_many(
+                [points[index][0] for index in indexes],
+                [points[index][1] for index in indexes],
+                [radii[index] for index in indexes],
+            )
+            inside = {index for index, result in zip(indexes, results) if result}
+            for index, identifier in pairs:
+                if index in inside:
+                    matched[index].add(identifier)
+        return [self._in_feed_order(identifiers) for identifiers in matched]
+
+    def _nearby(self, longitude: float, latitude: float, radius_km: float):
+        """Yields the areas in the cells within radius_km of the point"""
+        lat_margin = radius_km / KM_PER_DEGREE
+        lon_margin = radius_km / (
+            KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01)
+        )
+        min_x, min_y = self._cell(longitude - lon_margin, latitude - lat_margin)
+        max_x, max_y = self._cell(longitude + lon_margin, latitude + lat_margin)
+        for cell_x in range(min_x, max_x + 1):
+            for cell_y in range(min_y, max_y + 1):
+                yield from self._cells.get((cell_x, cell_y), ())
+
+    def _in_feed_order(self, identifiers: set) -> List[KrisinformationNews]:
+        """Returns the news of identifiers in feed order"""
+        order = self._order
+        return [
+            self._news[identifier] for identifier in sorted(identifiers, key=order.get)
+        ]
+
+    def _cell(self, longitude: float, latitude: float) -> tuple:
+        """Returns the grid cell of a point"""
+        return (
+            math.floor(longitude / self.cell_size),
+            math.floor(latitude / self.cell_size),
+        )
+
+    def _geometry(self, area: KrisinformationArea) -> _Geometry:
+        """Returns the parsed outline of an area, parsing it on first use"""
+        key = _geometry_key(area)
+        geometry = self._geometries.get(key)
+        if geometry is None:
+            points = area.geometry
+            if not points and area.longitude is not None:
+                points = [(area.longitude, area.latitude)]
+            geometry = self._geometries[key] = _Geometry(points, self.tolerance_km)
+        geometry.users += 1
+        return geometry
+
+    def _add(self, news: KrisinformationNews) -> None:
+        """Indexes the areas of news"""
+        identifier = news.identifier
+        self._news[identifier] = news
+        cells = set()
+        geometries = []
+        for area in news_areas(news):
+            if area.area_type == "Country":
+                self._everywhere.add(identifier)
+                continue
+            geometry = self._geometry(area)
+            geometries.append(geometry)
+            if geometry.bbox is None:
+                continue
+            indexed = _IndexedArea(identifier, geometry)
+            min_x, min_y = self._cell(geometry.bbox[0], geometry.bbox[1])
+            max_x, max_y = self._cell(geometry.bbox[2], geometry.bbox[3])
+            for cell_x in range(min_x, max_x + 1):
+                for cell_y in range(min_y, max_y + 1):
+                    self._cells.setdefault((cell_x, cell_y), []).append(indexed)
+                    cells.add((cell_x, cell_y))
+        self._cells_of[identifier] = cells
+        self._geometries_of[identifier] = geometries
+
+    def _remove(self, identifier: str) -> None:
+        """Removes the areas of a news from the index"""
+        del self._news[identifier]
+        self._everywhere.discard(identifier)
+        for geometry in self._geometries_of.pop(identifier, ()):
+            geometry.users -= 1
+        for cell in self._cells_of.pop(identifier, ()):
+            areas = [
+                area for area in self._cells[cell] if area.identifier != identifier
+            ]
+            if areas:
+                self._cells[cell] = areas
+            else:
+                del self._cells[cell]
+
+
+def _haversine(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
+    """Great circle distance in km"""
+    lon1, lat1, lon2, lat2 = map(math.radians, (lon1, lat1, lon2, lat2))
+    value = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(value))
+
+
+def _contains(longitudes, latitudes, longitude: float, latitude: float) -> bool:
+    """Ray casting point in polygon test"""
+    inside = False
+    previous_x = longitudes[-1]
+    previous_y = latitudes[-1]
+    for point_x, point_y in zip(longitudes, latitudes):
+        if (point_y > latitude) != (previous_y > latitude):
+            crossing = (previous_x - point_x) * (latitude - point_y) / (
+                previous_y - point_y
+            ) + point_x
+            if longitude < crossing:
+                inside = not inside
+        previous_x, previous_y = point_x, point_y
+    return inside
+
+
+def _distance_to_outline(
+    longitudes, latitudes, longitude: float, latitude: float
+) -> float:
+    """
+    Shortest distance in km from the point to the polygon outline, using an
+    equirectangular projection around the point
+    """
+    scale_x = KM_PER_DEGREE * math.cos(math.radians(latitude))
+    best = math.inf
+    previous_x = longitudes[-1]
+    previous_y = latitudes[-1]
+    for point_x, point_y in zip(longitudes, latitudes):
+        start_x = (previous_x - longitude) * scale_x
+        start_y = (previous_y - latitude) * KM_PER_DEGREE
+        end_x = (point_x - longitude) * scale_x
+        end_y = (point_y - latitude) * KM_PER_DEGREE
+        delta_x = end_x - start_x
+        delta_y = end_y - start_y
+        length = delta_x * delta_x + delta_y * delta_y
+        if length:
+            fraction = -(start_x * delta_x + start_y * delta_y) / length
+            fraction = min(1.0, max(0.0, fraction))
+        else:
+            fraction = 0.0
+        best = min(
+            best, math.hypot(start_x + fraction * delta_x, start_y + fraction * delta_y)
+        )
+        previous_x, previous_y = point_x, point_y
+    return best
+
+
+def _haversine_vector(longitudes, latitudes, longitude: float, latitude: float):
+    """_haversine from many points to one, needs numpy"""
+    lon1 = numpy.radians(longitudes)
+    lat1 = numpy.radians(latitudes)
+    lon2 = math.radians(longitude)
+    lat2 = math.radians(latitude)
+    value = (
+        numpy.sin((lat2 - lat1) / 2) ** 2
+        + numpy.cos(lat1) * math.cos(lat2) * numpy.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * numpy.arcsin(numpy.sqrt(value))
+
+
+def _contains_vector(area_x, area_y, longitudes, latitudes):
+    """_contains for many points, one pass over the edges, needs numpy"""
+    inside = numpy.zeros(len(longitudes), dtype=bool)
+    previous_x = area_x[-1]
+    previous_y = area_y[-1]
+    for point_x, point_y in zip(area_x.tolist(), area_y.tolist()):
+        crosses = (point_y > latitudes) != (previous_y > latitudes)
+        if crosses.any():
+            crossing = (previous_x - point_x) * (latitudes[crosses] - point_y) / (
+                previous_y - point_y
+            ) + point_x
+            inside[crosses] ^= longitudes[crosses] < crossing
+        previous_x, previous_y = point_x, point_y
+    return inside
+
+
+def _distance_to_outline_vector(area_x, area_y, longitudes, latitudes):
+    """_distance_to_outline for many points, needs numpy"""
+    scale_x = KM_PER_DEGREE * numpy.cos(numpy.radians(latitudes))
+    best = numpy.full(len(longitudes), math.inf)
+    previous_x = area_x[-1]
+    previous_y = area_y[-1]
+    for point_x, point_y in zip(area_x.tolist(), area_y.tolist()):
+        start_x = (previous_x - longitudes) * scale_x
+        start_y = (previous_y - latitudes) * KM_PER_DEGREE
+        delta_x = (point_x - previous_x) * scale_x
+        delta_y = (point_y - previous_y) * KM_PER_DEGREE
+        length = delta_x * delta_x + delta_y * delta_y
+        if previous_x == point_x and previous_y == point_y:
+            fraction = 0.0
+        else:
+            fraction = numpy.clip(
+                -(start_x * delta_x + start_y * delta_y) / length, 0.0, 1.0
+            )
+        best = numpy.minimum(
+            best,
+            numpy.hypot(start_x + fraction * delta_x, start_y + fraction * delta_y),
+        )
+        previous_x, previous_y = point_x, point_y
+    return best
+
+
+def _simplify(longitudes, latitudes, tolerance_km: float) -> tuple:
+    """
+    Douglas-Peucker simplification of an outline in an equirectangular
+    projection. Returns the arrays unchanged if too little would be left.
+    """
+    count = len(longitudes)
+    scale_x = KM_PER_DEGREE * math.cos(math.radians(sum(latitudes) / count))
+    xs = [longitude * scale_x for longitude in longitudes]
+    ys = [latitude * KM_PER_DEGREE for latitude in latitudes]
+    keep = [False] * count
+    keep[0] = keep[-1] = True
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        start_x, start_y = xs[first], ys[first]
+        delta_x = xs[last] - start_x
+        delta_y = ys[last] - start_y
+        length = math.hypot(delta_x, delta_y)
+        farthest = None
+        distance = tolerance_km
+        for index in range(first + 1, last):
+            if length:
+                offset = (
+                    abs(
+                        delta_x * (start_y - ys[index])
+                        - delta_y * (start_x - xs[index])
+                    )
+                    / length
+                )
+            else:
+                offset = math.hypot(xs[index] - start_x, ys[index] - start_y)
+            if offset > distance:
+                farthest = index
+                distance = offset
+        if farthest is not None:
+            keep[farthest] = True
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+
+    if sum(keep) < 4:
+        return longitudes, latitudes
+    return (
+        array("d", [value for value, kept in zip(longitudes, keep) if kept]),
+        array("d", [value for value, kept in zip(latitudes, keep) if kept]),
+    )
@@ -0,0 +1,196 @@
+"""
+Module store contains a SQLite store of the news feed used to warm start
+and to replay captured feeds
+"""
+import json
+import sqlite3
+import threading
+import time
+
+from krisinformation.krisinformation_lib import KrisinformationAPIBase
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS news (
+    identifier TEXT PRIMARY KEY,
+    updated TEXT,
+    position INTEGER,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS feeds (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    captured_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+"""
+
+
+class KrisinformationStore:
+    """
+    SQLite store of the news feed
+
+    Holds the latest feed as received from the API, one row per news keyed
+    on identifier with its updated timestamp, so saving a new poll only
+    writes the news that changed. Captured feeds can also be recorded as a
+    whole and replayed with KrisinformationReplayAPI.
+
+    The database is opened on first use.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Constructor"""
+        self.path = path
+        self._connection = None
+        self._keys = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Opens the database on first use"""
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.executescript(_SCHEMA)
+        return self._connection
+
+    def load(self) -> list:
+        """Returns the stored feed in API format"""
+        with self._lock:
+            rows = (
+                self._connect()
+                .execute(
+                    "SELECT identifier, updated, position, data FROM news "
+                    "ORDER BY position"
+                )
+                .fetchall()
+            )
+            self._keys = {row[0]: (row[1], row[2]) for row in rows}
+        return [json.loads(row[3]) for row in rows]
+
+    def save(self, api_result: list) -> None:
+        """
+        Makes the stored feed equal to api_result, only writing news that
+        were added or changed and deleting removed ones
+        """
+        with self._lock:
+            connection = self._connect()
+            if self._keys is None:
+                self._keys = {
+                    row[0]: (row[1], row[2])
+                    for row in connection.execute(
+                        "SELECT identifier, updated, position FROM news"
+                    )
+                }
+            keys = {}
+            changed = []
+            positions = []
+            for position, news in enumerate(api_result):
+                identifier = str(news["Identifier"])
+                updated = news["Updated"]
+                keys[identifier] = (updated, position)
+                stored = self._keys.get(identifier)
+                if stored is None or stored[0] != updated:
+                    changed.append((identifier, updated, position, json.dumps(news)))
+                elif stored[1] != position:
+                    positions.append((position, identifier))
+            removed = [(key,) for key in self._keys if key not in keys]
+
+            with connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO news VALUES (?, ?, ?, ?)", changed
+                )
+                connection.executemany(
+                    "UPDATE news SET position = ? WHERE identifier = ?", positions
+                )
+                connection.executemany("DELETE FROM news WHERE identifier = ?", removed)
+            self._keys = keys
+
+    def record_feed(self, api_result: list, captured_at: float = None) -> None:
+        """Appends a whole captured feed for replay"""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    "INSERT INTO feeds (captured_at, data) VALUES (?, ?)",
+                    (
+                        time.time() if captured_at is None else captured_at,
+                        json.dumps(api_result),
+                    ),
+                )
+
+    def iter_feeds(self):
+        """Yields (captured_at, feed) for every recorded feed in order"""
+        with self._lock:
+            rows = (
+                self._connect()
+                .execute("SELECT captured_at, data FROM feeds ORDER BY id")
+                .fetchall()
+            )
+        for captured_at, data in rows:
+            yield captured_at, json.loads(data)
+
+    def close(self) -> None:
+        """Closes the database"""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class KrisinformationRecordingAPI(KrisinformationAPIBase):
+    """
+    API that records every feed fetched through another API in a store
+    """
+
+    def __init__(
+        self, api: KrisinformationAPIBase, store: KrisinformationStore
+    ) -> None:
+        """Constructor"""
+        self._api = api
+        self._store = store
+
+    def get_all_news_api(self, longitude: str, latitude: str):
+        """Fetches and records the feed"""
+        data = self._api.get_all_news_api(longitude, latitude)
+        self._store.record_feed(data)
+        return data
+
+    async def async_get_all_news_api(self, longitude: str, latitude: str):
+        """Fetches and records the feed"""
+        data = await self._api.async_get_all_news_api(longitude, latitude)
+        self._store.record_feed(data)
+        return data
+
+    async def async_open(self) -> None:
+        """Opens the wrapped api"""
+        await self._api.async_open()
+
+    async def async_close(self) -> None:
+        """Closes the wrapped api"""
+        await self._api.async_close()
+
+
+class KrisinformationReplayAPI(KrisinformationAPIBase):
+    """
+    API that serves the feeds recorded in a store, one per call, for tests
+    and load tests without the real service. With loop the feeds start
+    over when all have been served, else the last one is repeated.
+    """
+
+    def __init__(self, store: KrisinformationStore, loop: bool = False) -> None:
+        """Constructor"""
+        self._feeds = [feed for _, feed in store.iter_feeds()]
+        if not self._feeds:
+            raise ValueError("No recorded feeds in {}".format(store.path))
+        self._loop = loop
+        self._position = 0
+
+    def get_all_news_api(self, longitude: str, latitude: str):
+        """Returns the next recorded feed"""
+        feed = self._feeds[self._position]
+        if self._position + 1 < len(self._feeds):
+            self._position += 1
+        elif self._loop:
+            self._position = 0
+        return feed
+
+    async def async_get_all_news_api(self, longitude: str, latitude: str):
+        """Returns the next recorded feed"""
+        return self.get_all_news_api(longitude, latitude)
@@ -0,0 +1,93 @@
+"""
+    Automatic tests for the columnar export
+"""
+# pylint: disable=W0621
+
+from datetime import datetime, timezone
+import importlib.util
+
+import pytest
+from krisinformation.columnar import KrisinformationColumns, columns_from_feeds
+from krisinformation.test_krisinformation_lib import FakeKrisinformationApi
+
+
+@pytest.fixture
+def feed() -> list:
+    """Returns the fake feed."""
+    return FakeKrisinformationApi().get_all_news_api("17.00", "62.1")
+
+
+def test_columns(feed):
+    """Every news is a row and every area a row of the area columns"""
+    columns = KrisinformationColumns()
+    columns.add(feed)
+    assert len(columns) == 3
+    assert columns.news["identifier"] == ["18478", "18435", "18434"]
+    assert columns.news["captured_at"] == [None, None, None]
+
+    assert columns.news["published"][0] == "2023-03-06T12:04:12+01:00"
+    assert list(columns.dictionaries["sender_name"]) == ["SMHI", ""]
+    assert columns.news["sender_name"] == [0, 0, 1]
+
+    area_count = sum(len(news["Area"]) for news in feed)
+    assert all(len(values) == area_count for values in columns.areas.values())
+    assert columns.areas["identifier"][0] == "18478"
+    assert columns.areas["area_type"][0] == 0
+    assert columns.areas["longitude"][0] == pytest.approx(16.596265846848)
+
+
+def test_batch_shares_dictionaries(feed):
+    """Many feeds append to the same columns and dictionaries"""
+    columns = columns_from_feeds([(1000.0, feed), (1060.0, feed)])
+    assert len(columns) == 6
+    assert columns.news["captured_at"] == [1e9] * 3 + [1.06e9] * 3
+    assert list(columns.dictionaries["event"]) == ["News"]
+
+
+def test_to_arrow(feed):
+    """Arrow tables have timestamp and dictionary columns"""
+    pyarrow = pytest.importorskip("pyarrow")
+    news, areas = columns_from_feeds([(1000.0, feed), (1060.0, feed)]).to_arrow()
+    assert news.num_rows == 6
+    assert news.schema.field("updated").type == pyarrow.timestamp("us", tz="UTC")
+    published = datetime(2023, 3, 6, 11, 4, 12, tzinfo=timezone.utc)
+    assert news.column("published")[0].as_py() == published
+    assert news.column("captured_at")[0].as_py().timestamp() == 1000.0
+    assert pyarrow.types.is_dictionary(news.schema.field("event").type)
+    assert news.column("sender_name").to_pylist() == ["SMHI", "SMHI", ""] * 2
+    assert areas.num_rows == 2 * sum(len(news["Area"]) for news in feed)
+
+
+def test_to_pandas(feed):
+    """DataFrames have datetime and category columns"""
+    pytest.importorskip("pandas")
+    columns = KrisinformationColumns()
+    columns.add(feed)
+    news, areas = columns.to_pandas()
+    assert list(news["identifier"]) == ["18478", "18435", "18434"]
+    assert str(news["event"].dtype) == "category"
+    assert news["updated"].dt.tz is not None
+    assert news["captured_at"].isna().all()
+    assert len(areas) == sum(len(news["Area"]) for news in feed)
+    published = datetime(2023, 3, 6, 11, 4, 12, tzinfo=timezone.utc)
+    assert news["published"][0] == published
+    assert areas["updated"].dt.tz is not None
+
+
+def test_timestamp_fractions(feed):
+    """Fractions of any length are parsed to microseconds in one pass"""
+    feed[0]["Updated"] = "2023-03-07T12:55:43.47+01:00"
+    feed[1]["Updated"] = "2023-03-07T12:55:43.1234567Z"
+    feed[2]["Updated"] = None
+    columns = KrisinformationColumns()
+    columns.add(feed)
+    expected = [470000, 123456]
+    if importlib.util.find_spec("pyarrow") is not None:
+        news, _ = columns.to_arrow()
+        updated = news.column("updated").to_pylist()
+        assert [value.microsecond for value in updated[:2]] == expected
+        assert updated[2] is None
+    if importlib.util.find_spec("pandas") is not None:
+        news, _ = columns.to_pandas()
+        assert list(news["updated"].dt.microsecond[:2]) == expected
+        assert news["updated"].isna()[2]
@@ -0,0 +1,105 @@
+"""
+    Automatic tests for the deduplication of news
+"""
+# pylint: disable=W0621
+
+import copy
+from unittest import mock
+
+import pytest
+from krisinformation import dedup
+from krisinformation.dedup import KrisinformationDeduplicator
+from krisinformation.krisinformation_lib import _get_all_news
+from krisinformation.test_krisinformation_lib import FakeKrisinformationApi
+
+
+@pytest.fixture
+def feed() -> list:
+    """Returns the fake feed with a copy, a translation and a rewording."""
+    feed = FakeKrisinformationApi().get_all_news_api("17.00", "62.1")
+    republished = copy.deepcopy(feed[0])
+    republished.update(
+        Identifier="20001",
+        SenderName="Länsstyrelsen",
+        SourceID=7,
+        Headline="  orange VARNING för vind och  snöfall ",
+    )
+    translated = copy.deepcopy(feed[0])
+    translated.update(
+        Identifier="20002",
+        Language="en",
+        Headline="Orange warning for wind and snowfall",
+        Published="2023-03-06T12:30:00+01:00",
+    )
+    reworded = copy.deepcopy(feed[0])
+    reworded.update(Identifier="20003", Headline="Another warning")
+    return [translated] + feed + [republished, reworded]
+
+
+def test_group_copies_and_translations(feed):
+    """Copies and translations are grouped under the Swedish news"""
+    events = KrisinformationDeduplicator().group(_get_all_news(feed))
+
+    assert [event.identifiers for event in events] == [
+        ["20002", "18478", "20001"],
+        ["18435"],
+        ["18434"],
+        ["20003"],
+    ]
+    assert events[0].canonical.identifier == "18478"
+    assert events[0].languages == {"sv", "en"}
+
+
+def test_unrelated_news_are_not_translations(feed):
+    """Event type, areas and time alone never make a translation"""
+    for news in feed:
+        news["Area"] = [dict(news["Area"][0], Description="Sverige")]
+    unrelated = copy.deepcopy(feed[2])
+    unrelated.update(
+        Identifier="20004",
+        Language="en",
+        Headline="Chemical leak",
+        Published=feed[1]["Published"],
+        SenderName="Polisen",
+        Web="https://www.krisinformation.se/en/news/chemical-leak/",
+    )
+    deduplicator = KrisinformationDeduplicator()
+    events = deduplicator.group(_get_all_news(feed + [unrelated]))
+
+    assert [event.identifiers for event in events][0] == ["20002", "18478", "20001"]
+    assert events[-1].identifiers == ["20004"]
+    assert len(deduplicator.unique(_get_all_news(feed + [unrelated]))) == 5
+
+
+def test_typed_news_share_fingerprints(feed):
+    """Typed and untyped news get the same fingerprint"""
+    deduplicator = KrisinformationDeduplicator()
+    untyped = [deduplicator.fingerprint(news) for news in _get_all_news(feed)]
+    typed = [dedup.fingerprint(news) for news in _get_all_news(feed, typed=True)]
+    assert untyped == typed
+    assert untyped[1] == untyped[4]
+    assert len(set(untyped)) == 5
+
+
+def test_missing_event_and_areas(feed):
+    """Typed news keep missing values as None"""
+    for news in feed:
+        news["Event"] = None
+        news["Area"][0]["Description"] = None
+    deduplicator = KrisinformationDeduplicator()
+    for typed in (False, True):
+        events = deduplicator.group(_get_all_news(feed, typed=typed))
+        assert len(events) == 4
+
+
+def test_fingerprints_are_cached(feed):
+    """Only news with a new updated are hashed again"""
+    deduplicator = KrisinformationDeduplicator()
+    deduplicator.group(_get_all_news(feed))
+
+    feed[1]["Updated"] = "2023-03-08T08:00:00+01:00"
+    feed[1]["BodyText"] += "  "
+    with mock.patch.object(dedup, "fingerprint", wraps=dedup.fingerprint) as hashed:
+        events = deduplicator.group(_get_all_news(feed))
+    assert hashed.call_count == 1
+    assert events[0].identifiers == ["20002", "18478", "20001"]
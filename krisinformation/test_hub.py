@@ -0,0 +1,133 @@
+"""
+    Automatic tests for the feed hub
+"""
+# pylint: disable=W0621
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+import pytest
+from krisinformation.krisinformation_lib import Krisinformation
+from krisinformation.hub import KrisinformationFeedHub
+from krisinformation.test_krisinformation_lib import FakeClock, FakeKrisinformationApi
+
+
+class CountingKrisinformationApi(FakeKrisinformationApi):
+    """Fake api that counts and slows down the fetches"""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def get_all_news_api(self, longitude: str, latitude: str):
+        """Slow fetch"""
+        with self._lock:
+            self.calls += 1
+        time.sleep(0.05)
+        return super().get_all_news_api(longitude, latitude)
+
+    async def async_get_all_news_api(self, longitude: str, latitude: str):
+        """Slow fetch"""
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return FakeKrisinformationApi.get_all_news_api(self, longitude, latitude)
+
+
+@pytest.fixture
+def api() -> CountingKrisinformationApi:
+    """Returns the counting api."""
+    return CountingKrisinformationApi()
+
+
+def test_threads_share_one_fetch(api):
+    """Concurrent threads wait for the fetch in flight"""
+    hub = KrisinformationFeedHub(api)
+    locations = [
+        Krisinformation("17.0", str(55 + index), api=hub) for index in range(8)
+    ]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda k: k.get_all_news(), locations))
+
+    assert api.calls == 1
+    assert all(len(result) == 3 for result in results)
+
+
+@pytest.mark.asyncio
+async def test_coroutines_share_one_fetch(api):
+    """Concurrent coroutines wait for the fetch in flight"""
+    hub = KrisinformationFeedHub(api)
+    locations = [
+        Krisinformation("17.0", str(55 + index), api=hub) for index in range(8)
+    ]
+    results = await asyncio.gather(*(k.async_get_all_news() for k in locations))
+
+    assert api.calls == 1
+    assert all(len(result) == 3 for result in results)
+
+
+def test_refetch_after_interval(api):
+    """The feed is fetched again once older than interval"""
+    clock = FakeClock()
+    hub = KrisinformationFeedHub(api, interval=30, clock=clock)
+    hub.get_all_news_api("", "")
+    clock.now = 29
+    hub.get_all_news_api("", "")
+    assert api.calls == 1
+    clock.now = 30
+    hub.get_all_news_api("", "")
+    assert api.calls == 2
+
+
+def test_publish_to_locations(api):
+    """Every location gets its own news from one fetch"""
+    hub = KrisinformationFeedHub(api)
+    delivered = {}
+    hub.register(14.30884, 55.92231, lambda news: delivered.update(ahus=news), 5)
+    kiruna = hub.register(20.26, 67.85, lambda news: delivered.update(kiruna=news))
+
+    hub.publish()
+    assert api.calls == 1
+    assert len(delivered["ahus"]) == 3
+    assert len(delivered["kiruna"]) == 3
+
+    kiruna.unregister()
+    delivered.clear()
+    hub.publish()
+    assert list(delivered) == ["ahus"]
+
+
+@pytest.mark.asyncio
+async def test_async_publish(api):
+    """Coroutine callbacks are awaited"""
+    hub = KrisinformationFeedHub(api)
+    delivered = []
+
+    async def callback(news):
+        delivered.append(news)
+
+    hub.register(14.30884, 55.92231, callback)
+    await hub.async_publish()
+    assert len(delivered[0]) == 3
+
+
+@pytest.mark.asyncio
+async def test_shared_session_closed_by_last_user(api):
+    """The upstream api stays open until every user has left"""
+    events = []
+
+    async def async_open():
+        events.append("open")
+
+    async def async_close():
+        events.append("close")
+
+    api.async_open = async_open
+    api.async_close = async_close
+    hub = KrisinformationFeedHub(api)
+    async with Krisinformation("17.0", "55.0", api=hub):
+        async with Krisinformation("17.0", "56.0", api=hub):
+            pass
+        assert events == ["open"]
+    assert events == ["open", "close"]
@@ -0,0 +1,48 @@
+"""
+    Automatic tests for the multi-process ingestion
+"""
+# pylint: disable=W0621
+
+import copy
+import json
+
+import pytest
+from krisinformation.ingest import ingest_feeds
+from krisinformation.krisinformation_lib import TypedKrisinformationNews
+from krisinformation.test_krisinformation_lib import FakeKrisinformationApi
+
+
+@pytest.fixture
+def archive(tmp_path) -> list:
+    """Returns the paths of archived feeds where one news was updated."""
+    feed = FakeKrisinformationApi().get_all_news_api("17.00", "62.1")
+    updated = copy.deepcopy(feed)
+    updated[0]["Updated"] = "2023-03-08T08:00:00+01:00"
+    paths = []
+    for index, api_result in enumerate([feed, feed, updated, updated, feed]):
+        path = tmp_path / "feed{}.json".format(index)
+        path.write_text(json.dumps(api_result), encoding="utf-8")
+        paths.append(path)
+    empty = tmp_path / "empty.json"
+    empty.write_bytes(b"")
+    paths.append(empty)
+    return paths
+
+
+@pytest.mark.parametrize("files_per_task", [1, 4])
+def test_ingest_deduplicates(archive, files_per_task):
+    """Every version of a news is yielded once in file order"""
+    chunks = list(
+        ingest_feeds(archive, processes=2, chunk_size=3, files_per_task=files_per_task)
+    )
+    assert [len(chunk) for chunk in chunks] == [3, 1]
+    news = [news for chunk in chunks for news in chunk]
+    assert [item.identifier for item in news] == ["18478", "18435", "18434", "18478"]
+    assert news[3].updated == "2023-03-08T08:00:00+01:00"
+
+
+def test_ingest_typed(archive):
+    """Typed news survive the trip from the workers"""
+    news = [news for chunk in ingest_feeds(archive[:1], typed=True) for news in chunk]
+    assert all(isinstance(item, TypedKrisinformationNews) for item in news)
+    assert news[0].updated.year == 2023
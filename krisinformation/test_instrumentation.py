@@ -0,0 +1,209 @@
+"""
+    Automatic tests for the instrumentation hooks
+"""
+# pylint: disable=W0621
+
+import pytest
+from krisinformation.instrumentation import (
+    KrisinformationInstrumentation,
+    OpenTelemetryInstrumentation,
+    PrometheusInstrumentation,
+)
+from krisinformation.krisinformation_lib import (
+    Krisinformation,
+    KrisinformationAPI,
+    KrisinformationCache,
+    KrisinformationException,
+    KrisinformationRetryPolicy,
+)
+from krisinformation.test_krisinformation_lib import NewsServer
+
+
+class RecordingInstrumentation(KrisinformationInstrumentation):
+    """Instrumentation that records everything reported"""
+
+    def __init__(self) -> None:
+        self.timings = []
+        self.sizes = []
+        self.counts = []
+        self.events = []
+        self.errors = []
+
+    def timing(self, phase: str, feed: str, seconds: float) -> None:
+        assert seconds >= 0
+        self.timings.append((phase, feed))
+
+    def size(self, feed: str, size: int) -> None:
+        self.sizes.append((feed, size))
+
+    def items(self, feed: str, count: int) -> None:
+        self.counts.append((feed, count))
+
+    def event(self, name: str, feed: str) -> None:
+        self.events.append((name, feed))
+
+    def error(self, feed: str, error: Exception) -> None:
+        self.errors.append((feed, type(error)))
+
+
+@pytest.fixture
+def news_server() -> NewsServer:
+    """Returns a running local news server."""
+    server = NewsServer()
+    yield server
+    server.close()
+
+
+def test_phases_sizes_and_cache_events(news_server):
+    """Every phase of a sync fetch is timed and cache use reported"""
+    instrumentation = RecordingInstrumentation()
+    api = KrisinformationAPI(
+        cache=KrisinformationCache(),
+        base_url=news_server.base_url,
+        instrumentation=instrumentation,
+    )
+    krisinformation = Krisinformation("17.041", "62.34198", api=api)
+    krisinformation.get_all_news()
+    assert instrumentation.timings == [
+        ("connect", "news"),
+        ("request", "news"),
+        ("transfer", "news"),
+        ("decode", "news"),
+        ("convert", "news"),
+    ]
+    assert instrumentation.sizes == [("news", len(news_server.body))]
+    assert instrumentation.counts == [("news", 3)]
+    assert instrumentation.events == [("cache_miss", "news")]
+
+    krisinformation.get_all_news()
+    assert instrumentation.events[-1] == ("cache_revalidated", "news")
+    api.transport.close()
+
+
+def test_streaming_phases(news_server):
+    """Streamed feeds report the same phases, sizes and counts"""
+    instrumentation = RecordingInstrumentation()
+    api = KrisinformationAPI(
+        cache=KrisinformationCache(),
+        base_url=news_server.base_url,
+        instrumentation=instrumentation,
+    )
+    krisinformation = Krisinformation("17.041", "62.34198", api=api)
+    assert len(list(krisinformation.iter_news())) == 3
+    assert instrumentation.timings == [
+        ("connect", "news"),
+        ("request", "news"),
+        ("transfer", "news"),
+        ("decode", "news"),
+        ("convert", "news"),
+    ]
+    assert instrumentation.sizes == [("news", len(news_server.body))]
+    assert instrumentation.counts == [("news", 3)]
+    assert instrumentation.events == [("cache_miss", "news")]
+    api.transport.close()
+
+
+@pytest.mark.asyncio
+async def test_async_streaming_phases(news_server):
+    """Async streamed feeds report the same phases"""
+    instrumentation = RecordingInstrumentation()
+    api = KrisinformationAPI(
+        base_url=news_server.base_url, instrumentation=instrumentation
+    )
+    async with Krisinformation("17.041", "62.34198", api=api) as krisinformation:
+        assert len([news async for news in krisinformation.aiter_news()]) == 3
+    assert [phase for phase, _ in instrumentation.timings][-4:] == [
+        "request",
+        "transfer",
+        "decode",
+        "convert",
+    ]
+    assert instrumentation.counts == [("news", 3)]
+
+
+def test_retry_and_error_events(news_server):
+    """Failed attempts are reported as errors and retries as events"""
+    news_server.statuses = [503]
+    instrumentation = RecordingInstrumentation()
+    api = KrisinformationAPI(
+        base_url=news_server.base_url,
+        retry=KrisinformationRetryPolicy(attempts=2, base_delay=0.001),
+        stale_while_error=True,
+        instrumentation=instrumentation,
+    )
+    api.get_all_news_api("17.00", "62.1")
+    news_server.status = 404
+    api.get_all_news_api("17.00", "62.1")
+    assert [feed for feed, _ in instrumentation.errors] == ["news", "news"]
+    assert issubclass(instrumentation.errors[0][1], KrisinformationException)
+    assert instrumentation.events == [("retry", "news"), ("stale", "news")]
+    api.transport.close()
+
+
+@pytest.mark.asyncio
+async def test_async_phases(news_server):
+    """Every phase of an async fetch is timed, with connect from aiohttp"""
+    instrumentation = RecordingInstrumentation()
+    api = KrisinformationAPI(
+        base_url=news_server.base_url, instrumentation=instrumentation
+    )
+    async with Krisinformation("17.041", "62.34198", api=api) as krisinformation:
+        await krisinformation.async_get_all_news()
+    assert instrumentation.timings == [
+        ("connect", "news"),
+        ("request", "news"),
+        ("transfer", "news"),
+        ("decode", "news"),
+        ("convert", "news"),
+    ]
+    assert instrumentation.counts == [("news", 3)]
+
+
+def test_prometheus_metrics(news_server):
+    """The Prometheus adapter fills its metrics"""
+    prometheus_client = pytest.importorskip("prometheus_client")
+    registry = prometheus_client.CollectorRegistry()
+    api = KrisinformationAPI(
+        base_url=news_server.base_url,
+        instrumentation=PrometheusInstrumentation(registry=registry),
+    )
+    Krisinformation("17.041", "62.34198", api=api).get_all_news()
+    api.transport.close()
+    assert (
+        registry.get_sample_value("krisinformation_news_items", {"feed": "news"}) == 3
+    )
+    assert (
+        registry.get_sample_value(
+            "krisinformation_phase_seconds_count",
+            {"phase": "decode", "feed": "news"},
+        )
+        == 1
+    )
+
+
+def test_opentelemetry_spans(news_server):
+    """The OpenTelemetry adapter records one span per phase"""
+    pytest.importorskip("opentelemetry.sdk")
+    # pylint: disable=C0415
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+        InMemorySpanExporter,
+    )
+
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    api = KrisinformationAPI(
+        base_url=news_server.base_url,
+        instrumentation=OpenTelemetryInstrumentation(provider.get_tracer(__name__)),
+    )
+    Krisinformation("17.041", "62.34198", api=api).get_all_news()
+    api.transport.close()
+    assert [span.name for span in exporter.get_finished_spans()] == [
+        "krisinformation.connect",
+        "krisinformation.request",
+        "krisinformation.transfer",
+        "krisinformation.decode",
+        "krisinformation.convert",
+    ]
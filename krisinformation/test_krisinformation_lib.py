@@ -3,9 +3,19 @@
 """
 # pylint: disable=C0302,W0621,R0903, W0212
 
+from datetime import datetime, timedelta, timezone
 from typing import List
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
 import logging
+import subprocess
+import sys
+import threading
+import time
 import aiohttp
 import pytest
 from krisinformation.krisinformation_lib import (
@@ -13,11 +23,112 @@ from krisinformation.krisinformation_lib import (
     KrisinformationNews,
     KrisinformationAPIBase,
     KrisinformationAPI,
+    KrisinformationCache,
     KrisinformationException,
+    KrisinformationHTTPTransport,
+    KrisinformationRetryPolicy,
+    KrisinformationCircuitBreaker,
+    KrisinformationCircuitOpenException,
 )
 from krisinformation import krisinformation_lib
 
 
+class FakeClock:
+    """Clock that only moves when told to"""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class NewsServer:
+    """Local http server serving the fake news data with an ETag"""
+
+    def __init__(self) -> None:
+        self.etag = '"v1"'
+        self.status = 200
+        self.statuses = []
+        self.gzip = False
+        self.delay = 0
+        self.active = 0
+        self.max_active = 0
+        self.connections = 0
+        self.requests = []
+        self.paths = []
+        lock = threading.Lock()
+        self.body = json.dumps(
+            FakeKrisinformationApi().get_all_news_api("17.00", "62.1")
+        ).encode("utf-8")
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Request handler"""
+
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                """Count new connections"""
+                server.connections += 1
+                super().setup()
+
+            def do_GET(self):  # pylint: disable=C0103
+                """Serve the feed or 304 if the client has it"""
+                server.requests.append(dict(self.headers))
+                server.paths.append(self.path)
+                with lock:
+                    server.active += 1
+                    server.max_active = max(server.max_active, server.active)
+                time.sleep(server.delay)
+                with lock:
+                    server.active -= 1
+                status = server.statuses.pop(0) if server.statuses else server.status
+                if status != 200:
+                    self.send_response(status)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if self.headers.get("If-None-Match") == server.etag:
+                    self.send_response(304)
+                    self.send_header("ETag", server.etag)
+                    self.end_headers()
+                    return
+                body = server.body
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                if server.gzip and "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = gzip.compress(body)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", server.etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                """Keep test output quiet"""
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = "http://127.0.0.1:{}/v3/".format(self.httpd.server_port)
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever, args=(0.05,), daemon=True
+        )
+        self.thread.start()
+
+    def close(self) -> None:
+        """Stop serving"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def news_server() -> NewsServer:
+    """Returns a running local news server."""
+    server = NewsServer()
+    yield server
+    server.close()
+
+
 @pytest.fixture
 def krisinformation() -> Krisinformation:
     """Returns the krisinformation object."""
@@ -135,18 +246,732 @@ async def test_async_use_abstract_base_class():
 
 
 @pytest.mark.asyncio
-async def test_async_error_from_api():
+async def test_async_error_from_api(monkeypatch):
     """test the async stuff"""
     api = KrisinformationAPI()
     # Faulty template
-    krisinformation_lib.BASEURL = "http://api.krisinformation.se/v3/"
-    krisinformation_lib.NEWS_ENDPOINT = "new"
+    monkeypatch.setattr(
+        krisinformation_lib, "BASEURL", "http://api.krisinformation.se/v3/"
+    )
+    monkeypatch.setattr(krisinformation_lib, "NEWS_ENDPOINT", "new")
 
     krisinformation_error = Krisinformation("17.00", "62.1", api=api)
     with pytest.raises(KrisinformationException):
         await krisinformation_error.async_get_all_news()
 
 
+def test_cache_serves_within_ttl(news_server):
+    """Responses younger than the ttl never touch the network"""
+    clock = FakeClock()
+    api = KrisinformationAPI(
+        cache=KrisinformationCache(ttl=10, clock=clock),
+        base_url=news_server.base_url,
+    )
+    first = api.get_all_news_api("17.00", "62.1")
+    clock.now = 5
+    second = api.get_all_news_api("17.00", "62.1")
+
+    assert len(news_server.requests) == 1
+    assert second is first
+
+
+def test_cache_revalidates_with_etag(news_server):
+    """Stale responses are revalidated and reused on 304"""
+    clock = FakeClock()
+    api = KrisinformationAPI(
+        cache=KrisinformationCache(ttl=10, clock=clock),
+        base_url=news_server.base_url,
+    )
+    first = api.get_all_news_api("17.00", "62.1")
+    clock.now = 11
+    second = api.get_all_news_api("17.00", "62.1")
+
+    assert len(news_server.requests) == 2
+    assert news_server.requests[1]["If-None-Match"] == news_server.etag
+    assert second is first
+
+    news_server.etag = '"v2"'
+    clock.now = 22
+    third = api.get_all_news_api("17.00", "62.1")
+    assert third is not first
+    assert third == first
+
+
+@pytest.mark.asyncio
+async def test_async_cache_revalidates_with_etag(news_server):
+    """Stale responses are revalidated and reused on 304"""
+    clock = FakeClock()
+    api = KrisinformationAPI(
+        cache=KrisinformationCache(ttl=10, clock=clock),
+        base_url=news_server.base_url,
+    )
+    api.session = aiohttp.ClientSession()
+    first = await api.async_get_all_news_api("17.00", "62.1")
+    clock.now = 5
+    assert await api.async_get_all_news_api("17.00", "62.1") is first
+    clock.now = 11
+    second = await api.async_get_all_news_api("17.00", "62.1")
+    await api.session.close()
+
+    assert len(news_server.requests) == 2
+    assert news_server.requests[1]["If-None-Match"] == news_server.etag
+    assert second is first
+    assert len(second) == 3
+
+
+def test_poll_changes():
+    """Only added, updated and removed news are reported"""
+    api = FakeKrisinformationApi()
+    krisinformation = Krisinformation("17.041", "62.34198", api=api)
+
+    changes = krisinformation.poll_changes()
+    assert [news.identifier for news in changes.added] == ["18478", "18435", "18434"]
+    assert not changes.updated
+    assert not changes.removed
+
+    assert not krisinformation.poll_changes()
+
+    feed = api.get_all_news_api("17.041", "62.34198")
+    feed[0]["Updated"] = "2023-03-08T08:00:00+01:00"
+    del feed[2]
+    feed.append(dict(feed[1], Identifier="18500"))
+    api.get_all_news_api = lambda longitude, latitude: feed
+
+    changes = krisinformation.poll_changes()
+    assert [news.identifier for news in changes.added] == ["18500"]
+    assert [news.identifier for news in changes.updated] == ["18478"]
+    assert [news.identifier for news in changes.removed] == ["18434"]
+
+
+@pytest.mark.asyncio
+async def test_async_poll_changes(krisinformation):
+    """test the async stuff"""
+    changes = await krisinformation.async_poll_changes()
+    assert len(changes.added) == 3
+    assert not await krisinformation.async_poll_changes()
+
+
+def test_each_instance_gets_own_api():
+    """The default api must not be shared between instances"""
+    first = Krisinformation("17.041", "62.34198")
+    second = Krisinformation("17.041", "62.34198")
+    assert first._api is not second._api
+
+
+@pytest.mark.asyncio
+async def test_context_manager_owns_pooled_session(news_server):
+    """async with opens one pooled session and closes it on exit"""
+    api = KrisinformationAPI(base_url=news_server.base_url)
+    async with Krisinformation("17.041", "62.34198", api=api) as krisinformation:
+        session = api.session
+        assert session is not None
+        await krisinformation.async_get_all_news()
+        await krisinformation.async_get_all_news()
+        assert api.session is session
+
+    assert session.closed
+    assert api.session is None
+
+
+@pytest.mark.asyncio
+async def test_context_manager_keeps_provided_session(news_server):
+    """A session passed by the caller is not closed by the library"""
+    session = aiohttp.ClientSession()
+    api = KrisinformationAPI(base_url=news_server.base_url)
+    async with Krisinformation(
+        "17.041", "62.34198", session=session, api=api
+    ) as krisinformation:
+        await krisinformation.async_get_all_news()
+
+    assert not session.closed
+    await session.close()
+
+
+@pytest.mark.asyncio
+async def test_request_without_session_cleans_up(news_server):
+    """A short lived session is used if none is opened"""
+    api = KrisinformationAPI(base_url=news_server.base_url)
+    assert len(await api.async_get_all_news_api("17.00", "62.1")) == 3
+    assert len(await api.async_get_all_news_api("17.00", "62.1")) == 3
+    assert api.session is None
+
+
+def test_transport_reuses_connections(news_server):
+    """Sequential requests share one keep-alive connection"""
+    api = KrisinformationAPI(base_url=news_server.base_url)
+    for _ in range(5):
+        assert len(api.get_all_news_api("17.00", "62.1")) == 3
+    api.transport.close()
+
+    assert len(news_server.requests) == 5
+    assert news_server.connections == 1
+
+
+def test_transport_shared_between_threads(news_server):
+    """The pool never holds more connections than pool_size"""
+    transport = KrisinformationHTTPTransport(pool_size=4)
+    api = KrisinformationAPI(base_url=news_server.base_url, transport=transport)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(
+            executor.map(lambda _: api.get_all_news_api("17.00", "62.1"), range(40))
+        )
+    pooled = [len(pool) for pool in transport._pools.values()]
+    transport.close()
+
+    assert all(len(result) == 3 for result in results)
+    assert pooled and max(pooled) <= 4
+    assert news_server.connections <= 8
+
+
+def test_transport_gzip(news_server):
+    """Compressed responses are decoded"""
+    news_server.gzip = True
+    transport = KrisinformationHTTPTransport()
+    response = transport.request(news_server.base_url + "news?format=json")
+    transport.close()
+
+    assert news_server.requests[0]["Accept-Encoding"] == "gzip, deflate"
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.body == news_server.body
+
+
+def test_sync_error_from_api(news_server):
+    """Non 200 responses raise KrisinformationException"""
+    news_server.status = 500
+    api = KrisinformationAPI(base_url=news_server.base_url)
+    with pytest.raises(KrisinformationException):
+        api.get_all_news_api("17.00", "62.1")
+
+
+def test_json_array_parser_byte_by_byte():
+    """Elements are yielded as soon as they are complete"""
+    feed = FakeKrisinformationApi().get_all_news_api("17.00", "62.1")
+    feed[0]["Headline"] = 'Quote \\" and brackets }]{[ in "text"'
+    data = json.dumps(feed, ensure_ascii=False).encode("utf-8")
+
+    parser = krisinformation_lib._JSONArrayParser()
+    elements = []
+    first_at = None
+    for index in range(len(data)):
+        elements.extend(parser.feed(data[index : index + 1]))
+        if elements and first_at is None:
+            first_at = index
+    parser.close()
+
+    assert elements == feed
+    assert first_at < len(data) / 2
+    assert len(parser._buffer) < 2
+
+
+def test_json_array_parser_decodes_bytes():
+    """Elements reach the decoder as the received bytes"""
+    received = []
+
+    def decoder(data):
+        received.append(data)
+        return json.loads(data)
+
+    parser = krisinformation_lib._JSONArrayParser(decoder)
+    text = '[{"Headline": "Skogsbrand i Åre ]"}]'
+    assert parser.feed(text.encode("utf-8")) == [{"Headline": "Skogsbrand i Åre ]"}]
+    assert received == ['{"Headline": "Skogsbrand i Åre ]"}'.encode("utf-8")]
+
+
+def test_json_array_parser_incomplete():
+    """A truncated array is reported"""
+    parser = krisinformation_lib._JSONArrayParser()
+    assert parser.feed(b'[{"Identifier": "1"}, {"Identifier"') == [{"Identifier": "1"}]
+    with pytest.raises(KrisinformationException):
+        parser.close()
+
+
+def test_iter_news(news_server):
+    """Streaming gives the same news as get_all_news"""
+    news_server.gzip = True
+    api = KrisinformationAPI(base_url=news_server.base_url)
+    krisinformation = Krisinformation("17.041", "62.34198", api=api)
+
+    streamed = list(krisinformation.iter_news())
+
+    assert [news.identifier for news in streamed] == ["18478", "18435", "18434"]
+    assert streamed[2].headline == krisinformation.get_all_news()[2].headline
+    assert news_server.connections == 1
+
+
+@pytest.mark.asyncio
+async def test_aiter_news(news_server):
+    """Streaming gives the same news as async_get_all_news"""
+    api = KrisinformationAPI(base_url=news_server.base_url)
+    async with Krisinformation("17.041", "62.34198", api=api) as krisinformation:
+        streamed = [news async for news in krisinformation.aiter_news()]
+
+    assert [news.identifier for news in streamed] == ["18478", "18435", "18434"]
+
+
+def test_iter_news_fake_api(krisinformation):
+    """APIs without streaming support fall back to the whole list"""
+    assert len(list(krisinformation.iter_news())) == 3
+
+
+def test_news_is_slotted(krisinformation_news):
+    """News keep no per instance dict and export their values"""
+    news = krisinformation_news[0]
+    assert not hasattr(news, "__dict__")
+    assert news.to_tuple()[0] == "18478"
+    assert news._asdict()["headline"] == news.headline
+    assert list(news._asdict()) == list(KrisinformationNews.FIELDS)
+    assert all(isinstance(value, str) for value in news.to_tuple())
+    assert news.area is news.area
+    areas = krisinformation_lib.news_areas(news)
+    assert [area.description for area in areas] == ["Sverige"]
+
+
+def test_news_equality(krisinformation):
+    """News are equal when identifier and updated are"""
+    first = krisinformation.get_all_news()
+    second = krisinformation.get_all_news()
+    assert first[0] == second[0]
+    assert first[0] != first[1]
+    assert len(set(first + second)) == 3
+
+
+def test_typed_news():
+    """Typed news decode their values on first access"""
+    krisinformation = Krisinformation(
+        "17.041", "62.34198", api=FakeKrisinformationApi(), typed=True
+    )
+    news = krisinformation.get_all_news()[2]
+
+    assert not hasattr(news, "_updated_value")
+    assert news.updated == datetime(
+        2023, 3, 2, 6, 15, 17, tzinfo=timezone(timedelta(hours=1))
+    )
+    assert news.updated is news.updated
+    assert news.push is True
+    assert news.source_id == 0
+    assert news.links[0].url.startswith("https://polisen.se/")
+    assert news.body_links[0].text.startswith("För mer information")
+
+    area = news.area[2]
+    assert area.area_type == "PoI"
+    assert area.description == "Åhus"
+    assert area.longitude == 14.30884
+    assert area.altitude is None
+    assert area.geometry == [(14.30884, 55.92231)]
+    assert news.area[0].geometry == [(16.596265846848, 62.8114849680804)]
+
+
+def test_typed_news_equals_untyped(krisinformation):
+    """Typed and untyped news compare on the raw values"""
+    typed = krisinformation_lib._get_all_news_from_api(
+        FakeKrisinformationApi().get_all_news_api("17.00", "62.1"), typed=True
+    )
+    assert typed == krisinformation.get_all_news()
+
+
+def test_parse_datetime():
+    """Timestamps with long fractions and Z are accepted"""
+    parsed = krisinformation_lib._parse_datetime("2023-03-07T12:55:43.1234567Z")
+    assert parsed == datetime(2023, 3, 7, 12, 55, 43, 123456, tzinfo=timezone.utc)
+    assert krisinformation_lib._parse_datetime(None) is None
+
+
+@pytest.mark.parametrize(
+    "fraction, microsecond",
+    [
+        ("4", 400000),
+        ("47", 470000),
+        ("471", 471000),
+        ("4712", 471200),
+        ("47123", 471230),
+    ],
+)
+def test_parse_datetime_short_fractions(fraction, microsecond):
+    """Fractions shorter than 6 digits are padded, not rejected"""
+    parsed = krisinformation_lib._parse_datetime(
+        "2023-03-07T12:55:43.{}+01:00".format(fraction)
+    )
+    assert parsed.microsecond == microsecond
+    assert parsed.utcoffset() == timedelta(hours=1)
+
+
+def test_area_geometry_information():
+    """Polygons in the geometry information are preferred over the center"""
+    area = krisinformation_lib._parse_areas(
+        [
+            {
+                "Type": "County",
+                "Description": "Test",
+                "Coordinate": "14.5,55.5 0",
+                "CoordinateObject": {"Longitude": "14.5", "Latitude": "55.5"},
+                "GeometryInformation": {
+                    "PolygonCoordinates": "14,55 15,55 15,56 14,56 14,55"
+                },
+            }
+        ]
+    )[0]
+    assert area.geometry == [(14, 55), (15, 55), (15, 56), (14, 56), (14, 55)]
+
+
+@pytest.mark.asyncio
+async def test_async_get_feeds(news_server, monkeypatch):
+    """Endpoints are fetched concurrently within the limit"""
+    for index in range(4):
+        monkeypatch.setitem(
+            krisinformation_lib.ENDPOINTS,
+            "extra{}".format(index),
+            "extra{}".format(index),
+        )
+    news_server.delay = 0.1
+    api = KrisinformationAPI(base_url=news_server.base_url)
+    names = ["news", "vmas", "extra0", "extra1", "extra2", "extra3"]
+    async with Krisinformation("17.041", "62.34198", api=api) as krisinformation:
+        feeds = await krisinformation.async_get_feeds(names, concurrency=2)
+
+    assert list(feeds) == names
+    assert all(len(feed) == 3 for feed in feeds.values())
+    assert feeds["vmas"][0].identifier == "18478"
+    assert sorted(news_server.paths)[-2:] == [
+        "/v3/news?format=json",
+        "/v3/vmas?format=json",
+    ]
+    assert news_server.max_active == 2
+
+
+def test_unknown_endpoint():
+    """Only registered endpoints can be fetched"""
+    with pytest.raises(KrisinformationException):
+        KrisinformationAPI().get_endpoint_api("unknown")
+
+
+def test_get_endpoint(news_server):
+    """Registered endpoints are fetched through the transport"""
+    api = KrisinformationAPI(base_url=news_server.base_url)
+    assert len(api.get_endpoint_api("vmas")) == 3
+    assert news_server.paths == ["/v3/vmas?format=json"]
+
+
+def test_retry_until_success(news_server):
+    """Server errors are retried with backoff"""
+    news_server.statuses = [503, 500]
+    api = KrisinformationAPI(
+        base_url=news_server.base_url,
+        retry=KrisinformationRetryPolicy(attempts=3, base_delay=0.001),
+    )
+    assert len(api.get_all_news_api("17.00", "62.1")) == 3
+    assert len(news_server.requests) == 3
+
+
+def test_no_retry_on_client_error(news_server):
+    """Client errors are not retried"""
+    news_server.statuses = [404]
+    api = KrisinformationAPI(
+        base_url=news_server.base_url,
+        retry=KrisinformationRetryPolicy(attempts=3, base_delay=0.001),
+    )
+    with pytest.raises(KrisinformationException):
+        api.get_all_news_api("17.00", "62.1")
+    assert len(news_server.requests) == 1
+
+
+def test_retry_delay_is_jittered():
+    """Delays grow exponentially with full jitter"""
+    policy = KrisinformationRetryPolicy(
+        base_delay=1, max_delay=5, random_source=lambda: 0.5
+    )
+    assert [policy.delay(attempt) for attempt in range(4)] == [0.5, 1, 2, 2.5]
+
+
+def test_circuit_breaker(news_server):
+    """An open circuit stops requests until the reset timeout"""
+    clock = FakeClock()
+    breaker = KrisinformationCircuitBreaker(
+        failure_threshold=2, reset_timeout=30, clock=clock
+    )
+    api = KrisinformationAPI(base_url=news_server.base_url, circuit_breaker=breaker)
+    news_server.status = 500
+    for _ in range(2):
+        with pytest.raises(KrisinformationException):
+            api.get_all_news_api("17.00", "62.1")
+    assert breaker.state == "open"
+
+    with pytest.raises(KrisinformationCircuitOpenException):
+        api.get_all_news_api("17.00", "62.1")
+    assert len(news_server.requests) == 2
+
+    clock.now = 30
+    assert breaker.state == "half_open"
+    with pytest.raises(KrisinformationException):
+        api.get_all_news_api("17.00", "62.1")
+    assert breaker.state == "open"
+
+    clock.now = 60
+    news_server.status = 200
+    assert len(api.get_all_news_api("17.00", "62.1")) == 3
+    assert breaker.state == "closed"
+
+
+def test_open_circuit_serves_fresh_cache(news_server):
+    """A fresh cache is served while another endpoint opened the circuit"""
+    clock = FakeClock()
+    breaker = KrisinformationCircuitBreaker(
+        failure_threshold=1, reset_timeout=30, clock=clock
+    )
+    api = KrisinformationAPI(
+        base_url=news_server.base_url,
+        cache=KrisinformationCache(ttl=60, clock=clock),
+        circuit_breaker=breaker,
+    )
+    assert len(api.get_all_news_api("17.00", "62.1")) == 3
+    news_server.status = 500
+    with pytest.raises(KrisinformationException):
+        api.get_endpoint_api("vmas")
+    assert breaker.state == "open"
+
+    clock.now = 10
+    assert len(api.get_all_news_api("17.00", "62.1")) == 3
+    assert len(list(api.iter_news_api("17.00", "62.1"))) == 3
+    assert len(news_server.requests) == 2
+
+
+def test_half_open_cache_hit_keeps_trial(news_server):
+    """A cache hit is no trial, the circuit stays half open"""
+    clock = FakeClock()
+    breaker = KrisinformationCircuitBreaker(
+        failure_threshold=1, reset_timeout=30, clock=clock
+    )
+    api = KrisinformationAPI(
+        base_url=news_server.base_url,
+        cache=KrisinformationCache(ttl=60, clock=clock),
+        circuit_breaker=breaker,
+    )
+    news_server.status = 500
+    with pytest.raises(KrisinformationException):
+        api.get_endpoint_api("vmas")
+    news_server.status = 200
+    clock.now = 30
+    assert len(api.get_all_news_api("17.00", "62.1")) == 3
+    assert breaker.state == "closed"
+
+    news_server.status = 500
+    with pytest.raises(KrisinformationException):
+        api.get_endpoint_api("vmas")
+    clock.now = 60
+    assert breaker.state == "half_open"
+    assert len(api.get_all_news_api("17.00", "62.1")) == 3
+    assert breaker.state == "half_open"
+    assert len(news_server.requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_cancelled_trial_releases_circuit(news_server):
+    """A cancelled trial request lets the next one through"""
+    clock = FakeClock()
+    breaker = KrisinformationCircuitBreaker(
+        failure_threshold=1, reset_timeout=30, clock=clock
+    )
+    api = KrisinformationAPI(base_url=news_server.base_url, circuit_breaker=breaker)
+    news_server.status = 500
+    with pytest.raises(KrisinformationException):
+        await api.async_get_all_news_api("17.00", "62.1")
+
+    clock.now = 30
+    news_server.status = 200
+    news_server.delay = 0.5
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(api.async_get_all_news_api("17.00", "62.1"), 0.05)
+    assert breaker.state == "half_open"
+
+    news_server.delay = 0
+    assert len(await api.async_get_all_news_api("17.00", "62.1")) == 3
+    assert breaker.state == "closed"
+
+
+def test_iter_news_circuit_breaker_and_retry(news_server):
+    """Streaming goes through the circuit breaker, retries and stale data"""
+    breaker = KrisinformationCircuitBreaker(failure_threshold=2, clock=FakeClock())
+    api = KrisinformationAPI(
+        base_url=news_server.base_url,
+        retry=KrisinformationRetryPolicy(attempts=2, base_delay=0.001),
+        circuit_breaker=breaker,
+        stale_while_error=True,
+    )
+    news_server.statuses = [503]
+    assert len(list(api.iter_news_api("17.00", "62.1"))) == 3
+    assert len(news_server.requests) == 2
+
+    news_server.status = 503
+    assert len(list(api.iter_news_api("17.00", "62.1"))) == 3
+    assert api.stale
+    assert breaker.state == "open"
+    assert len(list(api.iter_news_api("17.00", "62.1"))) == 3
+    assert len(news_server.requests) == 4
+    api.transport.close()
+
+
+@pytest.mark.asyncio
+async def test_aiter_news_circuit_breaker(news_server):
+    """Async streaming is stopped by an open circuit"""
+    breaker = KrisinformationCircuitBreaker(failure_threshold=1, clock=FakeClock())
+    api = KrisinformationAPI(base_url=news_server.base_url, circuit_breaker=breaker)
+    news_server.status = 503
+    for error in (KrisinformationException, KrisinformationCircuitOpenException):
+        with pytest.raises(error):
+            async for _ in api.async_iter_news_api("17.00", "62.1"):
+                pass
+    assert len(news_server.requests) == 1
+
+
+def test_stale_while_error(news_server):
+    """The last good feed is served with a staleness flag"""
+    api = KrisinformationAPI(base_url=news_server.base_url, stale_while_error=True)
+    krisinformation = Krisinformation("17.041", "62.34198", api=api)
+    assert len(krisinformation.get_all_news()) == 3
+    assert not krisinformation.is_stale
+
+    news_server.status = 502
+    assert len(krisinformation.get_all_news()) == 3
+    assert krisinformation.is_stale
+
+    news_server.status = 200
+    krisinformation.get_all_news()
+    assert not krisinformation.is_stale
+
+
+@pytest.mark.asyncio
+async def test_async_retry_and_stale(news_server):
+    """test the async stuff"""
+    api = KrisinformationAPI(
+        base_url=news_server.base_url,
+        retry=KrisinformationRetryPolicy(attempts=2, base_delay=0.001),
+        stale_while_error=True,
+    )
+    news_server.statuses = [500]
+    async with Krisinformation("17.041", "62.34198", api=api) as krisinformation:
+        assert len(await krisinformation.async_get_all_news()) == 3
+        assert len(news_server.requests) == 2
+
+        news_server.status = 500
+        assert len(await krisinformation.async_get_all_news()) == 3
+        assert krisinformation.is_stale
+
+
+@pytest.mark.parametrize("name", ["json", "orjson", "msgspec"])
+def test_json_decoders(news_server, name):
+    """Every decoder gives the same feed from the response bytes"""
+    if name != "json":
+        pytest.importorskip(name)
+    api = KrisinformationAPI(
+        base_url=news_server.base_url,
+        decoder=krisinformation_lib.json_decoder(name),
+    )
+    assert api.get_all_news_api("17.00", "62.1") == json.loads(news_server.body)
+    assert list(api.iter_news_api("17.00", "62.1")) == json.loads(news_server.body)
+    api.transport.close()
+
+    with pytest.raises(ValueError):
+        krisinformation_lib.json_decoder(name)(b"[{")
+
+
+def test_default_json_decoder():
+    """orjson is used when installed"""
+    decoder = krisinformation_lib.json_decoder()
+    if krisinformation_lib.orjson is None:
+        assert decoder is json.loads
+    else:
+        assert decoder is krisinformation_lib.orjson.loads
+    with pytest.raises(KrisinformationException):
+        krisinformation_lib.json_decoder("unknown")
+
+
+def test_import_does_not_load_aiohttp():
+    """aiohttp and asyncio are only imported by the async client"""
+    code = (
+        "import sys, krisinformation\n"
+        "krisinformation.Krisinformation('17.041', '62.34198')\n"
+        "print(sorted({'aiohttp', 'asyncio'} & set(sys.modules)))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, check=True, text=True
+    ).stdout
+    assert output.strip() == "[]"
+
+
+def test_rate_limiter_serves_cached_data(news_server):
+    """Callers over budget get the last data instead of waiting"""
+    clock = FakeClock()
+    limiter = krisinformation_lib.KrisinformationRateLimiter(
+        rate=0.1, burst=2, clock=clock
+    )
+    api = KrisinformationAPI(base_url=news_server.base_url, rate_limiter=limiter)
+    krisinformation = Krisinformation("17.041", "62.34198", api=api)
+    for _ in range(4):
+        assert len(krisinformation.get_all_news()) == 3
+    assert len(news_server.requests) == 2
+    assert krisinformation.is_stale
+
+    clock.now = 10
+    krisinformation.get_all_news()
+    assert len(news_server.requests) == 3
+    assert not krisinformation.is_stale
+    api.transport.close()
+
+
+@pytest.mark.asyncio
+async def test_async_rate_limiter(news_server):
+    """The async calls take from the same bucket"""
+    limiter = krisinformation_lib.KrisinformationRateLimiter(burst=1, clock=FakeClock())
+    api = KrisinformationAPI(base_url=news_server.base_url, rate_limiter=limiter)
+    async with Krisinformation("17.041", "62.34198", api=api) as krisinformation:
+        await krisinformation.async_get_all_news()
+        assert len(await krisinformation.async_get_all_news()) == 3
+    assert len(news_server.requests) == 1
+
+    # Nothing fetched yet to serve instead
+    api = KrisinformationAPI(base_url=news_server.base_url, rate_limiter=limiter)
+    with pytest.raises(krisinformation_lib.KrisinformationRateLimitException):
+        await api.async_get_all_news_api("17.00", "62.1")
+
+
+def test_rate_limited_trial_releases_circuit(news_server):
+    """A half-open trial stopped by the rate limiter is tried again later"""
+    clock = FakeClock()
+    breaker = KrisinformationCircuitBreaker(
+        failure_threshold=1, reset_timeout=30, clock=clock
+    )
+    limiter = krisinformation_lib.KrisinformationRateLimiter(
+        rate=0.01, burst=1, clock=clock
+    )
+    api = KrisinformationAPI(
+        base_url=news_server.base_url, circuit_breaker=breaker, rate_limiter=limiter
+    )
+    news_server.status = 500
+    with pytest.raises(KrisinformationException):
+        api.get_all_news_api("17.00", "62.1")
+
+    clock.now = 30
+    with pytest.raises(krisinformation_lib.KrisinformationRateLimitException):
+        api.get_all_news_api("17.00", "62.1")
+    assert breaker.state == "half_open"
+
+    clock.now = 100
+    news_server.status = 200
+    assert len(api.get_all_news_api("17.00", "62.1")) == 3
+    assert breaker.state == "closed"
+    api.transport.close()
+
+
+def test_rate_limited_stream_serves_last_feed(news_server):
+    """Streamed feeds are kept to serve callers over budget"""
+    limiter = krisinformation_lib.KrisinformationRateLimiter(burst=1, clock=FakeClock())
+    api = KrisinformationAPI(base_url=news_server.base_url, rate_limiter=limiter)
+    first = list(api.iter_news_api("17.00", "62.1"))
+    assert list(api.iter_news_api("17.00", "62.1")) == first
+    assert api.stale
+    assert len(news_server.requests) == 1
+    api.transport.close()
+
+
 class FakeKrisinformationApi(KrisinformationAPIBase):
     """Implements fake class to return API data"""
 
@@ -0,0 +1,108 @@
+"""
+    Automatic tests for the background poller
+"""
+# pylint: disable=W0621
+
+import asyncio
+
+import pytest
+from krisinformation.krisinformation_lib import Krisinformation
+from krisinformation.test_krisinformation_lib import FakeKrisinformationApi
+
+
+class ChangingKrisinformationApi(FakeKrisinformationApi):
+    """Fake api where the first news is updated on chosen polls"""
+
+    def __init__(self, changes_on=()) -> None:
+        self.polls = 0
+        self.changes_on = changes_on
+
+    def get_all_news_api(self, longitude: str, latitude: str):
+        """Fake data, updated on the chosen polls"""
+        self.polls += 1
+        feed = super().get_all_news_api(longitude, latitude)
+        feed[0]["Updated"] = str(sum(poll <= self.polls for poll in self.changes_on))
+        return feed
+
+
+class FakeSleep:
+    """Records the sleeps instead of sleeping"""
+
+    def __init__(self) -> None:
+        self.delays = []
+
+    async def __call__(self, delay: float) -> None:
+        self.delays.append(delay)
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_interval_adapts():
+    """Quiet polls back off, changes bring the interval back down"""
+    api = ChangingKrisinformationApi(changes_on=(4,))
+    krisinformation = Krisinformation("17.041", "62.34198", api=api)
+    sleep = FakeSleep()
+    poller = krisinformation.changes(
+        min_interval=10,
+        max_interval=60,
+        sleep=sleep,
+        random_source=lambda: 0.5,
+    )
+
+    delivered = []
+    async for changes in poller:
+        delivered.append(changes)
+        if len(delivered) == 2:
+            break
+
+    assert len(delivered[0].added) == 3
+    assert [news.identifier for news in delivered[1].updated] == ["18478"]
+    assert sleep.delays == [10, 20, 40]
+    assert poller.next_delay(False) == 60
+    assert poller.next_delay(True) == 10
+
+
+def test_jitter():
+    """Delays are spread around the interval"""
+    krisinformation = Krisinformation(
+        "17.041", "62.34198", api=FakeKrisinformationApi()
+    )
+    low = krisinformation.changes(min_interval=10, jitter=0.1, random_source=lambda: 0)
+    high = krisinformation.changes(min_interval=10, jitter=0.1, random_source=lambda: 1)
+    assert low.next_delay(True) == pytest.approx(9)
+    assert high.next_delay(True) == pytest.approx(11)
+
+
+@pytest.mark.asyncio
+async def test_subscribe():
+    """The background task delivers changes until stopped"""
+    api = ChangingKrisinformationApi(changes_on=(2, 3))
+    krisinformation = Krisinformation("17.041", "62.34198", api=api)
+    delivered = []
+    done = asyncio.Event()
+
+    async def callback(changes):
+        delivered.append(changes)
+        if len(delivered) == 3:
+            done.set()
+
+    poller = krisinformation.subscribe(callback, sleep=FakeSleep())
+    await asyncio.wait_for(done.wait(), 1)
+    await poller.stop()
+
+    assert not poller.running
+    assert len(delivered) == 3
+
+
+@pytest.mark.asyncio
+async def test_errors_back_off():
+    """A failing poll is logged and treated as quiet"""
+    api = FakeKrisinformationApi()
+
+    async def failing(longitude, latitude):
+        raise ConnectionError("down")
+
+    api.async_get_all_news_api = failing
+    krisinformation = Krisinformation("17.041", "62.34198", api=api)
+    poller = krisinformation.changes()
+    assert not await poller.poll_once()
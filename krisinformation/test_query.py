@@ -0,0 +1,76 @@
+"""
+    Automatic tests for the query index
+"""
+# pylint: disable=W0212, W0621
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from krisinformation.krisinformation_lib import _get_all_news_from_api
+from krisinformation.query import KrisinformationQueryIndex, tokenize
+from krisinformation.test_krisinformation_lib import FakeKrisinformationApi
+
+CET = timezone(timedelta(hours=1))
+
+
+@pytest.fixture
+def feed() -> list:
+    """Returns the fake feed."""
+    return FakeKrisinformationApi().get_all_news_api("17.00", "62.1")
+
+
+@pytest.fixture
+def index(feed) -> KrisinformationQueryIndex:
+    """Returns an index over the fake feed."""
+    index = KrisinformationQueryIndex()
+    index.update(_get_all_news_from_api(feed))
+    return index
+
+
+def _ids(news_list) -> list:
+    return [news.identifier for news in news_list]
+
+
+def test_tokenize():
+    """Markup and entities are dropped, words lower cased"""
+    assert tokenize("<p>Snö&nbsp;och VIND</p>") == ["snö", "och", "vind"]
+
+
+def test_text_query(index):
+    """All words must match in any text field"""
+    assert _ids(index.query(text="snöfall")) == ["18478", "18435"]
+    assert _ids(index.query(text="Snöfall Jämtlandsfjällen")) == ["18435"]
+    assert _ids(index.query(text="giftig")) == ["18434"]
+    assert not index.query(text="snöfall giftig")
+
+
+def test_facet_and_time_query(index):
+    """Facets and the published window narrow the result"""
+    assert _ids(index.query(sender_name="SMHI")) == ["18478", "18435"]
+    assert _ids(index.query(sender_name="")) == ["18434"]
+    assert _ids(index.query(language="sv", since=datetime(2023, 3, 3, tzinfo=CET))) == [
+        "18478"
+    ]
+    assert _ids(
+        index.query(
+            since=datetime(2023, 3, 2, 6, 15, tzinfo=CET),
+            until=datetime(2023, 3, 2, 13, 36, tzinfo=CET),
+        )
+    ) == ["18435", "18434"]
+    assert index.facet_counts("event") == {"News": 3}
+    assert len(index.query()) == 3
+
+
+def test_incremental_update(index, feed):
+    """Changed news are re-indexed and removed news forgotten"""
+    feed[0]["Updated"] = "2023-03-08T08:00:00+01:00"
+    feed[0]["Headline"] = "Storm"
+    del feed[1]
+    index.update(_get_all_news_from_api(feed, typed=True))
+
+    assert len(index) == 2
+    assert _ids(index.query(text="storm")) == ["18478"]
+    assert not index.query(text="jämtlandsfjällen")
+    assert "jämtlandsfjällen" not in index._words
+    assert len(index._published) == 2
+    assert index.facet_counts("sender_name") == {"SMHI": 1, "": 1}
@@ -0,0 +1,87 @@
+"""
+    Automatic tests for the relay server
+"""
+# pylint: disable=W0621
+
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest_asyncio = pytest.importorskip("pytest_asyncio")
+
+# pylint: disable=C0413
+from krisinformation.krisinformation_lib import Krisinformation
+from krisinformation.relay import KrisinformationRelay, KrisinformationRelayAPI
+from krisinformation.test_instrumentation import RecordingInstrumentation
+from krisinformation.test_krisinformation_lib import FakeKrisinformationApi
+
+
+class ChangingKrisinformationApi(FakeKrisinformationApi):
+    """Fake api whose feed can be changed between polls"""
+
+    def __init__(self) -> None:
+        self.feed = super().get_all_news_api("", "")
+
+    def get_all_news_api(self, longitude: str, latitude: str):
+        """The current feed"""
+        return self.feed
+
+
+@pytest_asyncio.fixture
+async def relay():
+    """Returns a started relay on a free port"""
+    relay = KrisinformationRelay(ChangingKrisinformationApi(), interval=3600)
+    await relay.start(port=0)
+    yield relay
+    await relay.stop()
+
+
+@pytest.mark.asyncio
+async def test_relay_serves_feed(relay):
+    """The feed is served in API format and revalidated with the ETag"""
+    instrumentation = RecordingInstrumentation()
+    api = KrisinformationRelayAPI(
+        "http://127.0.0.1:{}".format(relay.port), instrumentation=instrumentation
+    )
+    async with Krisinformation("17.041", "62.34198", api=api) as krisinformation:
+        news = await krisinformation.async_get_all_news()
+        assert [item.identifier for item in news] == ["18478", "18435", "18434"]
+        await krisinformation.async_get_all_news()
+        assert ("cache_revalidated", "news") in instrumentation.events
+
+
+@pytest.mark.asyncio
+async def test_relay_streams_changes(relay):
+    """Clients get a snapshot and then only the changes"""
+    api = KrisinformationRelayAPI("http://127.0.0.1:{}".format(relay.port))
+    events = api.async_events()
+    assert await events.__anext__() == ("snapshot", {"version": 1})
+
+    relay._api.feed = relay._api.feed[1:]
+    relay._api.feed[0] = dict(relay._api.feed[0], Updated="2023-03-08T10:00:00+01:00")
+    await relay.poll_once()
+
+    event, data = await asyncio.wait_for(events.__anext__(), 5)
+    assert event == "changes"
+    assert data["version"] == 2
+    assert [news["Identifier"] for news in data["updated"]] == ["18435"]
+    assert data["removed"] == ["18478"]
+    await events.aclose()
+
+
+@pytest.mark.asyncio
+async def test_relay_resyncs_slow_clients():
+    """A full client queue is replaced by one resync event"""
+    api = ChangingKrisinformationApi()
+    relay = KrisinformationRelay(api, queue_size=2)
+    relay.update(api.feed)
+    queue = relay._subscribe()
+
+    relay.update(api.feed[1:])
+    relay.update(api.feed[2:])
+
+    assert queue.get_nowait() == ("resync", json.dumps({"version": 3}))
+    assert queue.empty()
+    assert relay.resyncs == 1
@@ -0,0 +1,135 @@
+"""
+    Automatic tests for the feed shared between processes
+"""
+# pylint: disable=W0621
+
+from concurrent.futures import ProcessPoolExecutor
+import fcntl
+import json
+import time
+
+import pytest
+from krisinformation.krisinformation_lib import Krisinformation
+from krisinformation.shared import (
+    KrisinformationSharedFeed,
+    KrisinformationSharedRateLimiter,
+)
+from krisinformation.test_krisinformation_lib import FakeClock, FakeKrisinformationApi
+
+
+class CountingKrisinformationApi(FakeKrisinformationApi):
+    """Fake api that counts the fetches"""
+
+    def __init__(self, delay: float = 0) -> None:
+        self.calls = 0
+        self.delay = delay
+
+    def get_all_news_api(self, longitude: str, latitude: str):
+        """Counted fetch"""
+        self.calls += 1
+        time.sleep(self.delay)
+        return super().get_all_news_api(longitude, latitude)
+
+
+@pytest.fixture
+def path(tmp_path) -> str:
+    """Returns the path of a shared feed in a temporary directory."""
+    return str(tmp_path / "krisinformation.feed")
+
+
+def _worker_version(path: str) -> tuple:
+    """Reads the shared feed in another process"""
+    feed = KrisinformationSharedFeed(path, api=CountingKrisinformationApi(0.2))
+    snapshot = feed.snapshot()
+    return snapshot.version, len(snapshot)
+
+
+def test_processes_share_one_fetch(path):
+    """Only one of many processes fetches upstream"""
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(_worker_version, [path] * 4))
+    assert results == [(1, 3)] * 4
+
+
+def test_snapshot_is_decoded_lazily(path):
+    """Readers map the writer's file and decode the news they access"""
+    api = CountingKrisinformationApi()
+    writer = KrisinformationSharedFeed(path, api=api)
+    reader = KrisinformationSharedFeed(path, api=api)
+    expected = FakeKrisinformationApi().get_all_news_api("17.00", "62.1")
+
+    assert writer.get_all_news_api("", "") == expected
+    snapshot = reader.snapshot()
+    assert api.calls == 1
+    assert snapshot[-1] == expected[-1]
+    assert snapshot[1:] == expected[1:]
+    krisinformation = Krisinformation("17.041", "62.34198", api=reader)
+    assert [news.identifier for news in krisinformation.get_all_news()] == [
+        "18478",
+        "18435",
+        "18434",
+    ]
+
+
+def test_versions_are_decoded_once(path):
+    """Repeated calls reuse the news decoded for the mapped version"""
+    decoded = []
+
+    def decoder(data):
+        decoded.append(data)
+        return json.loads(data)
+
+    clock = FakeClock()
+    feed = KrisinformationSharedFeed(
+        path, api=CountingKrisinformationApi(), decoder=decoder, clock=clock
+    )
+    krisinformation = Krisinformation("17.041", "62.34198", api=feed)
+    for _ in range(5):
+        assert len(krisinformation.get_all_news()) == 3
+    assert len(decoded) == 3
+
+    clock.now = 60
+    krisinformation.get_all_news()
+    assert len(decoded) == 6
+
+
+def test_stale_snapshot_is_served_while_leader_fetches(path):
+    """An old feed is refetched by the lock holder only"""
+    clock = FakeClock()
+    api = CountingKrisinformationApi()
+    feed = KrisinformationSharedFeed(path, api=api, interval=60, clock=clock)
+    assert feed.snapshot().version == 1
+
+    clock.now = 60
+    with open(path + ".lock", "a", encoding="utf-8") as leader:
+        fcntl.flock(leader, fcntl.LOCK_EX)
+        assert feed.snapshot().version == 1
+        fcntl.flock(leader, fcntl.LOCK_UN)
+    assert api.calls == 1
+
+    assert feed.snapshot().version == 2
+    assert api.calls == 2
+    feed.close()
+
+
+@pytest.mark.asyncio
+async def test_async_snapshot(path):
+    """The async calls share the same file"""
+    api = CountingKrisinformationApi()
+    feed = KrisinformationSharedFeed(path, api=api)
+    assert len(await feed.async_get_all_news_api("", "")) == 3
+    assert KrisinformationSharedFeed(path, api=api).snapshot().version == 1
+    assert api.calls == 1
+
+
+def _worker_acquire(path: str) -> int:
+    """Takes tokens from the shared bucket in another process"""
+    limiter = KrisinformationSharedRateLimiter(path, rate=0.001, burst=5)
+    return sum(limiter.acquire() for _ in range(5))
+
+
+def test_processes_share_rate_limit(tmp_path):
+    """All processes take from the same budget"""
+    path = str(tmp_path / "krisinformation.ratelimit")
+    with ProcessPoolExecutor(max_workers=3) as executor:
+        assert sum(executor.map(_worker_acquire, [path] * 3)) == 5
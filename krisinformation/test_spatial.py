@@ -0,0 +1,186 @@
+"""
+    Automatic tests for the spatial index
+"""
+# pylint: disable=W0212
+
+import math
+
+import pytest
+from krisinformation import spatial
+from krisinformation.krisinformation_lib import Krisinformation, KrisinformationNews
+from krisinformation.spatial import KrisinformationSpatialIndex
+from krisinformation.test_krisinformation_lib import FakeKrisinformationApi
+
+
+def _news(
+    identifier: str, areas: list, updated: str = "2023-03-07"
+) -> KrisinformationNews:
+    """Returns news with the given raw areas"""
+    values = [identifier] + [""] * 16
+    values[2] = updated
+    values[9] = str(areas)
+    return KrisinformationNews(*values, areas=areas)
+
+
+def _point(description: str, longitude: float, latitude: float) -> dict:
+    """Returns a raw point area"""
+    return {
+        "Type": "PoI",
+        "Description": description,
+        "Coordinate": "{},{}".format(longitude, latitude),
+        "CoordinateObject": {"Longitude": longitude, "Latitude": latitude},
+        "GeometryInformation": None,
+    }
+
+
+SQUARE = {
+    "Type": "Municipality",
+    "Description": "Square",
+    "Coordinate": "14.5,55.5 0",
+    "CoordinateObject": {"Longitude": "14.5", "Latitude": "55.5"},
+    "GeometryInformation": "14,55 15,55 15,56 14,56 14,55",
+}
+
+
+class LocalFakeKrisinformationApi(FakeKrisinformationApi):
+    """Fake data where the last news only concerns Åhus and Skåne"""
+
+    def get_all_news_api(self, longitude: str, latitude: str):
+        """Fake data without the country area on the last news"""
+        feed = super().get_all_news_api(longitude, latitude)
+        del feed[2]["Area"][0]
+        return feed
+
+
+@pytest.fixture
+def krisinformation() -> Krisinformation:
+    """Returns the krisinformation object."""
+    return Krisinformation("14.30884", "55.92231", api=LocalFakeKrisinformationApi())
+
+
+def test_news_near(krisinformation):
+    """Country wide news always match, point areas within the radius"""
+    near = krisinformation.get_news_near(radius_km=5)
+    assert [news.identifier for news in near] == ["18478", "18435", "18434"]
+
+    far = krisinformation.get_news_for_point(20.26, 67.85, radius_km=5)
+    assert [news.identifier for news in far] == ["18478", "18435"]
+
+
+def test_news_near_typed():
+    """Typed news are indexed as well"""
+    krisinformation = Krisinformation(
+        "20.26", "67.85", api=LocalFakeKrisinformationApi(), typed=True
+    )
+    assert len(krisinformation.get_news_near(radius_km=5)) == 2
+
+
+@pytest.mark.asyncio
+async def test_async_news_near(krisinformation):
+    """test the async stuff"""
+    near = await krisinformation.async_get_news_near(radius_km=5)
+    assert len(near) == 3
+
+
+def test_polygon_containment():
+    """Points inside a polygon match, points outside only within radius"""
+    index = KrisinformationSpatialIndex()
+    index.update([_news("1", [SQUARE])])
+
+    assert len(index.query(14.5, 55.5, radius_km=0)) == 1
+    assert not index.query(15.2, 55.5, radius_km=0)
+    assert len(index.query(15.2, 55.5, radius_km=15)) == 1
+
+
+def test_incremental_update():
+    """Only changed news are re-indexed and removed news disappear"""
+    index = KrisinformationSpatialIndex()
+    first = _news("1", [_point("A", 14.0, 55.0)])
+    second = _news("2", [_point("B", 18.0, 59.0)])
+    index.update([first, second])
+    indexed = index._cells_of["2"]
+
+    moved = _news("1", [_point("A", 18.0, 59.0)], updated="2023-03-08")
+    index.update([moved, second])
+
+    assert index._cells_of["2"] is indexed
+    assert not index.query(14.0, 55.0, radius_km=1)
+    assert [news.identifier for news in index.query(18.0, 59.0, 1)] == ["1", "2"]
+
+    index.update([second])
+    assert len(index) == 1
+    assert [news.identifier for news in index.query(18.0, 59.0, 1)] == ["2"]
+    assert all(
+        area.identifier == "2" for areas in index._cells.values() for area in areas
+    )
+
+
+def _circle(description: str, points: int) -> dict:
+    """Returns a raw polygon area approximating a circle around 16,60"""
+    outline = " ".join(
+        "{},{}".format(
+            16 + 0.5 * math.cos(2 * math.pi * step / points),
+            60 + 0.25 * math.sin(2 * math.pi * step / points),
+        )
+        for step in range(points + 1)
+    )
+    return dict(SQUARE, Description=description, GeometryInformation=outline)
+
+
+@pytest.mark.parametrize("vectorized", [True, False])
+def test_query_many_matches_query(monkeypatch, vectorized):
+    """A batch query gives the same news as one query per point"""
+    if vectorized:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(spatial, "numpy", None)
+    index = KrisinformationSpatialIndex()
+    index.update(
+        [
+            _news("1", [SQUARE]),
+            _news("2", [_circle("Circle", 200)]),
+            _news("3", [_point("A", 15.0, 55.9), _point("B", 16.5, 60.2)]),
+        ]
+    )
+    points = [
+        (13.5 + 0.1 * step_x, 54.5 + 0.15 * step_y)
+        for step_x in range(40)
+        for step_y in range(40)
+    ]
+    radii = [5 + step % 30 for step in range(len(points))]
+    expected = [
+        index.query(longitude, latitude, radius_km)
+        for (longitude, latitude), radius_km in zip(points, radii)
+    ]
+    assert index.query_many(points, radii) == expected
+    assert any(expected) and not all(expected)
+
+
+def test_geometry_shared_across_updates():
+    """An updated news with the same areas reuses the parsed outline"""
+    index = KrisinformationSpatialIndex()
+    index.update([_news("1", [SQUARE])])
+    geometry = index._geometries_of["1"][0]
+
+    index.update([_news("1", [SQUARE], updated="2023-03-08")])
+    assert index._geometries_of["1"][0] is geometry
+
+    index.update([_news("1", [_point("A", 14.5, 55.5)], updated="2023-03-09")])
+    assert geometry not in index._geometries.values()
+    assert len(index._geometries) == 1
+
+
+def test_simplified_outline():
+    """Simplification drops points but keeps the bounding box and inside"""
+    detailed = KrisinformationSpatialIndex()
+    simplified = KrisinformationSpatialIndex(tolerance_km=1)
+    news = _news("1", [_circle("Circle", 2000)])
+    detailed.update([news])
+    simplified.update([news])
+
+    full = detailed._geometries_of["1"][0]
+    reduced = simplified._geometries_of["1"][0]
+    assert len(reduced.longitudes) < len(full.longitudes) / 10
+    assert reduced.bbox == full.bbox
+    assert simplified.query(16, 60, radius_km=0) == [news]
+    assert not simplified.query(16.6, 60, radius_km=0)
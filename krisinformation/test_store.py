@@ -0,0 +1,124 @@
+"""
+    Automatic tests for the persistent store
+"""
+# pylint: disable=W0621
+
+import pytest
+from krisinformation.krisinformation_lib import Krisinformation, KrisinformationAPI
+from krisinformation.store import (
+    KrisinformationRecordingAPI,
+    KrisinformationReplayAPI,
+    KrisinformationStore,
+)
+from krisinformation.test_krisinformation_lib import FakeKrisinformationApi
+
+
+@pytest.fixture
+def store(tmp_path) -> KrisinformationStore:
+    """Returns a store in a temporary directory."""
+    store = KrisinformationStore(str(tmp_path / "krisinformation.db"))
+    yield store
+    store.close()
+
+
+def test_warm_start(tmp_path):
+    """A restarted instance serves the snapshot and reports no old news"""
+    path = str(tmp_path / "krisinformation.db")
+    store = KrisinformationStore(path)
+    first = Krisinformation(
+        "17.041", "62.34198", api=FakeKrisinformationApi(), store=store
+    )
+    assert len(first.poll_changes().added) == 3
+    store.close()
+
+    store = KrisinformationStore(path)
+    second = Krisinformation(
+        "17.041", "62.34198", api=FakeKrisinformationApi(), store=store
+    )
+    snapshot = second.get_snapshot()
+    assert [news.identifier for news in snapshot] == ["18478", "18435", "18434"]
+    assert not second.poll_changes()
+    store.close()
+
+
+def test_reconcile_in_background(store):
+    """The snapshot is served at once and replaced by the fetched feed"""
+    api = FakeKrisinformationApi()
+    store.save(api.get_all_news_api("17.00", "62.1")[1:])
+    krisinformation = Krisinformation("17.041", "62.34198", api=api, store=store)
+
+    assert len(krisinformation.get_snapshot()) == 2
+    krisinformation.reconcile().join()
+    assert len(krisinformation.get_snapshot()) == 3
+    assert len(store.load()) == 3
+    # Changes made while reconciling are still reported by the next poll
+    assert [news.identifier for news in krisinformation.poll_changes().added] == [
+        "18478"
+    ]
+
+
+def test_get_all_news_saves_to_store(store):
+    """Every fetch keeps the store current"""
+    krisinformation = Krisinformation(
+        "17.041", "62.34198", api=FakeKrisinformationApi(), store=store
+    )
+    krisinformation.get_all_news()
+    assert [news["Identifier"] for news in store.load()] == ["18478", "18435", "18434"]
+
+
+def test_save_only_writes_changes(store):
+    """Unchanged news are not rewritten and removed news are deleted"""
+    feed = FakeKrisinformationApi().get_all_news_api("17.00", "62.1")
+    store.save(feed)
+    statements = []
+    store._connection.set_trace_callback(statements.append)
+
+    feed[0]["Updated"] = "2023-03-08T08:00:00+01:00"
+    del feed[1]
+    store.save(feed)
+
+    inserts = [sql for sql in statements if sql.startswith("INSERT")]
+    updates = [sql for sql in statements if sql.startswith("UPDATE")]
+    deletes = [sql for sql in statements if sql.startswith("DELETE")]
+    assert len(inserts) == 1 and "18478" in inserts[0]
+    assert len(updates) == 1 and "18434" in updates[0]
+    assert len(deletes) == 1 and "18435" in deletes[0]
+    assert store.load() == feed
+
+
+def test_record_and_replay(store):
+    """Recorded feeds are replayed in order"""
+    api = FakeKrisinformationApi()
+    recording = Krisinformation(
+        "17.041", "62.34198", api=KrisinformationRecordingAPI(api, store)
+    )
+    recording.get_all_news()
+    recording.get_all_news()
+    store.record_feed([], captured_at=1.0)
+
+    replay = KrisinformationReplayAPI(store, loop=True)
+    feeds = [replay.get_all_news_api("", "") for _ in range(4)]
+    assert [len(feed) for feed in feeds] == [3, 3, 0, 3]
+
+
+@pytest.mark.asyncio
+async def test_async_poll_with_store(store):
+    """test the async stuff"""
+    krisinformation = Krisinformation(
+        "17.041", "62.34198", api=FakeKrisinformationApi(), store=store
+    )
+    assert len((await krisinformation.async_poll_changes()).added) == 3
+    assert len(store.load()) == 3
+
+
+@pytest.mark.asyncio
+async def test_async_reconcile(store):
+    """A failing API keeps the snapshot"""
+    feed = FakeKrisinformationApi().get_all_news_api("17.00", "62.1")
+    store.save(feed)
+    api = KrisinformationAPI(base_url="http://127.0.0.1:9/v3/")
+    krisinformation = Krisinformation("17.041", "62.34198", api=api, store=store)
+
+    await krisinformation.async_reconcile()
+    assert len(krisinformation.get_snapshot()) == 3
+    assert store.load() == feed
@@ -14,6 +14,10 @@ setuptools.setup(
     long_description_content_type="text/markdown",
     url="https://github.com/isabellaalstrom/pypi_krisinformation",
     packages=setuptools.find_packages(),
+    extras_require={
+        # The async client, the sync client only needs the standard library
+        "async": ["aiohttp"],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",